@@ -0,0 +1,139 @@
+"""
+ANN index benchmark: recall@k against exact search and p50/p99 latency.
+
+Vectors come from the chapter embeddings in the index cache (--from-cache)
+or from a synthetic clustered corpus. For every corpus size and index type
+the report has build time, memory and, per search setting, recall@k
+against exact inner-product search plus single-query latency percentiles.
+Run from the backend folder:
+
+    python -m benchmarks.bench_ann --sizes 2000 20000 100000 --types flat hnsw ivf_flat ivf_pq
+"""
+import argparse
+import json
+import time
+from typing import Dict, List
+
+import faiss
+import numpy as np
+
+from rag import sources
+from rag import vector_store
+from rag.vector_store import VectorStore, build_faiss_index
+
+
+def synthetic_corpus(n: int, d: int, seed: int) -> np.ndarray:
+    """
+    Unit vectors around n/50 random centres, roughly like topic clusters of
+    sentence embeddings.
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((max(1, n // 50), d)).astype("float32")
+    vectors = centres[rng.integers(0, len(centres), n)] + 0.6 * rng.standard_normal((n, d)).astype("float32")
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def cached_corpus() -> np.ndarray:
+    matrices = [
+        VectorStore.load(path.parent).vectors()
+        for path in sorted(sources.INDEX_CACHE_DIR.glob("chapters/*/manifest.json"))
+    ]
+    if not matrices:
+        raise SystemExit(f"No chapter embeddings under {sources.INDEX_CACHE_DIR}; run `python -m rag.ingest` first")
+    return np.vstack(matrices).astype("float32")
+
+
+def percentile_ms(samples: List[float], q: float) -> float:
+    return round(1000 * float(np.percentile(samples, q)), 3)
+
+
+def measure(index: faiss.Index, queries: np.ndarray, truth: np.ndarray, k: int) -> Dict[str, float]:
+    latencies = []
+    found = 0
+    for i, query in enumerate(queries):
+        started = time.perf_counter()
+        _, ids = index.search(query.reshape(1, -1), k)
+        latencies.append(time.perf_counter() - started)
+        found += len(set(ids[0].tolist()) & set(truth[i].tolist()))
+    return {
+        f"recall@{k}": round(found / (len(queries) * k), 4),
+        "p50_ms": percentile_ms(latencies, 50),
+        "p99_ms": percentile_ms(latencies, 99),
+    }
+
+
+def index_bytes(index: faiss.Index) -> int:
+    return faiss.serialize_index(index).nbytes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 20000, 100000])
+    parser.add_argument("--types", nargs="+", default=list(vector_store.INDEX_TYPES))
+    parser.add_argument("--from-cache", action="store_true", help="Use cached chapter embeddings (sampled with replacement past their count)")
+    parser.add_argument("--dim", type=int, default=384, help="Synthetic vector dimension")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[32, 64, 128])
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", default="bench_ann.json")
+    args = parser.parse_args()
+
+    faiss.omp_set_num_threads(1)  # the API searches one query per request
+    rng = np.random.default_rng(args.seed)
+    base = cached_corpus() if args.from_cache else None
+    # Compare index types at every size, however small
+    vector_store.FAISS_ANN_MIN_VECTORS = 0
+
+    report = []
+    for n in args.sizes:
+        if base is not None:
+            corpus = base[rng.integers(0, len(base), n)] if n > len(base) else base[rng.permutation(len(base))[:n]]
+            corpus = corpus + 0.01 * rng.standard_normal(corpus.shape).astype("float32")
+        else:
+            corpus = synthetic_corpus(n, args.dim, args.seed)
+        queries = corpus[rng.integers(0, n, args.queries)] + 0.05 * rng.standard_normal((args.queries, corpus.shape[1])).astype("float32")
+        corpus = np.ascontiguousarray(corpus, dtype="float32")
+        queries = np.ascontiguousarray(queries, dtype="float32")
+        faiss.normalize_L2(corpus)
+        faiss.normalize_L2(queries)
+        exact = faiss.IndexFlatIP(corpus.shape[1])
+        exact.add(corpus)
+        _, truth = exact.search(queries, args.k)
+
+        for index_type in args.types:
+            started = time.perf_counter()
+            index = build_faiss_index(corpus, index_type)
+            build_s = time.perf_counter() - started
+            if index_type == "hnsw":
+                settings = [("efSearch", value) for value in args.ef_search]
+            elif index_type.startswith("ivf"):
+                settings = [("nprobe", value) for value in args.nprobe]
+            else:
+                settings = [(None, None)]
+            for name, value in settings:
+                if name == "efSearch":
+                    index.hnsw.efSearch = value
+                elif name == "nprobe":
+                    faiss.extract_index_ivf(index).nprobe = value
+                row = {
+                    "size": n,
+                    "type": index_type,
+                    "index": type(index).__name__,
+                    "param": f"{name}={value}" if name else "",
+                    "build_s": round(build_s, 3),
+                    "index_mb": round(index_bytes(index) / 2**20, 2),
+                    **measure(index, queries, truth, args.k),
+                }
+                report.append(row)
+                print(json.dumps(row))
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Chunker benchmark: ingest time and retrieval quality per chunking config.
+
+For each PDF, every config chunks and embeds the pages (timed), then answers
+synthetic queries: sentences sampled from the text with some words dropped.
+A query is a hit@k when one of the top-k chunks contains the sentence's
+opening words. Run from the backend folder:
+
+    python -m benchmarks.bench_chunking --pdf ../std/9/Science/Motion.pdf \
+        --config chars --config tokens:200:32 --config tokens:128:0
+"""
+import argparse
+import json
+import random
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+from rag.chunker import ChunkView, chunk_pages, token_counter
+from rag.pdf_loader import chunk_text, iter_pdf_pages
+from rag.vector_store import VectorStore
+
+DEFAULT_STD_DIR = Path(__file__).resolve().parent.parent.parent / "std" / "9"
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def make_queries(pages: List[str], count: int, seed: int) -> List[Dict[str, str]]:
+    """
+    Sample sentences of 8+ words; the query drops ~30% of the words, the
+    target is the sentence's first six words.
+    """
+    rng = random.Random(seed)
+    sentences = [
+        " ".join(s.split())
+        for page in pages
+        for s in re.split(r"(?<=[.!?।])\s+", page)
+        if len(s.split()) >= 8
+    ]
+    queries = []
+    for sentence in rng.sample(sentences, min(count, len(sentences))):
+        words = sentence.split()
+        kept = [w for w in words if rng.random() > 0.3] or words
+        queries.append({"query": " ".join(kept), "target": _normalize(" ".join(words[:6]))})
+    return queries
+
+
+def build(config: str, pages: List[str], count_tokens) -> Sequence[str]:
+    if config == "chars":
+        return chunk_text("".join(page + "\n" for page in pages))
+    _, max_tokens, overlap = config.split(":")
+    return chunk_pages(pages, count_tokens, int(max_tokens), int(overlap))
+
+
+def evaluate(store: VectorStore, queries: List[Dict[str, str]], ks: List[int]) -> Dict[str, float]:
+    from rag.vector_store import create_embeddings
+
+    vectors = create_embeddings([q["query"] for q in queries])
+    top = max(ks)
+    hits = {k: 0 for k in ks}
+    reciprocal = 0.0
+    started = time.perf_counter()
+    for q, vector in zip(queries, vectors):
+        ranked = [_normalize(chunk) for chunk, _ in store.search(vector, top)]
+        rank = next((i for i, chunk in enumerate(ranked) if q["target"] in chunk), None)
+        if rank is None:
+            continue
+        reciprocal += 1.0 / (rank + 1)
+        for k in ks:
+            hits[k] += rank < k
+    search_ms = 1000 * (time.perf_counter() - started) / max(1, len(queries))
+    n = max(1, len(queries))
+    return {
+        **{f"hit@{k}": round(hits[k] / n, 4) for k in ks},
+        "mrr": round(reciprocal / n, 4),
+        "avg_search_ms": round(search_ms, 3),
+    }
+
+
+def run_pdf(pdf_path: str, configs: List[str], queries_per_pdf: int, ks: List[int], seed: int) -> Dict[str, object]:
+    pages = list(iter_pdf_pages(pdf_path))
+    queries = make_queries(pages, queries_per_pdf, seed)
+    count_tokens = token_counter()
+    results = {}
+    for config in configs:
+        started = time.perf_counter()
+        chunks = build(config, pages, count_tokens)
+        chunk_s = time.perf_counter() - started
+        store = VectorStore(chunks)
+        embed_s = time.perf_counter() - started - chunk_s
+        token_lengths = count_tokens(list(chunks))
+        results[config] = {
+            "chunks": len(chunks),
+            "chunk_s": round(chunk_s, 3),
+            "embed_s": round(embed_s, 3),
+            "max_chunk_tokens": max(token_lengths, default=0),
+            "truncated_chunks": sum(1 for n in token_lengths if n > 254),
+            "chunk_bytes": chunks.nbytes() if isinstance(chunks, ChunkView) else sum(len(c) for c in chunks),
+            **evaluate(store, queries, ks),
+        }
+        print(f"{Path(pdf_path).name} [{config}] {json.dumps(results[config])}")
+    return {"pdf": pdf_path, "pages": len(pages), "queries": len(queries), "configs": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", action="append", help="PDF to benchmark (repeatable); default: every PDF under std/9")
+    parser.add_argument("--config", action="append",
+                        help="'chars' or 'tokens:<max_tokens>:<overlap>' (repeatable)")
+    parser.add_argument("--queries", type=int, default=50, help="Sampled queries per PDF")
+    parser.add_argument("--k", type=int, action="append", help="Cut-offs for hit@k (default 1, 5)")
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--out", default="bench_chunking.json")
+    args = parser.parse_args()
+
+    pdfs = args.pdf or sorted(str(p) for p in DEFAULT_STD_DIR.glob("*/*.pdf"))
+    configs = args.config or ["chars", "tokens:200:32", "tokens:200:0", "tokens:128:32"]
+    ks = sorted(set(args.k or [1, 5]))
+
+    report = [run_pdf(pdf, configs, args.queries, ks, args.seed) for pdf in pdfs]
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
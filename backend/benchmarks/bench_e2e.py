@@ -0,0 +1,259 @@
+"""
+End-to-end RAG benchmark against the bundled std/9 PDFs.
+
+Runs the whole pipeline in-process with the deterministic "stub" LLM
+provider in place of Groq, Hugging Face and Ollama, a throwaway SQLite
+database and (unless --index-cache is given) an empty index cache:
+
+  ingest   cold build and warm cache load per chapter
+  search   query embedding and VectorStore.search latency
+  e2e      POST /sessions/{id}/message through the FastAPI app
+  memory   peak RSS after each phase and the store cache size
+
+Latencies are reported as p50/p99 in milliseconds, with the git commit and
+build signature, so two runs can be diffed with --compare. Run from the
+backend folder:
+
+    python -m benchmarks.bench_e2e --out e2e.json
+    python -m benchmarks.bench_e2e --compare e2e.json --out e2e_new.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+# rag.*, main and bench_chunking (which imports rag.*) are imported after
+# configure_env(): their settings are read from the environment at import time.
+
+DEFAULT_STD_DIR = Path(__file__).resolve().parent.parent.parent / "std"
+
+
+def configure_env(args: argparse.Namespace, workdir: Path) -> None:
+    os.environ["LLM_PROVIDERS"] = "stub"
+    os.environ["LLM_STUB_LATENCY_MS"] = str(args.llm_latency_ms)
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir / 'bench.db'}"
+    os.environ["INDEX_CACHE_DIR"] = args.index_cache or str(workdir / "index_cache")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    if not args.answer_cache:
+        # Cosine similarity never exceeds 1, so every lookup misses
+        os.environ["ANSWER_CACHE_THRESHOLD"] = "2"
+
+
+def percentiles_ms(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {"n": 0}
+    ms = 1000 * np.asarray(samples)
+    return {
+        "n": len(samples),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+    }
+
+
+def peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:
+        return -1.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def bench_ingest(chapters) -> Dict[str, object]:
+    from rag.index_cache import load_cached_store, load_or_build_store
+
+    stores, per_chapter = {}, []
+    for ch in chapters:
+        started = time.perf_counter()
+        store = load_or_build_store(ch.pdf_path)
+        build_s = time.perf_counter() - started
+        started = time.perf_counter()
+        load_cached_store(ch.pdf_path)
+        load_s = time.perf_counter() - started
+        stores[ch] = store
+        per_chapter.append({
+            "subject": ch.subject,
+            "chapter": ch.chapter,
+            "chunks": len(store.chunks),
+            "build_s": round(build_s, 3),
+            "warm_load_ms": round(1000 * load_s, 3),
+            "bytes": store.nbytes(),
+        })
+        print(f"ingest {ch.subject}/{ch.chapter}: {len(store.chunks)} chunks, build {build_s:.2f}s, load {1000 * load_s:.1f}ms")
+    return {"stores": stores, "chapters": per_chapter}
+
+
+def bench_search(stores, queries: Dict[object, List[str]], top_k: int) -> Dict[str, object]:
+    from rag.vector_store import embed_query
+
+    embed, search = [], []
+    for ch, store in stores.items():
+        for text in queries[ch]:
+            started = time.perf_counter()
+            query_emb = embed_query(text)
+            embedded = time.perf_counter()
+            store.search(query_emb, top_k=top_k, query_text=text)
+            embed.append(embedded - started)
+            search.append(time.perf_counter() - embedded)
+    return {"embed_query": percentiles_ms(embed), "search": percentiles_ms(search)}
+
+
+def bench_messages(chapters, queries: Dict[object, List[str]], warmup: int) -> Dict[str, object]:
+    from fastapi.testclient import TestClient
+
+    import main as api
+    from rag.metrics import STAGE_SECONDS
+
+    client = TestClient(api.app)
+    credentials = {"email": "bench@example.com", "password": "bench-password"}
+    client.post("/signup", json={**credentials, "role": "student", "standard": chapters[0].standard})
+    token = client.post("/login", json=credentials).json()["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    latencies: List[float] = []
+    errors = 0
+    for ch in chapters:
+        session = client.post(
+            "/sessions", headers=headers,
+            json={"subject": ch.subject, "chapter": ch.chapter, "standard": ch.standard},
+        ).json()
+        for i, text in enumerate(queries[ch]):
+            started = time.perf_counter()
+            response = client.post(
+                f"/sessions/{session['id']}/message", headers=headers,
+                json={"role": "user", "content": text},
+            )
+            elapsed = time.perf_counter() - started
+            if response.status_code != 200:
+                errors += 1
+            elif i >= warmup:
+                latencies.append(elapsed)
+
+    stages = {
+        key[0]: {"n": count, "mean_ms": round(1000 * total / max(1, count), 3)}
+        for key, (count, total) in sorted(STAGE_SECONDS.totals().items())
+    }
+    return {
+        "message": percentiles_ms(latencies),
+        "errors": errors,
+        "stages": stages,
+        "store_cache": api.VECTOR_STORES.stats(),
+    }
+
+
+def summarize(report: Dict[str, object]) -> Dict[str, float]:
+    """
+    Flat {metric: value} view used by --compare.
+    """
+    ingest = report["ingest"]["chapters"]
+    summary = {
+        "ingest_build_s_total": round(sum(c["build_s"] for c in ingest), 3),
+        "ingest_warm_load_ms_mean": round(float(np.mean([c["warm_load_ms"] for c in ingest])), 3),
+        "index_bytes_total": sum(c["bytes"] for c in ingest),
+        "peak_rss_mb": report["memory"]["after_e2e_mb"],
+    }
+    for name, stats in [*report["search"].items(), ("message", report["e2e"]["message"])]:
+        for key in ("p50_ms", "p99_ms"):
+            if key in stats:
+                summary[f"{name}_{key}"] = stats[key]
+    return summary
+
+
+def compare(old: Dict[str, float], new: Dict[str, float]) -> None:
+    print(f"{'metric':32} {'before':>12} {'after':>12} {'change':>8}")
+    for key, value in new.items():
+        before = old.get(key)
+        if before is None:
+            continue
+        change = f"{100 * (value - before) / before:+.1f}%" if before else "n/a"
+        print(f"{key:32} {before:>12} {value:>12} {change:>8}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--standard", default="9")
+    parser.add_argument("--subject", action="append", help="Limit to these subjects (repeatable)")
+    parser.add_argument("--queries", type=int, default=20, help="Questions per chapter")
+    parser.add_argument("--warmup", type=int, default=2, help="Messages per session left out of the e2e stats")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Simulated stub provider latency")
+    parser.add_argument("--answer-cache", action="store_true", help="Keep the semantic answer cache enabled")
+    parser.add_argument("--index-cache", help="Reuse this index cache instead of building into a temp dir")
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--out", default="bench_e2e.json")
+    parser.add_argument("--compare", help="Earlier report to diff the summary against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_e2e_") as workdir:
+        configure_env(args, Path(workdir))
+        started = time.perf_counter()
+        from benchmarks.bench_chunking import make_queries
+        from rag.index_cache import build_signature
+        from rag.ingest import discover_chapters
+        from rag.pdf_loader import iter_pdf_pages
+        import main as api  # noqa: F401  (import cost belongs to startup)
+        memory = {"after_import_mb": peak_rss_mb()}
+        startup_s = time.perf_counter() - started
+
+        chapters = [
+            ch for ch in discover_chapters(DEFAULT_STD_DIR, [args.standard])
+            if not args.subject or ch.subject in args.subject
+        ]
+        if not chapters:
+            raise SystemExit(f"No PDFs under {DEFAULT_STD_DIR / args.standard}")
+        ingest = bench_ingest(chapters)
+        memory["after_ingest_mb"] = peak_rss_mb()
+        # Only now: reading the pages fills the page-text cache, which would
+        # let the cold builds above skip PDF extraction
+        queries = {
+            ch: [q["query"] for q in make_queries(list(iter_pdf_pages(ch.pdf_path)), args.queries, args.seed)]
+            for ch in chapters
+        }
+        search = bench_search(ingest.pop("stores"), queries, args.top_k)
+        e2e = bench_messages(chapters, queries, args.warmup)
+        memory["after_e2e_mb"] = peak_rss_mb()
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "args": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "build_signature": build_signature(),
+        "startup_s": round(startup_s, 3),
+        "ingest": ingest,
+        "search": search,
+        "e2e": e2e,
+        "memory": memory,
+    }
+    report["summary"] = summarize(report)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report["summary"], indent=2))
+    print(f"Wrote {args.out}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(json.load(f).get("summary", {}), report["summary"])
+
+
+if __name__ == "__main__":
+    main()
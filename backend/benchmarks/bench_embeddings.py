@@ -0,0 +1,147 @@
+"""
+Embedding backend benchmark: output parity and CPU throughput.
+
+Encodes page chunks from the textbook PDFs with every --backend (see
+EMBEDDING_BACKEND in rag/embeddings.py) and compares each one against the
+--reference backend (torch by default):
+
+  - parity: per-text cosine between the two vectors (min/mean) and the
+    overlap of the top-k chunks retrieved for sampled queries;
+  - ingest: texts per second when encoding all chunks at --batch-size;
+  - query: p50/p99 latency of embedding one query at a time.
+
+Exits with status 1 when a backend's minimum cosine falls below
+--min-cosine or its mean top-k overlap below --min-overlap. Run from the
+backend folder:
+
+    python -m benchmarks.bench_embeddings --backend torch --backend onnx --backend onnx_int8
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from rag.embeddings import EMBEDDING_BACKENDS, EmbeddingBackend, make_backend
+from rag.pdf_loader import chunk_text, iter_pdf_pages
+
+DEFAULT_STD_DIR = Path(__file__).resolve().parent.parent.parent / "std" / "9"
+
+
+def load_texts(pdfs: List[str], limit: int, seed: int) -> List[str]:
+    chunks = [chunk for pdf in pdfs for chunk in chunk_text("".join(p + "\n" for p in iter_pdf_pages(pdf)))]
+    rng = random.Random(seed)
+    return rng.sample(chunks, min(limit, len(chunks)))
+
+
+def make_queries(texts: List[str], count: int, seed: int) -> List[str]:
+    """
+    Short queries: a run of 6-12 words from a random chunk.
+    """
+    rng = random.Random(seed)
+    queries = []
+    for text in rng.sample(texts, min(count, len(texts))):
+        words = text.split()
+        start = rng.randrange(max(1, len(words) - 12))
+        queries.append(" ".join(words[start:start + rng.randint(6, 12)]))
+    return queries
+
+
+def percentile_ms(samples: List[float], q: float) -> float:
+    return round(1000 * float(np.percentile(samples, q)), 3)
+
+
+def measure(backend: EmbeddingBackend, texts: List[str], queries: List[str], batch_size: int) -> Dict[str, object]:
+    # One untimed pass so lazy kernels and allocator pools are warm
+    backend.encode(texts[:batch_size], batch_size=batch_size)
+    started = time.perf_counter()
+    vectors = backend.encode(texts, batch_size=batch_size)
+    ingest_s = time.perf_counter() - started
+
+    latencies = []
+    query_vectors = []
+    for query in queries:
+        started = time.perf_counter()
+        query_vectors.append(backend.encode([query], batch_size=1)[0])
+        latencies.append(time.perf_counter() - started)
+    return {
+        "vectors": vectors,
+        "query_vectors": np.stack(query_vectors),
+        "ingest_texts_per_s": round(len(texts) / ingest_s, 1),
+        "ingest_s": round(ingest_s, 3),
+        "query_p50_ms": percentile_ms(latencies, 50),
+        "query_p99_ms": percentile_ms(latencies, 99),
+    }
+
+
+def parity(result: Dict[str, object], reference: Dict[str, object], k: int) -> Dict[str, float]:
+    cosine = np.sum(result["vectors"] * reference["vectors"], axis=1)
+    top = np.argsort(-result["query_vectors"] @ result["vectors"].T, axis=1)[:, :k]
+    ref_top = np.argsort(-reference["query_vectors"] @ reference["vectors"].T, axis=1)[:, :k]
+    overlap = [len(set(a) & set(b)) / k for a, b in zip(top.tolist(), ref_top.tolist())]
+    return {
+        "min_cosine": round(float(cosine.min()), 5),
+        "mean_cosine": round(float(cosine.mean()), 5),
+        f"top{k}_overlap": round(statistics.mean(overlap), 4),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", action="append", choices=EMBEDDING_BACKENDS,
+                        help="Backend to benchmark (repeatable); default: all")
+    parser.add_argument("--reference", default="torch", choices=EMBEDDING_BACKENDS)
+    parser.add_argument("--pdf", action="append", help="PDF to sample chunks from (repeatable); default: std/9")
+    parser.add_argument("--texts", type=int, default=512, help="Chunks to encode")
+    parser.add_argument("--queries", type=int, default=200, help="Single queries to time")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--k", type=int, default=5, help="Cut-off for the retrieval overlap")
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    parser.add_argument("--min-overlap", type=float, default=0.9)
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--out", default="bench_embeddings.json")
+    args = parser.parse_args()
+
+    pdfs = args.pdf or sorted(str(p) for p in DEFAULT_STD_DIR.glob("*/*.pdf"))
+    texts = load_texts(pdfs, args.texts, args.seed)
+    if not texts:
+        raise SystemExit("No text to encode; pass --pdf")
+    queries = make_queries(texts, args.queries, args.seed)
+    backends = list(dict.fromkeys([args.reference] + (args.backend or list(EMBEDDING_BACKENDS))))
+
+    results = {}
+    for name in backends:
+        started = time.perf_counter()
+        backend = make_backend(name)
+        load_s = time.perf_counter() - started
+        results[name] = {"load_s": round(load_s, 3), **measure(backend, texts, queries, args.batch_size)}
+
+    reference = results[args.reference]
+    report = {"texts": len(texts), "queries": len(queries), "batch_size": args.batch_size, "backends": {}}
+    failed = []
+    for name, result in results.items():
+        summary = {key: value for key, value in result.items() if not key.endswith("vectors")}
+        if name != args.reference:
+            summary.update(parity(result, reference, args.k))
+            summary["ingest_speedup"] = round(result["ingest_texts_per_s"] / reference["ingest_texts_per_s"], 2)
+            if summary["min_cosine"] < args.min_cosine or summary[f"top{args.k}_overlap"] < args.min_overlap:
+                failed.append(name)
+        report["backends"][name] = summary
+        print(f"{name:10} {json.dumps(summary)}")
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.out}")
+    if failed:
+        print(f"FAIL: parity with {args.reference} below --min-cosine {args.min_cosine} / "
+              f"--min-overlap {args.min_overlap}: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
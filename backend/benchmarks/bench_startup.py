@@ -0,0 +1,160 @@
+"""
+Startup benchmark: import time of the API against a budget.
+
+Imports `main` in fresh interpreters (--runs times) and reports the median
+wall time, the slowest modules from `python -X importtime`, and which
+heavy modules (torch, sentence-transformers, onnxruntime, LLM SDKs) got imported
+eagerly. With --ready it also boots uvicorn and times how long the server
+takes to accept requests and to report /ready.
+
+Exits with status 1 when the median import time exceeds --budget-s or a
+forbidden module was imported, so it can gate CI. Run from the backend
+folder:
+
+    python -m benchmarks.bench_startup --budget-s 2.5 --ready
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+HEAVY_MODULES = ["torch", "sentence_transformers", "transformers", "onnxruntime", "groq", "huggingface_hub", "ollama"]
+
+_CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import main
+elapsed = time.perf_counter() - started
+print(json.dumps({{"import_s": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+_IMPORTTIME = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def child_env(workdir: str) -> Dict[str, str]:
+    return {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'startup.db')}",
+        "LOG_LEVEL": "WARNING",
+    }
+
+
+def measure_import(env: Dict[str, str], importtime: bool) -> Dict[str, object]:
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", _CHILD.format(heavy=HEAVY_MODULES)]
+    result = subprocess.run(command, cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise SystemExit(f"Importing main failed:\n{result.stderr[-2000:]}")
+    measured = json.loads(result.stdout.strip().splitlines()[-1])
+    if importtime:
+        measured["slowest"] = slowest_imports(result.stderr)
+    return measured
+
+
+def slowest_imports(stderr: str, top: int = 15) -> List[Dict[str, object]]:
+    """
+    Top-level packages by cumulative import time, from -X importtime output.
+    """
+    totals: Dict[str, int] = {}
+    for line in stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        if match:
+            package = match.group(4).split(".")[0]
+            # The outermost entry of a package holds its cumulative time
+            totals[package] = max(totals.get(package, 0), int(match.group(2)))
+    ranked = sorted(totals.items(), key=lambda item: -item[1])[:top]
+    return [{"module": name, "cumulative_ms": round(us / 1000, 1)} for name, us in ranked]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _status(url: str) -> int:
+    try:
+        with urllib.request.urlopen(url, timeout=2) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return 0
+
+
+def measure_ready(env: Dict[str, str], timeout_s: float) -> Dict[str, float]:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    timings: Dict[str, float] = {}
+    try:
+        while time.perf_counter() - started < timeout_s:
+            if "listening_s" not in timings and _status(f"{base}/openapi.json") == 200:
+                timings["listening_s"] = round(time.perf_counter() - started, 3)
+            if "listening_s" in timings and _status(f"{base}/ready") == 200:
+                timings["ready_s"] = round(time.perf_counter() - started, 3)
+                break
+            time.sleep(0.1)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-s", type=float, default=2.5, help="Budget for the median import time of main")
+    parser.add_argument("--forbid", nargs="*", default=HEAVY_MODULES,
+                        help="Modules that must not be imported by `import main`")
+    parser.add_argument("--ready", action="store_true", help="Also time uvicorn until /ready answers 200")
+    parser.add_argument("--ready-timeout", type=float, default=300.0)
+    parser.add_argument("--out", default="bench_startup.json")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_startup_") as workdir:
+        env = child_env(workdir)
+        # First run warms the OS file cache and is left out of the stats
+        measure_import(env, importtime=False)
+        runs = [measure_import(env, importtime=False)["import_s"] for _ in range(args.runs)]
+        detail = measure_import(env, importtime=True)
+        ready = measure_ready(env, args.ready_timeout) if args.ready else {}
+
+    median_s = statistics.median(runs)
+    eager = [m for m in detail["loaded"] if m in args.forbid]
+    report = {
+        "import_median_s": round(median_s, 3),
+        "import_runs_s": [round(r, 3) for r in runs],
+        "budget_s": args.budget_s,
+        "within_budget": median_s <= args.budget_s,
+        "eagerly_imported": eager,
+        "slowest_imports": detail["slowest"],
+        **ready,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+    if not report["within_budget"] or eager:
+        print(f"FAIL: import {median_s:.2f}s (budget {args.budget_s:.2f}s), eagerly imported: {eager or 'none'}")
+        sys.exit(1)
+    print(f"OK: import {median_s:.2f}s within {args.budget_s:.2f}s budget")
+
+
+if __name__ == "__main__":
+    main()
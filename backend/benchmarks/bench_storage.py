@@ -0,0 +1,90 @@
+"""
+Vector storage benchmark: memory per 10k chunks and search latency.
+
+Compares the previous layout (IndexFlatL2 plus a float32 embedding matrix
+kept on the store) with inner-product indexes holding float32, float16,
+int8 or PQ codes and no raw matrix. Reports bytes per store scaled to 10k
+chunks, recall@k against exact float32 search and single-query p50/p99.
+Run from the backend folder:
+
+    python -m benchmarks.bench_storage --size 10000 --dim 384
+"""
+import argparse
+import json
+import time
+from typing import Dict, List
+
+import faiss
+import numpy as np
+
+from rag.vector_store import STORAGE_TYPES, build_faiss_index
+
+
+def corpus(n: int, d: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((max(1, n // 50), d)).astype("float32")
+    vectors = centres[rng.integers(0, len(centres), n)] + 0.6 * rng.standard_normal((n, d)).astype("float32")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def measure(index: faiss.Index, queries: np.ndarray, truth: np.ndarray, k: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    found = 0
+    for i, query in enumerate(queries):
+        started = time.perf_counter()
+        _, ids = index.search(query.reshape(1, -1), k)
+        latencies.append(time.perf_counter() - started)
+        found += len(set(ids[0].tolist()) & set(truth[i].tolist()))
+    return {
+        f"recall@{k}": round(found / (len(queries) * k), 4),
+        "p50_ms": round(1000 * float(np.percentile(latencies, 50)), 3),
+        "p99_ms": round(1000 * float(np.percentile(latencies, 99)), 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=10000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--out", default="bench_storage.json")
+    args = parser.parse_args()
+
+    faiss.omp_set_num_threads(1)
+    rng = np.random.default_rng(args.seed)
+    vectors = corpus(args.size, args.dim, args.seed)
+    queries = vectors[rng.integers(0, args.size, args.queries)] + 0.05 * rng.standard_normal((args.queries, args.dim)).astype("float32")
+    faiss.normalize_L2(queries)
+    exact = faiss.IndexFlatIP(args.dim)
+    exact.add(vectors)
+    _, truth = exact.search(queries, args.k)
+    scale = 10000 / args.size
+
+    legacy = faiss.IndexFlatL2(args.dim)
+    legacy.add(vectors)
+    rows = [{
+        "layout": "flat_l2 + float32 embeddings (before)",
+        "mb_per_10k": round(scale * (faiss.serialize_index(legacy).nbytes + vectors.nbytes) / 2**20, 2),
+        **measure(legacy, queries, truth, args.k),
+    }]
+    for storage in STORAGE_TYPES:
+        index = build_faiss_index(vectors, "flat", storage)
+        rows.append({
+            "layout": f"flat_ip {storage}",
+            "index": type(index).__name__,
+            "mb_per_10k": round(scale * faiss.serialize_index(index).nbytes / 2**20, 2),
+            **measure(index, queries, truth, args.k),
+        })
+    for row in rows:
+        print(json.dumps(row))
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(rows, f, indent=2)
+    print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""
+Load test: synthetic students against a running backend.
+
+Each synthetic user signs up through /signup, logs in through /login and
+opens a chat session on a chapter from /subjects. Messages then arrive
+open-loop (Poisson, --rate per second across all users) for --duration
+seconds, so an overloaded server shows up as growing latency and errors
+rather than a slower client. Throughput, p50/p90/p99 latency and error
+rate are reported per endpoint; with --stream, messages go to
+/sessions/{id}/message/stream and the time to the first token is reported too.
+
+--launch starts the mock Ollama server and a uvicorn backend pointed at it
+(LLM_PROVIDERS=ollama, a throwaway SQLite database). Run from the backend
+folder:
+
+    python -m benchmarks.load_test --launch --users 50 --rate 10 --duration 60
+    python -m benchmarks.load_test --base-url http://127.0.0.1:8000 --users 20 --stream
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks import mock_ollama
+
+DEFAULT_QUESTIONS = [
+    "What is the main idea of this chapter?",
+    "Explain the most important definition in this chapter with an example.",
+    "Summarise the chapter in five points.",
+    "What questions could come in the exam from this chapter?",
+    "Explain the difference between the two key terms used in this chapter.",
+    "Give a real-life example of the concept explained here.",
+    "Which formula or rule should I remember from this chapter?",
+    "Why is this topic important?",
+]
+
+
+def percentile_ms(samples: List[float], q: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    # Nearest-rank percentile
+    rank = min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))
+    return round(1000 * ordered[rank], 2)
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.first_token: List[float] = []
+        self.statuses: Counter = Counter()
+
+    def record(self, status: str, seconds: float) -> None:
+        self.statuses[status] += 1
+        if status.startswith("2"):
+            self.latencies.append(seconds)
+
+    def summary(self, duration_s: float) -> Dict[str, object]:
+        total = sum(self.statuses.values())
+        ok = len(self.latencies)
+        summary = {
+            "requests": total,
+            "ok": ok,
+            "error_rate": round((total - ok) / total, 4) if total else 0.0,
+            "throughput_rps": round(ok / duration_s, 3) if duration_s else 0.0,
+            **{f"p{q}_ms": percentile_ms(self.latencies, q) for q in (50, 90, 99)},
+            "max_ms": percentile_ms(self.latencies, 100),
+            "statuses": dict(self.statuses),
+        }
+        if self.first_token:
+            summary.update({f"ttft_p{q}_ms": percentile_ms(self.first_token, q) for q in (50, 99)})
+        return summary
+
+
+class LoadTest:
+    def __init__(self, client: httpx.AsyncClient, args: argparse.Namespace):
+        self.client = client
+        self.args = args
+        self.stats: Dict[str, EndpointStats] = {}
+        self.rng = random.Random(args.seed)
+        self.questions = DEFAULT_QUESTIONS
+        if args.questions:
+            with open(args.questions, "r", encoding="utf-8") as f:
+                self.questions = [line.strip() for line in f if line.strip()]
+
+    def _stats(self, endpoint: str) -> EndpointStats:
+        return self.stats.setdefault(endpoint, EndpointStats())
+
+    async def request(self, endpoint: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            self._stats(endpoint).record(type(e).__name__, time.perf_counter() - started)
+            return None
+        self._stats(endpoint).record(str(response.status_code), time.perf_counter() - started)
+        return response
+
+    async def stream_message(self, session_id: int, headers: Dict[str, str], content: str) -> None:
+        endpoint = "POST /sessions/{id}/message/stream"
+        started = time.perf_counter()
+        first_token = None
+        status = "error_event"
+        try:
+            async with self.client.stream(
+                "POST", f"/sessions/{session_id}/message/stream",
+                headers=headers, json={"role": "user", "content": content},
+            ) as response:
+                if response.status_code != 200:
+                    status = str(response.status_code)
+                else:
+                    async for line in response.aiter_lines():
+                        if first_token is None and line.startswith("data:"):
+                            first_token = time.perf_counter() - started
+                        if line.startswith("event: done"):
+                            status = "200"
+                        elif line.startswith("event: error"):
+                            break
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        stats = self._stats(endpoint)
+        stats.record(status, time.perf_counter() - started)
+        if status == "200" and first_token is not None:
+            stats.first_token.append(first_token)
+
+    async def setup_user(self, run_id: str, i: int) -> Optional[Dict[str, object]]:
+        credentials = {"email": f"load-{run_id}-{i}@example.com", "password": f"pw-{run_id}-{i}"}
+        signup = await self.request("POST /signup", "POST", "/signup",
+                                    json={**credentials, "role": "student", "standard": self.args.standard})
+        login = await self.request("POST /login", "POST", "/login", json=credentials)
+        if signup is None or login is None or login.status_code != 200:
+            return None
+        headers = {"Authorization": f"Bearer {login.json()['token']}"}
+
+        subjects = await self.request("GET /subjects", "GET", "/subjects", headers=headers)
+        choices = [
+            (s["name"], chapter)
+            for s in (subjects.json() if subjects is not None and subjects.status_code == 200 else [])
+            for chapter in s["chapters"]
+            if not self.args.subject or s["name"] in self.args.subject
+        ]
+        if not choices:
+            return None
+        subject, chapter = self.rng.choice(choices)
+        session = await self.request("POST /sessions", "POST", "/sessions", headers=headers,
+                                     json={"subject": subject, "chapter": chapter})
+        if session is None or session.status_code != 200:
+            return None
+        return {"headers": headers, "session_id": session.json()["id"]}
+
+    async def send_message(self, user: Dict[str, object]) -> None:
+        content = self.rng.choice(self.questions)
+        if self.args.stream:
+            await self.stream_message(user["session_id"], user["headers"], content)
+        else:
+            await self.request("POST /sessions/{id}/message", "POST", f"/sessions/{user['session_id']}/message",
+                               headers=user["headers"], json={"role": "user", "content": content})
+
+    async def run(self) -> Dict[str, object]:
+        run_id = uuid.uuid4().hex[:8]
+        started = time.perf_counter()
+        users = [
+            u for u in await asyncio.gather(*(self.setup_user(run_id, i) for i in range(self.args.users)))
+            if u is not None
+        ]
+        setup_s = time.perf_counter() - started
+        if not users:
+            raise SystemExit("No synthetic user could log in and open a session")
+        print(f"{len(users)}/{self.args.users} users ready in {setup_s:.1f}s")
+
+        tasks = []
+        started = time.perf_counter()
+        deadline = started + self.args.duration
+        next_at = started
+        while True:
+            next_at += self.rng.expovariate(self.args.rate)
+            if next_at >= deadline:
+                break
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+            tasks.append(asyncio.ensure_future(self.send_message(self.rng.choice(users))))
+        await asyncio.gather(*tasks)
+        duration_s = time.perf_counter() - started
+
+        return {
+            "users": len(users),
+            "setup_s": round(setup_s, 2),
+            "duration_s": round(duration_s, 2),
+            "messages_sent": len(tasks),
+            "endpoints": {name: s.summary(duration_s) for name, s in sorted(self.stats.items())},
+        }
+
+
+def launch_backend(args: argparse.Namespace, workdir: str) -> subprocess.Popen:
+    mock = mock_ollama.serve("127.0.0.1", 0, mock_ollama.config_from_args(args))
+    env = {
+        **os.environ,
+        "LLM_PROVIDERS": "ollama",
+        "OLLAMA_HOST": f"http://127.0.0.1:{mock.server_address[1]}",
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'load.db')}",
+        "LOG_LEVEL": os.getenv("LOG_LEVEL", "WARNING"),
+    }
+    port = httpx.URL(args.base_url).port or 8000
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(args.workers),
+         "--log-level", "warning"],
+        cwd=Path(__file__).resolve().parent.parent,
+        env=env,
+    )
+
+
+async def wait_until_up(base_url: str, timeout_s: float) -> None:
+    deadline = time.monotonic() + timeout_s
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/openapi.json")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.5)
+    raise SystemExit(f"Backend at {base_url} did not come up within {timeout_s:.0f}s")
+
+
+async def run(args: argparse.Namespace) -> Dict[str, object]:
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        return await LoadTest(client, args).run()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--rate", type=float, default=5.0, help="Messages per second across all users")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of message traffic")
+    parser.add_argument("--stream", action="store_true", help="Use the SSE message endpoint")
+    parser.add_argument("--standard", default="9")
+    parser.add_argument("--subject", action="append", help="Limit sessions to these subjects (repeatable)")
+    parser.add_argument("--questions", help="File with one question per line")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--max-connections", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", default="load_test.json")
+    launch = parser.add_argument_group("--launch: local backend with the mock Ollama server")
+    launch.add_argument("--launch", action="store_true")
+    launch.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    launch.add_argument("--startup-timeout", type=float, default=300.0)
+    mock_ollama.add_arguments(launch)
+    args = parser.parse_args()
+
+    backend = None
+    with tempfile.TemporaryDirectory(prefix="load_test_") as workdir:
+        try:
+            if args.launch:
+                backend = launch_backend(args, workdir)
+                asyncio.run(wait_until_up(args.base_url, args.startup_timeout))
+            report = asyncio.run(run(args))
+        finally:
+            if backend is not None:
+                backend.terminate()
+                backend.wait(timeout=30)
+
+    report["args"] = {k: v for k, v in vars(args).items() if k != "out"}
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    for name, summary in report["endpoints"].items():
+        print(f"{name:40} {summary['requests']:>6} req  {summary['throughput_rps']:>8} rps  "
+              f"p50 {summary['p50_ms']} ms  p99 {summary['p99_ms']} ms  errors {summary['error_rate']:.2%}")
+    print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Local stand-in for the Ollama HTTP API, for load tests.
+
+Serves POST /api/chat (streamed NDJSON or a single JSON reply) plus
+/api/tags and /api/version, so the backend's OllamaProvider talks to it
+unchanged. Replies are canned text whose timing is configurable:
+--latency-ms before the first token, --token-ms between tokens, with
+optional jitter and a share of 500 errors. Point the backend at it with:
+
+    python -m benchmarks.mock_ollama --port 11435 --latency-ms 300 --token-ms 20
+    OLLAMA_HOST=http://127.0.0.1:11435 LLM_PROVIDERS=ollama uvicorn main:app
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+DEFAULT_REPLY = (
+    "Based on the chapter, the answer is explained step by step below. "
+    "First, recall the definition from the context. Then apply it to the example "
+    "in the question, checking each quantity. Finally, summarise the result in one line."
+)
+
+
+class MockConfig:
+    def __init__(self, latency_ms: float = 200.0, token_ms: float = 15.0, jitter_ms: float = 0.0,
+                 error_rate: float = 0.0, reply: str = DEFAULT_REPLY, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.token_ms = token_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.tokens: List[str] = [w + " " for w in reply.split()]
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def delay(self, base_ms: float) -> None:
+        with self._lock:
+            jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        time.sleep(max(0.0, base_ms + jitter) / 1000.0)
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            return self._rng.random() < self.error_rate
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class OllamaHandler(BaseHTTPRequestHandler):
+    config: MockConfig = MockConfig()
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def _send_json(self, status: int, body: dict) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self) -> None:
+        if self.path == "/api/tags":
+            self._send_json(200, {"models": [{"name": "mock", "model": "mock"}]})
+        elif self.path == "/api/version":
+            self._send_json(200, {"version": "0.0.0-mock"})
+        elif self.path == "/":
+            self._send_json(200, {"status": "Ollama is running"})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "invalid JSON"})
+            return
+        if self.path != "/api/chat":
+            self._send_json(404, {"error": "not found"})
+            return
+
+        cfg = self.config
+        model = request.get("model", "mock")
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in request.get("messages", []))
+        cfg.delay(cfg.latency_ms)
+        if cfg.should_fail():
+            self._send_json(500, {"error": "mock failure"})
+            return
+
+        final = {
+            "model": model,
+            "created_at": _now(),
+            "message": {"role": "assistant", "content": ""},
+            "done": True,
+            "done_reason": "stop",
+            "prompt_eval_count": prompt_tokens,
+            "eval_count": len(cfg.tokens),
+        }
+        if not request.get("stream", True):
+            for _ in cfg.tokens[1:]:
+                cfg.delay(cfg.token_ms)
+            final["message"]["content"] = "".join(cfg.tokens)
+            self._send_json(200, final)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for i, token in enumerate(cfg.tokens):
+                if i:
+                    cfg.delay(cfg.token_ms)
+                self._write_chunk({"model": model, "created_at": _now(),
+                                   "message": {"role": "assistant", "content": token}, "done": False})
+            final["created_at"] = _now()
+            self._write_chunk(final)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _write_chunk(self, body: dict) -> None:
+        line = json.dumps(body).encode("utf-8") + b"\n"
+        self.wfile.write(f"{len(line):x}\r\n".encode("ascii") + line + b"\r\n")
+        self.wfile.flush()
+
+
+def serve(host: str, port: int, config: MockConfig) -> ThreadingHTTPServer:
+    """
+    Start the mock in a daemon thread and return the server (port 0 picks a
+    free one; see server.server_address).
+    """
+    handler = type("ConfiguredOllamaHandler", (OllamaHandler,), {"config": config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Delay before the first token")
+    parser.add_argument("--token-ms", type=float, default=15.0, help="Delay between streamed tokens")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform +/- jitter on every delay")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with a 500")
+    parser.add_argument("--reply", default=DEFAULT_REPLY)
+
+
+def config_from_args(args: argparse.Namespace) -> MockConfig:
+    return MockConfig(args.latency_ms, args.token_ms, args.jitter_ms, args.error_rate, args.reply, args.seed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--seed", type=int, default=None)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, config_from_args(args))
+    print(f"Mock Ollama listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,46 @@
+import asyncio
+import json
+import logging
 import os
+import time
 from pathlib import Path
-from typing import Dict, List
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 
+import numpy as np
 from dotenv import load_dotenv
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 # Load environment variables from .env file
 load_dotenv()
+# Before the rag imports, so messages they log at import time are kept
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
 
 # Get the project root directory (parent of Backend folder)
 # In AI-chatboat/backend/main.py, parent is AI-chatboat
 PROJECT_ROOT = Path(__file__).parent.parent
 
 from auth import auth as auth_utils, models, schemas
-from database import Base, engine, get_db
-from rag.pdf_loader import load_pdf_text, chunk_text
-from rag.vector_store import VectorStore, embed_query
-from rag.advanced_nlp import rewrite_query, generate_answer
+from database import Base, SessionLocal, engine, get_db
+from rag.content import ContentCatalog
+from rag.index_cache import load_or_build_store, load_or_build_standard_index
+from rag.query_rewrite import QueryRewriter, local_rewrite
+from rag.sources import source_hash
+from rag.standard_index import NoStandardContent, StandardIndex
+from rag.store_cache import StoreCache
+from rag.vector_store import VectorStore, aembed_query, create_embeddings, query_batcher, query_cache
+from rag.advanced_nlp import LLM_INFLIGHT, LLM_ROUTER, UNAVAILABLE_MESSAGE, agenerate_answer, astream_answer
+from rag.llm_router import StreamInterrupted
+from rag.answer_cache import SemanticAnswerCache
+from rag.executor import run_cpu
+from rag.metrics import REGISTRY, gauge, histogram, span
 from rbac.roles import role_required
 
+logger = logging.getLogger("rag.chat")
+
 
 app = FastAPI(title="RBAC Educational Chatbot")
 
@@ -42,82 +62,98 @@ Base.metadata.create_all(bind=engine)
 # PROJECT_ROOT is AI-chatboat
 STD_DIR = PROJECT_ROOT / "std"
 
-VECTOR_STORES: Dict[str, Dict[str, VectorStore]] = {}
+# Scanned once; re-checks folder/PDF mtimes at most every CONTENT_REFRESH_SECONDS
+CONTENT_CATALOG = ContentCatalog(
+    STD_DIR, refresh_interval=float(os.getenv("CONTENT_REFRESH_SECONDS", "5"))
+)
+
+# Retrieval query strategy (QUERY_REWRITE_STRATEGY): off/local/cache/llm/speculative
+QUERY_REWRITER = QueryRewriter(cache=query_cache)
+
+# Semantic answer cache for near-identical questions on the same chapter
+ANSWER_CACHE = SemanticAnswerCache()
+
+# Loaded chapter stores and merged standard indexes, LRU-evicted past
+# VECTOR_STORE_CACHE_MB or VECTOR_STORE_CACHE_ENTRIES. Evicted entries are
+# reloaded from the index cache.
+VECTOR_STORES = StoreCache(
+    max_bytes=int(os.getenv("VECTOR_STORE_CACHE_MB", "512")) * 1024 * 1024,
+    max_entries=int(os.getenv("VECTOR_STORE_CACHE_ENTRIES", "256")),
+)
+
+HTTP_REQUEST_SECONDS = histogram(
+    "http_request_seconds",
+    "Seconds until the response starts, per route.",
+    ("method", "route", "status"),
+)
+gauge(
+    "vector_store_cache_bytes", "Approximate bytes held by loaded vector stores.",
+    lambda: {(): VECTOR_STORES.stats()["bytes"]},
+)
+gauge(
+    "answer_cache_events", "Semantic answer cache counters.",
+    lambda: {(k,): v for k, v in ANSWER_CACHE.stats().items() if k != "hit_rate"}, ("event",),
+)
+gauge(
+    "llm_coalescing", "In-flight LLM prompt coalescing counters.",
+    lambda: {(k,): v for k, v in LLM_INFLIGHT.stats().items()}, ("event",),
+)
+gauge(
+    "llm_circuit_open", "1 if the provider's circuit breaker is open.",
+    lambda: {(name,): int(p["circuit"] == "open") for name, p in LLM_ROUTER.stats()["providers"].items()},
+    ("provider",),
+)
+
+
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.observe(
+        time.perf_counter() - started,
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=str(response.status_code),
+    )
+    return response
+
 
 def get_available_content(standard: str = None) -> Dict[str, Dict[str, str]]:
     """
-    Scans the std directory for content.
+    Returns the memoized std directory content.
     If standard is provided, returns subjects/chapters for that standard.
     Returns: { "subject_name": { "chapter_name": "absolute_path_to_pdf" } }
     """
-    content_map = {}
-    
-    if not STD_DIR.exists():
-        return content_map
-
-    # If standard is specified, look only in that folder
-    if not standard:
-        return content_map
-
-    std_path = STD_DIR / standard
-    if not std_path.exists():
-        return content_map
-
-    # Scan subjects (subdirectories in std/{standard})
-    for subject_path in std_path.iterdir():
-        if subject_path.is_dir():
-            subject_name = subject_path.name
-            chapters = {}
-            # Scan chapters (PDF files in std/{standard}/{subject})
-            for file_path in subject_path.glob("*.pdf"):
-                chapter_name = file_path.stem  # filename without extension
-                chapters[chapter_name] = str(file_path.resolve())
-            
-            if chapters:
-                content_map[subject_name] = chapters
-    
-    return content_map
+    return CONTENT_CATALOG.content(standard)
 
 
 def get_vector_store(subject: str, chapter: str, standard: str) -> VectorStore:
-    # Key needs to include standard now to avoid collisions between standards
-    store_key = f"{standard}_{subject}_{chapter}".lower()
-    
-    # Check memory cache first
-    if store_key in VECTOR_STORES:
-        return VECTOR_STORES[store_key]
-
-    # Resolve path dynamically
-    content = get_available_content(standard)
-    
-    # Case insensitive lookup
-    subject_map = {k.lower(): k for k in content.keys()}
-    s_key = subject.lower()
-    
-    if s_key not in subject_map:
+    # Resolve path via the catalog's precomputed case-insensitive lookups
+    real_subject_name = CONTENT_CATALOG.resolve_subject(standard, subject)
+    if real_subject_name is None:
          raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Subject '{subject}' not found for Standard {standard}",
         )
-    
-    real_subject_name = subject_map[s_key]
-    chapters_map = {k.lower(): k for k in content[real_subject_name].keys()}
-    c_key = chapter.lower()
 
-    if c_key not in chapters_map:
+    resolved = CONTENT_CATALOG.resolve_chapter(standard, real_subject_name, chapter)
+    if resolved is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Chapter '{chapter}' not found in {real_subject_name} (Std {standard})",
         )
 
-    pdf_path = content[real_subject_name][chapters_map[c_key]]
-    
+    _, pdf_path = resolved
+
     try:
-        raw_text = load_pdf_text(pdf_path)
-        chunks = chunk_text(raw_text)
-        store = VectorStore(chunks)
-        VECTOR_STORES[store_key] = store
-        return store
+        # Key needs to include standard now to avoid collisions between standards.
+        # The PDF's content hash makes only an edited chapter reload.
+        store_key = f"{standard}_{subject}_{chapter}_{source_hash(pdf_path)}".lower()
+
+        # Memory cache first; on a miss, concurrent requests for the same chapter
+        # share one load of the persisted index (re-ingesting only if the PDF changed)
+        return VECTOR_STORES.get_or_load(store_key, lambda: load_or_build_store(pdf_path))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -125,6 +161,28 @@ def get_vector_store(subject: str, chapter: str, standard: str) -> VectorStore:
         )
 
 
+def get_standard_index(standard: str) -> StandardIndex:
+    """
+    Return the merged index over every chapter of a standard.
+    """
+    content = get_available_content(standard)
+    # Changes when a chapter of this standard is added, removed or edited
+    index_key = f"standard:{standard}:{CONTENT_CATALOG.standard_generation(standard)}"
+    if not content:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No course material found for Standard {standard}",
+        )
+
+    try:
+        return VECTOR_STORES.get_or_load(
+            index_key, lambda: load_or_build_standard_index(standard, content)
+        )
+    except NoStandardContent as e:
+        # Not cached, so the next request retries the chapters
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+
 @app.post("/signup", response_model=schemas.Token)
 def signup(data: dict, db: Session = Depends(get_db)):
     """
@@ -261,6 +319,96 @@ def list_subjects(
     return subjects
 
 
+@app.get("/stats")
+def pipeline_stats(user: schemas.UserRead = Depends(role_required("teacher"))):
+    """
+    Cache counters, per-strategy query rewrite latency and LLM provider
+    health for this process.
+    """
+    return {
+        "vector_stores": VECTOR_STORES.stats(),
+        "answer_cache": ANSWER_CACHE.stats(),
+        "query_embedding_batcher": query_batcher.stats(),
+        "query_cache": query_cache.stats(),
+        "query_rewrite": {
+            "strategy": QUERY_REWRITER.strategy,
+            "latency": QUERY_REWRITER.stats(),
+        },
+        "llm": LLM_ROUTER.stats(),
+        "llm_coalescing": LLM_INFLIGHT.stats(),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Prometheus text exposition of stage, HTTP and LLM provider metrics.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+# Heavy state (embedding model, LLM SDK clients) loads lazily on first use.
+# With WARMUP_ON_STARTUP each worker loads it in the background right after
+# boot instead, and /ready reports 503 until that is done. WARMUP_STANDARDS
+# (e.g. "9,10") also preloads those merged standard indexes.
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "1") == "1"
+WARMUP_STANDARDS = [s.strip() for s in os.getenv("WARMUP_STANDARDS", "").split(",") if s.strip()]
+READINESS: Dict[str, object] = {"ready": not WARMUP_ON_STARTUP, "steps": {}, "error": None}
+_warm_up_task: Optional[asyncio.Task] = None
+
+
+def warm_up() -> Dict[str, float]:
+    """
+    Load the embedding model (with one forward pass), create the LLM clients
+    and preload WARMUP_STANDARDS. Returns seconds per step.
+    """
+    steps: Dict[str, float] = {}
+    started = time.perf_counter()
+    create_embeddings(["warm up"])
+    steps["embedding_model"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    LLM_ROUTER.warm_up()
+    steps["llm_clients"] = time.perf_counter() - started
+
+    for standard in WARMUP_STANDARDS:
+        started = time.perf_counter()
+        try:
+            get_standard_index(standard)
+        except HTTPException as e:
+            logger.warning("Warm-up skipped standard %s: %s", standard, e.detail)
+        steps[f"standard_{standard}"] = time.perf_counter() - started
+    return {name: round(seconds, 3) for name, seconds in steps.items()}
+
+
+async def _run_warm_up() -> None:
+    started = time.perf_counter()
+    try:
+        READINESS["steps"] = await run_cpu(warm_up)
+    except Exception as e:
+        logger.exception("Warm-up failed: %s", e)
+        READINESS["error"] = str(e)
+    READINESS["seconds"] = round(time.perf_counter() - started, 3)
+    # Requests still work after a failed warm-up; they load lazily instead
+    READINESS["ready"] = True
+    logger.info("Warm-up finished in %.2fs", READINESS["seconds"])
+
+
+@app.on_event("startup")
+async def start_warm_up():
+    global _warm_up_task
+    if WARMUP_ON_STARTUP:
+        _warm_up_task = asyncio.create_task(_run_warm_up())
+
+
+@app.get("/ready")
+def ready():
+    """
+    Readiness probe: 200 once warm-up has finished, 503 while it runs.
+    """
+    return JSONResponse(READINESS, status_code=200 if READINESS["ready"] else 503)
+
+
 # --- Chat History Endpoints ---
 
 @app.post("/sessions", response_model=schemas.ChatSessionRead)
@@ -333,8 +481,116 @@ def get_session(
     return session
 
 
+NO_CONTEXT_ANSWER = "I could not find any relevant information in the course material for this question."
+
+
+async def retrieve_chunks(store: VectorStore, question: str, top_k: int = 5) -> List[Tuple[str, float]]:
+    """
+    Turn the question into a retrieval query (per QUERY_REWRITE_STRATEGY) and
+    return (chunk, distance) hits from hybrid dense + BM25 search. Embedding is
+    batched; search runs on the CPU executor.
+    """
+    async def search(text: str) -> List[Tuple[str, float]]:
+        with span("embed_query"):
+            query_emb = await aembed_query(text)
+        with span("search"):
+            return await run_cpu(store.search, query_emb, top_k=top_k, query_text=text)
+
+    with span("retrieve"):
+        return await QUERY_REWRITER.retrieve(question, search, top_k=top_k)
+
+
+def _answer_key(standard: str, subject: str, chapter: str, role: str, language: str) -> Tuple[str, ...]:
+    return tuple((part or "").lower() for part in (standard, subject, chapter, role, language))
+
+
+async def lookup_cached_answer(key: Tuple[str, ...], question: str, version: str) -> Tuple[Optional[str], np.ndarray]:
+    """
+    Check the semantic answer cache. Returns (answer or None, query embedding);
+    pass the embedding to remember_answer after generating on a miss.
+    """
+    with span("answer_cache_lookup"):
+        query_emb = await aembed_query(local_rewrite(question))
+        return ANSWER_CACHE.lookup(key, query_emb, version), query_emb
+
+
+def remember_answer(key: Tuple[str, ...], query_emb: np.ndarray, answer: str, version: str) -> None:
+    # Provider failures are not worth replaying to the next student
+    if answer and answer != UNAVAILABLE_MESSAGE:
+        ANSWER_CACHE.store(key, query_emb, answer, version)
+
+
+def _get_user_session(db: Session, session_id: int, user: schemas.UserRead) -> models.ChatSession:
+    session = (
+        db.query(models.ChatSession)
+        .filter(models.ChatSession.id == session_id, models.ChatSession.user_id == user.id)
+        .first()
+    )
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
+
+def _save_message(db: Session, session_id: int, role: str, content: str) -> None:
+    db.add(models.ChatMessage(session_id=session_id, role=role, content=content))
+    db.commit()
+
+
+def _save_message_new_session(session_id: int, role: str, content: str) -> None:
+    # Used after a stream ends, when the request's DB session is already closed
+    db = SessionLocal()
+    try:
+        _save_message(db, session_id, role, content)
+    finally:
+        db.close()
+
+
+def _sse(data: dict, event: str = None) -> str:
+    """
+    Format one Server-Sent Events frame.
+    """
+    frame = f"event: {event}\n" if event else ""
+    return frame + f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _stream_sse(
+    tokens: AsyncIterator[str],
+    on_complete: Callable[[str], Awaitable[None]] = None,
+) -> AsyncIterator[str]:
+    """
+    Forward provider tokens as SSE `token` frames, then a final `done` frame
+    carrying the full answer. `on_complete` runs once the stream has finished;
+    a stream that fails midway ends with an `error` frame instead and the
+    partial answer is neither saved nor cached.
+    """
+    parts: List[str] = []
+    try:
+        with span("generate_answer_stream"):
+            async for token in tokens:
+                parts.append(token)
+                yield _sse({"token": token})
+    except StreamInterrupted as e:
+        logger.warning("Discarding partial streamed answer: %s", e)
+        yield _sse({"detail": "The answer was interrupted. Please ask again.", "partial": True}, event="error")
+        return
+    except Exception as e:
+        logger.exception("Error while streaming answer: %s", e)
+        yield _sse({"detail": f"An error occurred: {str(e)}"}, event="error")
+        return
+
+    answer_text = "".join(parts)
+    if on_complete:
+        with span("db_commit"):
+            await on_complete(answer_text)
+    yield _sse({"answer": answer_text}, event="done")
+
+
+async def _single_token(text: str) -> AsyncIterator[str]:
+    yield text
+
+
 @app.post("/sessions/{session_id}/message", response_model=schemas.ChatResponse)
-def send_message_to_session(
+async def send_message_to_session(
     session_id: int,
     payload: schemas.ChatMessageCreate,
     user: schemas.UserRead = Depends(auth_utils.get_current_user),
@@ -345,68 +601,113 @@ def send_message_to_session(
     Saves both messages to the database.
     """
     # 1. Verify Session
-    session = (
-        db.query(models.ChatSession)
-        .filter(models.ChatSession.id == session_id, models.ChatSession.user_id == user.id)
-        .first()
-    )
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
+    with span("session_lookup"):
+        session = await run_in_threadpool(_get_user_session, db, session_id, user)
+    # Detach so later commits don't expire attributes read on the event loop
+    db.expunge(session)
 
     # 2. Save User Message
-    user_msg = models.ChatMessage(
-        session_id=session.id,
-        role="user",
-        content=payload.content
-    )
-    db.add(user_msg)
-    db.commit()
+    with span("db_commit"):
+        await run_in_threadpool(_save_message, db, session.id, "user", payload.content)
 
     # 3. Generate AI Response (Reuse existing logic)
     try:
         # Load vector store (caches internally)
-        store = get_vector_store(session.subject, session.chapter, session.standard)
-        
-        # Rewrite query using Ollama
-        rewritten = rewrite_query(payload.content)
-
-        # Embed rewritten query
-        query_emb = embed_query(rewritten)
-        
-        # Search
-        results = store.search(query_emb, top_k=5)
-        retrieved_chunks: List[str] = [chunk for chunk, _ in results]
-        
-        answer_text = ""
-        
-        if not retrieved_chunks:
-            answer_text = "I could not find any relevant information in the course material for this question."
-        else:
-            context_text = "\n\n".join(retrieved_chunks)
-            # Generate answer using Ollama
-            answer_text = generate_answer(user.role, context_text, payload.content, session.language)
+        with span("get_vector_store"):
+            store = await run_cpu(get_vector_store, session.subject, session.chapter, session.standard)
+
+        # Near-identical questions on this chapter reuse a stored answer
+        cache_key = _answer_key(session.standard, session.subject, session.chapter, user.role, session.language)
+        answer_text, query_emb = await lookup_cached_answer(cache_key, payload.content, store.source_id)
+
+        if answer_text is None:
+            # Rewrite, embed and search
+            results = await retrieve_chunks(store, payload.content)
+            retrieved_chunks: List[str] = [chunk for chunk, _ in results]
+
+            if not retrieved_chunks:
+                answer_text = NO_CONTEXT_ANSWER
+            else:
+                context_text = "\n\n".join(retrieved_chunks)
+                # Generate answer using Ollama
+                with span("generate_answer"):
+                    answer_text = await agenerate_answer(user.role, context_text, payload.content, session.language)
+                remember_answer(cache_key, query_emb, answer_text, store.source_id)
 
         # 4. Save AI Message
-        ai_msg = models.ChatMessage(
-            session_id=session.id,
-            role="assistant",
-            content=answer_text
-        )
-        db.add(ai_msg)
-        db.commit()
+        with span("db_commit"):
+            await run_in_threadpool(_save_message, db, session.id, "assistant", answer_text)
 
         return schemas.ChatResponse(answer=answer_text)
 
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error in chat session: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred: {str(e)}"
+        )
+
+
+@app.post("/sessions/{session_id}/message/stream")
+async def stream_message_to_session(
+    session_id: int,
+    payload: schemas.ChatMessageCreate,
+    user: schemas.UserRead = Depends(auth_utils.get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Streaming variant of /sessions/{session_id}/message.
+    Responds with Server-Sent Events: `data: {"token": ...}` frames as the model
+    generates, then `event: done` with the full answer. The assistant message
+    is saved once the stream completes; an interrupted stream ends with
+    `event: error` and saves nothing.
+    """
+    with span("session_lookup"):
+        session = await run_in_threadpool(_get_user_session, db, session_id, user)
+    db.expunge(session)
+    with span("db_commit"):
+        await run_in_threadpool(_save_message, db, session.id, "user", payload.content)
+
+    cache_key = _answer_key(session.standard, session.subject, session.chapter, user.role, session.language)
+    try:
+        with span("get_vector_store"):
+            store = await run_cpu(get_vector_store, session.subject, session.chapter, session.standard)
+        cached, query_emb = await lookup_cached_answer(cache_key, payload.content, store.source_id)
+        results = [] if cached is not None else await retrieve_chunks(store, payload.content)
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error in chat session: {e}")
+        logger.exception("Error in chat session: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"An error occurred: {str(e)}"
         )
 
+    retrieved_chunks: List[str] = [chunk for chunk, _ in results]
+    generated = False
+    if cached is not None:
+        tokens = _single_token(cached)
+    elif not retrieved_chunks:
+        tokens = _single_token(NO_CONTEXT_ANSWER)
+    else:
+        context_text = "\n\n".join(retrieved_chunks)
+        tokens = astream_answer(user.role, context_text, payload.content, session.language)
+        generated = True
+
+    chat_session_id = session.id
+
+    async def persist(answer_text: str) -> None:
+        if generated:
+            remember_answer(cache_key, query_emb, answer_text, store.source_id)
+        await run_in_threadpool(_save_message_new_session, chat_session_id, "assistant", answer_text)
+
+    return StreamingResponse(_stream_sse(tokens, on_complete=persist), media_type="text/event-stream")
+
 
 @app.post("/chat", response_model=schemas.ChatResponse)
-def chat(
+async def chat(
     payload: schemas.ChatRequest,
     user: schemas.UserRead = Depends(role_required("student", "teacher")),
 ):
@@ -422,58 +723,95 @@ def chat(
          raise HTTPException(status_code=400, detail="Standard not found for user")
 
     try:
-        
-        store = get_vector_store(payload.subject, payload.chapter, std)
-        
-        print(f"\n=== DEBUG: Chat Request ===")
-        print(f"Subject: {payload.subject}, Chapter: {payload.chapter}")
-        print(f"Question: {payload.question}")
-        print(f"User Role: {user.role}")
-        
-        
-        rewritten = rewrite_query(payload.question)
-        print(f"Rewritten Query: {rewritten}")
+        with span("get_vector_store"):
+            store = await run_cpu(get_vector_store, payload.subject, payload.chapter, std)
 
+        logger.debug(
+            "chat request subject=%s chapter=%s role=%s question=%r",
+            payload.subject, payload.chapter, user.role, payload.question,
+        )
+
+        cache_key = _answer_key(std, payload.subject, payload.chapter, user.role, payload.language)
+        cached, query_emb = await lookup_cached_answer(cache_key, payload.question, store.source_id)
+        if cached is not None:
+            logger.debug("answer served from semantic cache")
+            return schemas.ChatResponse(answer=cached)
         
-        query_emb = embed_query(rewritten)
-        
-            
-        results = store.search(query_emb, top_k=5)
+        results = await retrieve_chunks(store, payload.question)
         retrieved_chunks: List[str] = [chunk for chunk, _ in results]
         
-        print(f"\n=== Retrieved {len(retrieved_chunks)} chunks ===")
+        logger.debug("retrieved %d chunks", len(retrieved_chunks))
         for i, (chunk, distance) in enumerate(results):
-            print(f"Chunk {i+1} (distance: {distance:.4f}): {chunk[:200]}...")
+            logger.debug("chunk %d distance=%.4f %r", i + 1, distance, chunk[:200])
 
         if not retrieved_chunks:
-            print("WARNING: No chunks retrieved!")
-            return schemas.ChatResponse(
-                answer="I could not find any relevant information in the course material for this question."
-            )
+            logger.warning("No chunks retrieved for %s / %s", payload.subject, payload.chapter)
+            return schemas.ChatResponse(answer=NO_CONTEXT_ANSWER)
 
         # 4) SKIP Compression (Cost Optimization)
         # We pass raw chunks directly to the model.
         context_text = "\n\n".join(retrieved_chunks)
-        print(f"\n=== Context (Raw Chunks) ===")
-        print(f"{context_text[:500]}...")
 
         # 5) Generate answer using Ollama
-        answer_text = generate_answer(user.role, context_text, payload.question, payload.language)
-        print(f"\n=== Generated Answer ===")
-        try:
-            print(f"{answer_text[:300]}...")
-        except UnicodeEncodeError:
-            print(f"{answer_text[:300].encode('utf-8', errors='ignore').decode('ascii', errors='ignore')}... (Unicode chars hidden)")
+        with span("generate_answer"):
+            answer_text = await agenerate_answer(user.role, context_text, payload.question, payload.language)
+        remember_answer(cache_key, query_emb, answer_text, store.source_id)
+        logger.debug("generated answer %r", answer_text[:300])
 
         return schemas.ChatResponse(answer=answer_text)
 
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("General Error: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while processing your request: {str(e)}"
+        )
+
+
+@app.post("/chat/stream")
+async def chat_stream(
+    payload: schemas.ChatRequest,
+    user: schemas.UserRead = Depends(role_required("student", "teacher")),
+):
+    """
+    Streaming variant of /chat, using the same Server-Sent Events framing as
+    /sessions/{session_id}/message/stream.
+    """
+    std = user.standard
+    if not std:
+         raise HTTPException(status_code=400, detail="Standard not found for user")
+
+    cache_key = _answer_key(std, payload.subject, payload.chapter, user.role, payload.language)
+    try:
+        with span("get_vector_store"):
+            store = await run_cpu(get_vector_store, payload.subject, payload.chapter, std)
+        cached, query_emb = await lookup_cached_answer(cache_key, payload.question, store.source_id)
+        results = [] if cached is not None else await retrieve_chunks(store, payload.question)
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"General Error: {e}")
+        logger.exception("General Error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"An error occurred while processing your request: {str(e)}"
         )
 
+    retrieved_chunks: List[str] = [chunk for chunk, _ in results]
+    if cached is not None:
+        return StreamingResponse(_stream_sse(_single_token(cached)), media_type="text/event-stream")
+    if not retrieved_chunks:
+        return StreamingResponse(_stream_sse(_single_token(NO_CONTEXT_ANSWER)), media_type="text/event-stream")
+
+    context_text = "\n\n".join(retrieved_chunks)
+    tokens = astream_answer(user.role, context_text, payload.question, payload.language)
+
+    async def remember(answer_text: str) -> None:
+        remember_answer(cache_key, query_emb, answer_text, store.source_id)
+
+    return StreamingResponse(_stream_sse(tokens, on_complete=remember), media_type="text/event-stream")
+
 
 # --- Student Dashboard Endpoints ---
 
@@ -527,7 +865,7 @@ def get_student_stats(
 
 
 @app.post("/student/ask-ai-doubt")
-def ask_ai_doubt(
+async def ask_ai_doubt(
     data: dict,
     user: schemas.UserRead = Depends(auth_utils.get_current_user), 
 ):
@@ -535,35 +873,29 @@ def ask_ai_doubt(
     if not question:
          return {"answer": "Please ask a question."}
 
-    # "Global Search" across all chapters of the standard
-    print(f"Global search for: {question} (Std {user.standard})")
-    
+    # "Global Search" across all chapters of the standard, optionally one subject
+    subject = data.get("subject")
+    logger.debug("global search std=%s question=%r", user.standard, question)
+
     try:
-        content = get_available_content(user.standard)
-        all_results = []
-        
-        # Rewrite once
-        rewritten = rewrite_query(question)
-        query_emb = embed_query(rewritten)
-
-        # Iterate all chapters
-        for sub, chapters in content.items():
-            for chap in chapters.keys():
-                try:
-                    # Load store
-                    store = get_vector_store(sub, chap, user.standard)
-                    # Search
-                    # We get (text, distance)
-                    results = store.search(query_emb, top_k=2) # Get top 2 from each
-                    for txt, dist in results:
-                        all_results.append((dist, txt))
-                except Exception as err:
-                    pass
-        
-        all_results.sort(key=lambda x: x[0])
-        
-        # Take top 5 globally
-        top_chunks = [txt for dist, txt in all_results[:5]]
+        with span("get_vector_store"):
+            index = await run_cpu(get_standard_index, user.standard)
+
+        cache_key = _answer_key(user.standard, subject or "*", "*", user.role, "English")
+        cached, query_emb = await lookup_cached_answer(cache_key, question, index.source_id)
+        if cached is not None:
+            return {"answer": cached}
+
+        # Single search over the merged index; results carry subject/chapter
+        async def search(text: str):
+            with span("embed_query"):
+                query_emb = await aembed_query(text)
+            with span("search"):
+                return await run_cpu(index.search, query_emb, top_k=5, subject=subject, query_text=text)
+
+        with span("retrieve"):
+            results = await QUERY_REWRITER.retrieve(question, search, top_k=5)
+        top_chunks = [txt for txt, _, _, _ in results]
         
         if not top_chunks:
             return {"answer": "I could not find any relevant information in your course materials."}
@@ -571,10 +903,14 @@ def ask_ai_doubt(
         context_text = "\n\n".join(top_chunks)
         
         # Generate Answer
-        answer = generate_answer(user.role, context_text, question, "English")
+        with span("generate_answer"):
+            answer = await agenerate_answer(user.role, context_text, question, "English")
+        remember_answer(cache_key, query_emb, answer, index.source_id)
         
         return {"answer": answer}
 
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Global search error: {e}")
+        logger.exception("Global search error: %s", e)
         return {"answer": "I encountered an error while searching your books. Please try again."}
@@ -1,30 +1,65 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Iterator
+import hashlib
+import json
+import logging
 import os
-import ollama
-from groq import Groq
-from huggingface_hub import InferenceClient
+
+from rag.llm_router import (
+    GroqProvider,
+    HuggingFaceProvider,
+    LazyClient,
+    LLMRouter,
+    NoProviderAvailable,
+    OllamaProvider,
+    Provider,
+    StubProvider,
+)
+from rag.singleflight import AsyncSingleFlight
+
+logger = logging.getLogger(__name__)
 
 
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY")
 HF_MODEL = "meta-llama/Llama-3.2-3B-Instruct"
+GROQ_MODEL = "llama3-8b-8192"
+# Providers the router may use, in fallback order until latencies are known.
+# Groq and Hugging Face also need their API keys; "stub" is a local fake.
+LLM_PROVIDERS = [p.strip() for p in os.getenv("LLM_PROVIDERS", "groq,huggingface,ollama").split(",") if p.strip()]
 
-groq_client = None
-if GROQ_API_KEY:
-    try:
-        groq_client = Groq(api_key=GROQ_API_KEY)
-        print("INFO: Groq client initialized. Using Cloud AI as primary.")
-    except Exception as e:
-        print(f"WARNING: Groq initialization failed: {e}. Defaulting to Local AI.")
+# SDK clients are created on first use (or by LLM_ROUTER.warm_up()); the SDK
+# imports alone cost noticeable startup time in every worker.
+def _groq_client():
+    from groq import Groq
+    return Groq(api_key=GROQ_API_KEY)
+
+
+def _async_groq_client():
+    from groq import AsyncGroq
+    return AsyncGroq(api_key=GROQ_API_KEY)
+
+
+def _hf_client():
+    from huggingface_hub import InferenceClient
+    return InferenceClient(api_key=HUGGINGFACE_API_KEY)
 
-hf_client = None
-if HUGGINGFACE_API_KEY:
-    try:
-        hf_client = InferenceClient(api_key=HUGGINGFACE_API_KEY)
-        print("INFO: Hugging Face client initialized.")
-    except Exception as e:
-        print(f"WARNING: Hugging Face initialization failed: {e}")
+
+def _async_hf_client():
+    from huggingface_hub import AsyncInferenceClient
+    return AsyncInferenceClient(api_key=HUGGINGFACE_API_KEY)
+
+
+def _ollama_module():
+    import ollama
+    return ollama
+
+
+def _async_ollama_client():
+    import ollama
+    return ollama.AsyncClient()
+
+UNAVAILABLE_MESSAGE = "I apologize, but I'm currently unable to generate a response due to technical issues (AI Service Unavailable)."
 
 SYSTEM_PROMPT = """
 You are an educational assistant operating inside a secure RBAC-based system.
@@ -34,56 +69,110 @@ instead of guessing or hallucinating.
 IMPORTANT: You must always answer in the language requested by the user. If the requested language is Hindi, you must transliterate technical terms or keep them in English if commonly used, but the explanation must be in Hindi.
 """
 
+def _build_router() -> LLMRouter:
+    providers: List[Provider] = []
+    for name in LLM_PROVIDERS:
+        if name == "groq" and GROQ_API_KEY:
+            providers.append(GroqProvider(LazyClient(_groq_client), LazyClient(_async_groq_client), GROQ_MODEL))
+        elif name == "huggingface" and HUGGINGFACE_API_KEY:
+            providers.append(HuggingFaceProvider(LazyClient(_hf_client), LazyClient(_async_hf_client), HF_MODEL))
+        elif name == "ollama":
+            providers.append(OllamaProvider(LazyClient(_ollama_module), LazyClient(_async_ollama_client), OLLAMA_MODEL))
+        elif name == "stub":
+            providers.append(StubProvider(
+                reply=os.getenv("LLM_STUB_REPLY", StubProvider().reply),
+                latency_s=float(os.getenv("LLM_STUB_LATENCY_MS", "0")) / 1000.0,
+            ))
+    logger.info("LLM providers: %s", ", ".join(p.name for p in providers) or "none")
+    return LLMRouter(providers)
+
+
+LLM_ROUTER = _build_router()
+
+# Identical prompts in flight at the same time (a whole class asking the
+# projected question) share one provider call.
+LLM_COALESCE = os.getenv("LLM_COALESCE", "1") == "1"
+LLM_INFLIGHT = AsyncSingleFlight()
+
+
+def prompt_key(messages: List[Dict[str, str]]) -> str:
+    payload = json.dumps(messages, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
 def generate_completion(messages: List[Dict[str, str]]) -> str:
     """
-    Hybrid generation: Try Groq (Cloud) first, fallback to Ollama (Local).
+    Hybrid generation through LLM_ROUTER: the fastest healthy provider first,
+    falling back to the others.
     """
-    
-    if groq_client:
-        try:
-            
-            completion = groq_client.chat.completions.create(
-                model="llama3-8b-8192",
-                messages=messages,
-                temperature=0.1,
-            )
-            return completion.choices[0].message.content
-        except Exception as e:
-            print(f"WARNING: Groq Cloud failed ({e}). Falling back to next available...")
-
-    # Fallback 1: Hugging Face (Cloud)
-    if hf_client:
-        try:
-            # Using chat completion API from huggingface_hub
-            completion = hf_client.chat_completion(
-                model=HF_MODEL,
-                messages=messages,
-                max_tokens=500
-            )
-            return completion.choices[0].message.content
-        except Exception as e:
-            print(f"WARNING: Hugging Face Cloud failed ({e}). Falling back to Local AI...")
-    
-    
     try:
-        response = ollama.chat(model=OLLAMA_MODEL, messages=messages)
-        return response['message']['content']
-    except Exception as e:
-        
-        print(f"ERROR: Local AI failed: {e}")
-        return "I apologize, but I'm currently unable to generate a response due to technical issues (AI Service Unavailable)."
+        return LLM_ROUTER.complete(messages)
+    except NoProviderAvailable as e:
+        logger.error("No LLM answer: %s", e)
+        return UNAVAILABLE_MESSAGE
 
 
-def rewrite_query(query: str) -> str:
+def stream_completion(messages: List[Dict[str, str]]) -> Iterator[str]:
     """
-    Rewrite the user query for better retrieval quality.
+    Streaming variant of generate_completion: yields text deltas as the provider
+    emits them. Falls back to the next provider only if the current one fails
+    before producing any output.
+    """
+    try:
+        yield from LLM_ROUTER.stream(messages)
+    except NoProviderAvailable as e:
+        logger.error("No LLM answer: %s", e)
+        yield UNAVAILABLE_MESSAGE
+
+
+async def agenerate_completion(messages: List[Dict[str, str]]) -> str:
+    """
+    Async generate_completion: awaits the provider's async client so the event
+    loop keeps serving other requests while the model runs.
     """
+    try:
+        if not LLM_COALESCE:
+            return await LLM_ROUTER.acomplete(messages)
+        return await LLM_INFLIGHT.do(prompt_key(messages), LLM_ROUTER.acomplete, messages)
+    except NoProviderAvailable as e:
+        logger.error("No LLM answer: %s", e)
+        return UNAVAILABLE_MESSAGE
+
+
+async def astream_completion(messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+    """
+    Async stream_completion, with the same fallback rules. Identical
+    concurrent prompts share one provider stream.
+    """
+    try:
+        if LLM_COALESCE:
+            stream = LLM_INFLIGHT.stream(prompt_key(messages), LLM_ROUTER.astream, messages)
+        else:
+            stream = LLM_ROUTER.astream(messages)
+        async for delta in stream:
+            yield delta
+    except NoProviderAvailable as e:
+        logger.error("No LLM answer: %s", e)
+        yield UNAVAILABLE_MESSAGE
+
+
+def _rewrite_messages(query: str) -> List[Dict[str, str]]:
     prompt = (
         f"Rewrite the following learner question to be clear, concise, and retrieval-friendly.\n"
         f"Keep the meaning the same. Output ONLY the rewritten question.\n\nQuestion: {query}"
     )
-    messages = [{'role': 'user', 'content': prompt}]
-    return generate_completion(messages).strip()
+    return [{'role': 'user', 'content': prompt}]
+
+
+def rewrite_query(query: str) -> str:
+    """
+    Rewrite the user query for better retrieval quality.
+    """
+    return generate_completion(_rewrite_messages(query)).strip()
+
+
+async def arewrite_query(query: str) -> str:
+    return (await agenerate_completion(_rewrite_messages(query))).strip()
 
 
 def role_prompt(role: str) -> str:
@@ -105,9 +194,9 @@ def role_prompt(role: str) -> str:
 
 
 
-def generate_answer(role: str, context: str, question: str, language: str = "English") -> str:
+def build_answer_messages(role: str, context: str, question: str, language: str = "English") -> List[Dict[str, str]]:
     """
-    Generate final answer with system, role, and context prompts.
+    Build the system, role, and context prompts for the final answer.
     """
     final_user_message = (
         f"ROLE:\n{role_prompt(role)}\n\n"
@@ -117,9 +206,29 @@ def generate_answer(role: str, context: str, question: str, language: str = "Eng
         "Answer as instructed above in the target language."
     )
     
-    messages = [
+    return [
         {'role': 'system', 'content': SYSTEM_PROMPT.strip()},
         {'role': 'user', 'content': final_user_message}
     ]
-    
-    return generate_completion(messages)
+
+
+def generate_answer(role: str, context: str, question: str, language: str = "English") -> str:
+    """
+    Generate final answer with system, role, and context prompts.
+    """
+    return generate_completion(build_answer_messages(role, context, question, language))
+
+
+def stream_answer(role: str, context: str, question: str, language: str = "English") -> Iterator[str]:
+    """
+    Stream the final answer token by token.
+    """
+    return stream_completion(build_answer_messages(role, context, question, language))
+
+
+async def agenerate_answer(role: str, context: str, question: str, language: str = "English") -> str:
+    return await agenerate_completion(build_answer_messages(role, context, question, language))
+
+
+def astream_answer(role: str, context: str, question: str, language: str = "English") -> AsyncIterator[str]:
+    return astream_completion(build_answer_messages(role, context, question, language))
@@ -0,0 +1,129 @@
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, NamedTuple, Optional
+
+import numpy as np
+
+
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "5000"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+ANSWER_CACHE_TTL_S = float(os.getenv("ANSWER_CACHE_TTL_S", str(24 * 3600)))
+
+
+class _Entry(NamedTuple):
+    key: Hashable
+    vector: np.ndarray
+    answer: str
+    version: Optional[str]
+    created_at: float
+
+
+class SemanticAnswerCache:
+    """
+    Answers keyed on (standard, subject, chapter, role, language) plus the
+    query embedding. A lookup hits when a stored query for the same key has
+    cosine similarity >= `threshold` with the new one.
+
+    Entries expire after `ttl_s`, the least recently used are evicted past
+    `max_entries`, and an entry whose `version` (the chapter's source hash)
+    differs from the caller's is dropped, so editing a PDF invalidates it.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = ANSWER_CACHE_SIZE,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        ttl_s: float = ANSWER_CACHE_TTL_S,
+    ):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._lru: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._buckets: Dict[Hashable, Dict[int, _Entry]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        v = np.asarray(vector, dtype="float32").reshape(-1)
+        norm = np.linalg.norm(v)
+        return v / norm if norm > 0 else v
+
+    def _drop(self, entry_id: int) -> None:
+        entry = self._lru.pop(entry_id)
+        bucket = self._buckets[entry.key]
+        del bucket[entry_id]
+        if not bucket:
+            del self._buckets[entry.key]
+
+    def lookup(self, key: Hashable, query_vector, version: Optional[str] = None) -> Optional[str]:
+        if self.max_entries <= 0:
+            return None
+        query = self._normalize(query_vector)
+        now = time.time()
+        with self._lock:
+            bucket = self._buckets.get(key, {})
+            for entry_id, entry in list(bucket.items()):
+                if now - entry.created_at > self.ttl_s:
+                    self._drop(entry_id)
+                    self.expirations += 1
+                elif entry.version != version:
+                    self._drop(entry_id)
+                    self.invalidations += 1
+
+            bucket = self._buckets.get(key)
+            if bucket:
+                ids = list(bucket)
+                similarities = np.stack([bucket[i].vector for i in ids]) @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    self._lru.move_to_end(ids[best])
+                    self.hits += 1
+                    return bucket[ids[best]].answer
+
+            self.misses += 1
+            return None
+
+    def store(self, key: Hashable, query_vector, answer: str, version: Optional[str] = None) -> None:
+        if self.max_entries <= 0:
+            return
+        entry = _Entry(key, self._normalize(query_vector), answer, version, time.time())
+        with self._lock:
+            entry_id = next(self._ids)
+            self._lru[entry_id] = entry
+            self._buckets.setdefault(key, {})[entry_id] = entry
+            while len(self._lru) > self.max_entries:
+                self._drop(next(iter(self._lru)))
+                self.evictions += 1
+
+    def invalidate(self, predicate) -> int:
+        """
+        Drop every entry whose key satisfies `predicate(key)`.
+        """
+        with self._lock:
+            doomed: List[int] = [i for i, e in self._lru.items() if predicate(e.key)]
+            for entry_id in doomed:
+                self._drop(entry_id)
+            self.invalidations += len(doomed)
+            return len(doomed)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._lru),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,242 @@
+import os
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+from rag.embeddings import hf_model_name
+from rag.mmap_files import INDEX_MMAP, Buffer, heap_nbytes, load_array, load_bytes
+
+
+# Token budget per chunk. all-MiniLM-L6-v2 truncates at 256 tokens including
+# [CLS]/[SEP], so the default leaves headroom instead of silently losing text.
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "200"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+CHUNK_TOKENIZER = os.getenv("CHUNK_TOKENIZER", hf_model_name())
+
+# Sentence ends (Latin and Devanagari danda) or blank lines
+_SENTENCE_END = re.compile(r"[.!?।॥]+(?=\s)|\n\s*\n")
+_WORD = re.compile(r"\S+")
+
+TokenCounter = Callable[[List[str]], List[int]]
+
+
+class Span(NamedTuple):
+    start: int
+    end: int
+    page: int
+
+
+def _utf8_offsets(text: str) -> np.ndarray:
+    """
+    Byte offset in text.encode("utf-8") of every character index 0..len(text).
+    """
+    codepoints = np.frombuffer(text.encode("utf-32-le"), dtype="uint32")
+    widths = 1 + (codepoints >= 0x80) + (codepoints >= 0x800) + (codepoints >= 0x10000)
+    return np.concatenate([[0], np.cumsum(widths, dtype="int64")])
+
+
+class ChunkView(Sequence):
+    """
+    Chunks as (start, end, page) byte offsets into one UTF-8 buffer. Indexing
+    decodes the slice on demand, so chunk strings are never stored twice; a
+    loaded view maps text.txt read-only, so workers share one copy of it.
+    """
+
+    def __init__(self, data: Buffer, spans: np.ndarray):
+        self.data = data
+        # asarray keeps a memory-mapped spans array mapped (as a view)
+        self.spans = np.asarray(spans, dtype="int64").reshape(-1, 3)
+
+    @classmethod
+    def from_spans(cls, text: str, spans: Iterable[Span]) -> "ChunkView":
+        """
+        Build from character-offset spans into `text`.
+        """
+        array = np.array([tuple(s) for s in spans], dtype="int64").reshape(-1, 3)
+        array[:, :2] = _utf8_offsets(text)[array[:, :2]]
+        return cls(text.encode("utf-8"), array)
+
+    @classmethod
+    def from_strings(cls, chunks: Sequence[str]) -> "ChunkView":
+        """
+        Lay plain chunk strings end to end (page -1: unknown).
+        """
+        encoded = [chunk.encode("utf-8") for chunk in chunks]
+        lengths = np.array([len(b) for b in encoded], dtype="int64")
+        ends = np.cumsum(lengths)
+        spans = np.stack([ends - lengths, ends, np.full(len(lengths), -1, dtype="int64")], axis=1)
+        return cls(b"".join(encoded), spans)
+
+    @classmethod
+    def concat(cls, views: List["ChunkView"]) -> "ChunkView":
+        """
+        Join several views into one, shifting offsets into the joined buffer.
+        """
+        shifted = []
+        offset = 0
+        for view in views:
+            spans = np.array(view.spans)
+            spans[:, :2] += offset
+            shifted.append(spans)
+            offset += len(view.data)
+        data = b"".join(bytes(view.data) for view in views)
+        return cls(data, np.vstack(shifted) if shifted else np.zeros((0, 3), dtype="int64"))
+
+    def save(self, directory: Path) -> None:
+        with open(directory / "text.txt", "wb") as f:
+            f.write(self.data)
+        np.save(directory / "spans.npy", np.ascontiguousarray(self.spans))
+
+    @classmethod
+    def load(cls, directory: Path, mapped: bool = INDEX_MMAP) -> "ChunkView":
+        return cls(load_bytes(directory / "text.txt", mapped), load_array(directory / "spans.npy", mapped))
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        start, end, _ = self.spans[idx]
+        return self.data[start:end].decode("utf-8")
+
+    def page(self, idx: int) -> int:
+        return int(self.spans[idx][2])
+
+    def nbytes(self) -> int:
+        """
+        Heap bytes; a mapped view costs (almost) nothing per process.
+        """
+        return heap_nbytes(self.data) + heap_nbytes(self.spans)
+
+
+@lru_cache(maxsize=None)
+def _load_tokenizer(name: str):
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(name)
+
+
+def token_counter(name: str = CHUNK_TOKENIZER) -> TokenCounter:
+    """
+    Return a batch token counter for the embedding model's tokenizer.
+
+    Raises RuntimeError if the tokenizer cannot be loaded: chunks sized by
+    another measure would be cached under the tokenizer's build signature.
+    """
+    try:
+        tokenizer = _load_tokenizer(name)
+    except Exception as e:
+        raise RuntimeError(
+            f"Tokenizer '{name}' unavailable ({e}); install transformers, set CHUNK_TOKENIZER, "
+            "or use CHUNKER=chars"
+        ) from e
+
+    def count(texts: List[str]) -> List[int]:
+        if not texts:
+            return []
+        return [len(ids) for ids in tokenizer(texts, add_special_tokens=False)["input_ids"]]
+
+    return count
+
+
+def _sentence_ranges(text: str, start: int, end: int) -> Iterator[Tuple[int, int]]:
+    """
+    Yield whitespace-trimmed sentence ranges within text[start:end].
+    """
+    pos = start
+    for match in _SENTENCE_END.finditer(text, start, end):
+        yield from _trim(text, pos, match.end())
+        pos = match.end()
+    yield from _trim(text, pos, end)
+
+
+def _trim(text: str, start: int, end: int) -> Iterator[Tuple[int, int]]:
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    if start < end:
+        yield start, end
+
+
+def _page_units(text: str, start: int, end: int, count_tokens: TokenCounter, max_tokens: int):
+    """
+    Sentences of one page as (start, end, tokens). Sentences longer than
+    `max_tokens` are split into roughly equal word windows.
+    """
+    sentences = list(_sentence_ranges(text, start, end))
+    counts = count_tokens([text[s:e] for s, e in sentences])
+    units = []
+    for (s, e), tokens in zip(sentences, counts):
+        if tokens <= max_tokens:
+            units.append((s, e, tokens))
+            continue
+        words = [m.span() for m in _WORD.finditer(text, s, e)]
+        pieces = -(-tokens // max_tokens)
+        per_piece = -(-len(words) // pieces)
+        for i in range(0, len(words), per_piece):
+            window = words[i:i + per_piece]
+            units.append((window[0][0], window[-1][1], -(-tokens * len(window) // len(words))))
+    return units
+
+
+def iter_chunk_spans(
+    pages: Iterable[str],
+    count_tokens: TokenCounter,
+    max_tokens: int = CHUNK_MAX_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+) -> Iterator[Span]:
+    """
+    Stream chunk spans over the text "".join(page + "\\n" for page in pages).
+
+    Chunks are built from whole sentences up to `max_tokens`, never cross a
+    page, and start with up to `overlap_tokens` of the previous chunk's
+    trailing sentences.
+    """
+    offset = 0
+    for page_no, page_text in enumerate(pages):
+        units = _page_units(page_text, 0, len(page_text), count_tokens, max_tokens)
+        current: List[Tuple[int, int, int]] = []
+        current_tokens = 0
+        fresh = 0  # units in `current` not already emitted as overlap
+        for unit in units:
+            if current and current_tokens + unit[2] > max_tokens:
+                yield Span(offset + current[0][0], offset + current[-1][1], page_no)
+                carried: List[Tuple[int, int, int]] = []
+                carried_tokens = 0
+                for prev in reversed(current):
+                    if carried_tokens + prev[2] > overlap_tokens or carried_tokens + prev[2] + unit[2] > max_tokens:
+                        break
+                    carried.insert(0, prev)
+                    carried_tokens += prev[2]
+                current, current_tokens, fresh = carried, carried_tokens, 0
+            current.append(unit)
+            current_tokens += unit[2]
+            fresh += 1
+        if current and fresh:
+            yield Span(offset + current[0][0], offset + current[-1][1], page_no)
+        offset += len(page_text) + 1
+
+
+def chunk_pages(
+    pages: Iterable[str],
+    count_tokens: TokenCounter = None,
+    max_tokens: int = CHUNK_MAX_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+) -> ChunkView:
+    """
+    Chunk extracted pages into a ChunkView over the joined page text.
+    """
+    page_list: List[str] = []
+
+    def collect() -> Iterator[str]:
+        for page_text in pages:
+            page_list.append(page_text)
+            yield page_text
+
+    spans = list(iter_chunk_spans(collect(), count_tokens or token_counter(), max_tokens, overlap_tokens))
+    text = "".join(page_text + "\n" for page_text in page_list)
+    return ChunkView.from_spans(text, spans)
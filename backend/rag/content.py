@@ -0,0 +1,183 @@
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+# Course material layout: std/{standard}/{Subject}/{Chapter}.pdf
+# Shared by the API and the offline ingestion CLI so both see the same chapters.
+
+def list_standards(std_dir: Path) -> List[str]:
+    """
+    Return the standard folder names found under `std_dir`.
+    """
+    if not std_dir.exists():
+        return []
+    return sorted(p.name for p in std_dir.iterdir() if p.is_dir())
+
+
+def scan_standard(std_dir: Path, standard: str) -> Dict[str, Dict[str, str]]:
+    """
+    Scan one standard folder.
+    Returns: { "subject_name": { "chapter_name": "absolute_path_to_pdf" } }
+    """
+    content_map: Dict[str, Dict[str, str]] = {}
+
+    if not standard:
+        return content_map
+
+    std_path = std_dir / standard
+    if not std_path.exists():
+        return content_map
+
+    # Scan subjects (subdirectories in std/{standard})
+    for subject_path in std_path.iterdir():
+        if subject_path.is_dir():
+            subject_name = subject_path.name
+            chapters = {}
+            # Scan chapters (PDF files in std/{standard}/{subject})
+            for file_path in subject_path.glob("*.pdf"):
+                chapter_name = file_path.stem  # filename without extension
+                chapters[chapter_name] = str(file_path.resolve())
+
+            if chapters:
+                content_map[subject_name] = chapters
+
+    return content_map
+
+
+class _StandardEntry:
+    """
+    Scanned content of one standard plus its case-insensitive lookups.
+    """
+
+    def __init__(self, content: Dict[str, Dict[str, str]], generation: int):
+        self.content = content
+        # Catalog generation in which this content was first seen
+        self.generation = generation
+        self.subjects = {name.lower(): name for name in content}
+        self.chapters = {
+            name: {chapter.lower(): chapter for chapter in chapters}
+            for name, chapters in content.items()
+        }
+
+
+class ContentCatalog:
+    """
+    Memoized view of the std/ tree.
+
+    The tree is scanned once; afterwards the mtimes of std/, each standard and
+    subject folder and each chapter PDF are re-checked at most every
+    `refresh_interval` seconds, and any change triggers a rescan. Hot
+    endpoints only read the in-memory maps.
+    """
+
+    def __init__(self, std_dir: Path, refresh_interval: float = 5.0):
+        self.std_dir = std_dir
+        self.refresh_interval = refresh_interval
+        self.generation = 0  # bumped on every rescan; see standard_generation
+        self._lock = threading.Lock()
+        self._entries: Dict[str, _StandardEntry] = {}
+        self._mtimes: Dict[Path, Optional[int]] = {}
+        self._checked_at = float("-inf")
+
+    def _watched_paths(self) -> List[Path]:
+        paths = [self.std_dir]
+        for standard, entry in list(self._entries.items()):
+            std_path = self.std_dir / standard
+            try:
+                subjects = [p for p in std_path.iterdir() if p.is_dir()]
+            except OSError:
+                # Removed since it was scanned: drop it, as list_standards would
+                del self._entries[standard]
+                continue
+            paths.append(std_path)
+            paths.extend(subjects)
+            # PDFs too, so a chapter replaced in place is noticed
+            paths.extend(Path(pdf) for chapters in entry.content.values() for pdf in chapters.values())
+        return paths
+
+    @staticmethod
+    def _mtime(path: Path) -> Optional[int]:
+        try:
+            return path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _unchanged(self, old: _StandardEntry, content: Dict[str, Dict[str, str]]) -> bool:
+        """
+        Whether a rescanned standard has the same chapters and none of its
+        PDFs was modified since the previous scan.
+        """
+        return old.content == content and all(
+            self._mtime(Path(pdf)) == self._mtimes.get(Path(pdf))
+            for chapters in content.values() for pdf in chapters.values()
+        )
+
+    def _rescan(self) -> None:
+        self.generation += 1
+        entries = {}
+        for standard in list_standards(self.std_dir):
+            content = scan_standard(self.std_dir, standard)
+            old = self._entries.get(standard)
+            generation = old.generation if old and self._unchanged(old, content) else self.generation
+            entries[standard] = _StandardEntry(content, generation)
+        self._entries = entries
+        self._mtimes = {path: self._mtime(path) for path in self._watched_paths()}
+
+    def _changed(self) -> bool:
+        return any(self._mtime(path) != mtime for path, mtime in self._mtimes.items())
+
+    def refresh(self, force: bool = False) -> None:
+        """
+        Rescan if forced, never scanned, or a watched path changed.
+        """
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.refresh_interval:
+            return
+        with self._lock:
+            if force or not self._mtimes or self._changed():
+                self._rescan()
+            self._checked_at = now
+
+    def standards(self) -> List[str]:
+        self.refresh()
+        return sorted(self._entries)
+
+    def standard_generation(self, standard: str) -> int:
+        """
+        Changes only when this standard's chapters are added, removed or edited.
+        """
+        self.refresh()
+        entry = self._entries.get(standard)
+        return entry.generation if entry else 0
+
+    def content(self, standard: str = None) -> Dict[str, Dict[str, str]]:
+        """
+        Returns: { "subject_name": { "chapter_name": "absolute_path_to_pdf" } }
+        The returned mapping is shared; callers must not modify it.
+        """
+        self.refresh()
+        entry = self._entries.get(standard) if standard else None
+        return entry.content if entry else {}
+
+    def resolve_subject(self, standard: str, subject: str) -> Optional[str]:
+        """
+        Return the on-disk subject name matching `subject` case-insensitively.
+        """
+        self.refresh()
+        entry = self._entries.get(standard)
+        return entry.subjects.get(subject.lower()) if entry else None
+
+    def resolve_chapter(self, standard: str, subject: str, chapter: str) -> Optional[Tuple[str, str]]:
+        """
+        Return (chapter_name, pdf_path) for a resolved subject, or None.
+        """
+        self.refresh()
+        entry = self._entries.get(standard)
+        if not entry or subject not in entry.content:
+            return None
+        real_chapter = entry.chapters[subject].get(chapter.lower())
+        if real_chapter is None:
+            return None
+        return real_chapter, entry.content[subject][real_chapter]
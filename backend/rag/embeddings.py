@@ -0,0 +1,216 @@
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+from rag import sources
+
+logger = logging.getLogger(__name__)
+
+
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+# How the sentence encoder runs on CPU:
+#   torch     - sentence-transformers on PyTorch (default)
+#   onnx      - the same model exported to ONNX, run with onnxruntime
+#   onnx_int8 - the ONNX export with dynamically int8-quantized weights
+# Vectors differ slightly between backends, so the backend is part of the
+# index cache build signature and of the query embedding cache key.
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx_int8")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+# A ready-made ONNX file to use instead of exporting the model (it must take
+# input_ids/attention_mask[/token_type_ids] and return the token embeddings).
+ONNX_MODEL_PATH = os.getenv("ONNX_MODEL_PATH", "")
+# onnxruntime intra-op threads; 0 lets onnxruntime decide.
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))
+# MiniLM's sentence-transformers config truncates inputs at 256 tokens
+EMBEDDING_MAX_TOKENS = int(os.getenv("EMBEDDING_MAX_TOKENS", "256"))
+
+
+def hf_model_name(model_name: str = EMBEDDING_MODEL_NAME) -> str:
+    return model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+
+
+def embedding_key(backend: str = EMBEDDING_BACKEND, model_name: str = EMBEDDING_MODEL_NAME) -> str:
+    """
+    Identifies the vectors a backend produces; torch keeps the bare model name
+    so existing query caches stay valid.
+    """
+    return model_name if backend == "torch" else f"{model_name}@{backend}"
+
+
+class EmbeddingBackend:
+    """
+    Encodes texts into L2-normalized float32 sentence embeddings.
+    """
+
+    name = "backend"
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        raise NotImplementedError
+
+
+class TorchBackend(EmbeddingBackend):
+    name = "torch"
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise RuntimeError("EMBEDDING_BACKEND=torch needs sentence-transformers (pip install sentence-transformers)") from e
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        embeddings = self.model.encode(texts, batch_size=batch_size, normalize_embeddings=True)
+        return np.array(embeddings, dtype="float32")
+
+
+def _export_onnx(model_name: str, target: Path) -> None:
+    """
+    Export the transformer body of a sentence-transformers model to ONNX.
+    Pooling and normalization stay in numpy (OnnxBackend.encode).
+    """
+    try:
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+    except ImportError as e:
+        raise RuntimeError(
+            "Exporting the ONNX model needs torch and transformers; install them once "
+            "or point ONNX_MODEL_PATH at an exported model"
+        ) from e
+
+    class Encoder(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids)[0]
+
+    name = hf_model_name(model_name)
+    model = AutoModel.from_pretrained(name).eval()
+    sample = AutoTokenizer.from_pretrained(name)(["warm up export"], return_tensors="pt")
+    dynamic = {0: "batch", 1: "tokens"}
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=target.parent, suffix=".onnx.tmp")
+    os.close(fd)
+    with torch.no_grad():
+        torch.onnx.export(
+            Encoder(model),
+            (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+            tmp,
+            input_names=["input_ids", "attention_mask", "token_type_ids"],
+            output_names=["token_embeddings"],
+            dynamic_axes={
+                "input_ids": dynamic, "attention_mask": dynamic,
+                "token_type_ids": dynamic, "token_embeddings": dynamic,
+            },
+            opset_version=14,
+        )
+    os.replace(tmp, target)
+
+
+def _quantize_onnx(source: Path, target: Path) -> None:
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    fd, tmp = tempfile.mkstemp(dir=target.parent, suffix=".onnx.tmp")
+    os.close(fd)
+    quantize_dynamic(str(source), tmp, weight_type=QuantType.QInt8)
+    os.replace(tmp, target)
+
+
+def onnx_model_path(model_name: str = EMBEDDING_MODEL_NAME, quantize: bool = False) -> Path:
+    """
+    Path of the (optionally int8) ONNX model, exporting and quantizing it
+    into INDEX_CACHE_DIR/models on first use.
+    """
+    directory = sources.INDEX_CACHE_DIR / "models" / hf_model_name(model_name).replace("/", "__")
+    fp32 = Path(ONNX_MODEL_PATH) if ONNX_MODEL_PATH else directory / "model.onnx"
+    if not fp32.exists():
+        logger.info("Exporting %s to ONNX at %s", model_name, fp32)
+        _export_onnx(model_name, fp32)
+    if not quantize:
+        return fp32
+    int8 = directory / f"{fp32.stem}_int8.onnx"
+    if not int8.exists():
+        logger.info("Quantizing %s to int8 at %s", fp32.name, int8)
+        int8.parent.mkdir(parents=True, exist_ok=True)
+        _quantize_onnx(fp32, int8)
+    return int8
+
+
+class OnnxBackend(EmbeddingBackend):
+    """
+    The sentence-transformers model run by onnxruntime: tokenize, run the
+    exported transformer, mean-pool over the attention mask, L2-normalize.
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, quantize: bool = False):
+        try:
+            import onnxruntime as ort
+            from transformers import AutoTokenizer
+        except ImportError as e:
+            raise RuntimeError(
+                f"EMBEDDING_BACKEND={'onnx_int8' if quantize else 'onnx'} needs onnxruntime and "
+                "transformers (pip install onnxruntime transformers)"
+            ) from e
+        self.name = "onnx_int8" if quantize else "onnx"
+        self.path = onnx_model_path(model_name, quantize)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if ONNX_THREADS:
+            options.intra_op_num_threads = ONNX_THREADS
+        self.session = ort.InferenceSession(str(self.path), options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(hf_model_name(model_name))
+        self.dim = self._encode_batch(["dimension probe"]).shape[1]
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        tokens = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=EMBEDDING_MAX_TOKENS, return_tensors="np"
+        )
+        feed = {name: tokens[name].astype("int64") for name in self.input_names if name in tokens}
+        if "token_type_ids" in self.input_names and "token_type_ids" not in feed:
+            feed["token_type_ids"] = np.zeros_like(feed["input_ids"])
+        hidden = self.session.run(None, feed)[0]
+        mask = tokens["attention_mask"][..., None].astype("float32")
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype("float32")
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        out = np.empty((len(texts), self.dim), dtype="float32")
+        # Length-sorted batches pad less; results go back in input order
+        order = np.argsort([len(t) for t in texts], kind="stable")
+        for start in range(0, len(texts), batch_size):
+            idx = order[start:start + batch_size]
+            out[idx] = self._encode_batch([texts[i] for i in idx])
+        return out
+
+
+def make_backend(name: str = EMBEDDING_BACKEND, model_name: str = EMBEDDING_MODEL_NAME) -> EmbeddingBackend:
+    if name == "torch":
+        return TorchBackend(model_name)
+    if name in ("onnx", "onnx_int8"):
+        return OnnxBackend(model_name, quantize=name == "onnx_int8")
+    raise ValueError(f"Unknown EMBEDDING_BACKEND '{name}', expected one of {EMBEDDING_BACKENDS}")
+
+
+# Created on first use (or by warm_up), so importing this module stays cheap
+_backend: Optional[EmbeddingBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_embedding_backend() -> EmbeddingBackend:
+    """
+    Return the process-wide EMBEDDING_BACKEND, creating it on the first call.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = make_backend()
+    return _backend
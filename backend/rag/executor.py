@@ -0,0 +1,22 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+
+# Dedicated pool for CPU-bound RAG work (embedding, FAISS search, PDF ingest).
+# Kept apart from Starlette's threadpool so slow model calls cannot starve the
+# workers that serve DB queries and sync dependencies.
+CPU_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv("RAG_CPU_WORKERS", str(os.cpu_count() or 4))),
+    thread_name_prefix="rag-cpu",
+)
+
+
+async def run_cpu(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run `fn(*args, **kwargs)` on the CPU executor without blocking the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(CPU_EXECUTOR, functools.partial(fn, *args, **kwargs))
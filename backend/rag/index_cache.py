@@ -0,0 +1,216 @@
+# Persistent on-disk cache for chapter VectorStores.
+#
+# INDEX_CACHE_DIR/sources/<path-hash>.json   last seen mtime/size/sha256 of a PDF (rag.sources)
+# INDEX_CACHE_DIR/pages/<sha256>.json        extracted page text (rag.pdf_loader)
+# INDEX_CACHE_DIR/chapters/<sha256>_<build>/ vectors.npy (flat) or index.faiss (+ lists.ivfdata
+#                                            for IVF), text.txt + spans.npy (UTF-8 byte offsets),
+#                                            sparse_*.npy + sparse_terms.json (BM25), manifest.json,
+#                                            embeddings.npy if KEEP_RAW_EMBEDDINGS
+# INDEX_CACHE_DIR/standards/<std>_<key>/     merged per-standard index (+ layout.json)
+#
+# Chapter artifacts are content-addressed (PDF hash + build signature), so a
+# directory never changes once written; only `python -m rag.ingest --force`
+# swaps a rebuilt directory in. The per-path source record only lets us skip
+# re-hashing a PDF whose mtime and size are unchanged. Because they are
+# immutable, loaded stores memory-map them read-only (INDEX_MMAP) and all
+# worker processes share one copy in the page cache.
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Dict, Optional
+
+from rag import sources
+from rag.chunker import CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS, CHUNK_TOKENIZER
+from rag.pdf_loader import CHUNKER, extract_chunks
+from rag.sources import source_hash
+from rag.standard_index import NoStandardContent, StandardIndex
+from rag.embeddings import embedding_key
+from rag.vector_store import VectorStore, index_config
+
+logger = logging.getLogger(__name__)
+
+
+# Bump when the on-disk artifact layout changes.
+CACHE_FORMAT_VERSION = 3
+
+
+def build_signature() -> Dict[str, object]:
+    """
+    Everything besides the PDF bytes that determines the built artifacts.
+    """
+    return {
+        "format": CACHE_FORMAT_VERSION,
+        # Model plus EMBEDDING_BACKEND; the torch key is the bare model name
+        "embedding_model": embedding_key(),
+        "chunker": CHUNKER if CHUNKER == "chars" else {
+            "max_tokens": CHUNK_MAX_TOKENS,
+            "overlap_tokens": CHUNK_OVERLAP_TOKENS,
+            "tokenizer": CHUNK_TOKENIZER,
+        },
+        "index": index_config(),
+    }
+
+
+def _build_key() -> str:
+    payload = json.dumps(build_signature(), sort_keys=True).encode("utf-8")
+    return hashlib.sha1(payload).hexdigest()[:12]
+
+
+def artifact_dir(sha256: str) -> Path:
+    return sources.INDEX_CACHE_DIR / "chapters" / f"{sha256[:32]}_{_build_key()}"
+
+
+def load_cached_store(pdf_path: str) -> Optional[VectorStore]:
+    """
+    Return the cached store for `pdf_path`, or None if it has not been built
+    for the current PDF contents and build signature.
+    """
+    sha = source_hash(pdf_path)
+    directory = artifact_dir(sha)
+    if not (directory / "manifest.json").exists():
+        return None
+    try:
+        store = VectorStore.load(directory)
+        store.source_id = sha
+        return store
+    except Exception as e:
+        logger.warning("Ignoring unreadable index cache %s: %s", directory, e)
+        return None
+
+
+def _publish(target: Path, artifact, manifest: dict, replace: bool = False) -> None:
+    """
+    Write `artifact` into a temporary directory and rename it into place, so
+    concurrent workers never observe a half-written artifact. With `replace`,
+    an existing `target` is renamed aside first and then removed.
+    """
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(dir=target.parent, prefix=".tmp-"))
+    old_dir = None
+    try:
+        artifact.save(tmp_dir)
+        with open(tmp_dir / "manifest.json", "w", encoding="utf-8") as f:
+            json.dump({**manifest, **build_signature()}, f)
+        if replace and target.exists():
+            # Processes that mapped the old files keep reading them; the
+            # directory entry just goes away.
+            old_dir = target.parent / f".old-{uuid.uuid4().hex[:8]}-{target.name}"
+            os.rename(target, old_dir)
+        os.rename(tmp_dir, target)
+    except OSError:
+        # Another worker renamed its copy into place first.
+        if not (target / "manifest.json").exists():
+            raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if old_dir is not None:
+            shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def save_store(pdf_path: str, store: VectorStore, sha256: Optional[str] = None, replace: bool = False) -> Path:
+    """
+    Persist `store` as the artifact for `pdf_path`, overwriting an existing
+    artifact only with `replace`.
+    """
+    sha = sha256 or source_hash(pdf_path)
+    target = artifact_dir(sha)
+    if replace or not (target / "manifest.json").exists():
+        _publish(target, store, {
+            "source": str(Path(pdf_path).resolve()),
+            "sha256": sha,
+            "chunks": len(store.chunks),
+        }, replace=replace)
+    return target
+
+
+def build_store_from_pdf(pdf_path: str) -> VectorStore:
+    """
+    Extract, chunk and embed a chapter PDF from scratch.
+    """
+    return VectorStore(extract_chunks(pdf_path))
+
+
+def load_or_build_store(pdf_path: str) -> VectorStore:
+    """
+    Load the chapter store from the cache, rebuilding and persisting it only
+    when the PDF or the embedding model changed.
+    """
+    store = load_cached_store(pdf_path)
+    if store is not None:
+        return store
+
+    store = build_store_from_pdf(pdf_path)
+    store.source_id = source_hash(pdf_path)
+    try:
+        save_store(pdf_path, store, sha256=store.source_id)
+    except Exception as e:
+        logger.warning("Could not write index cache for %s: %s", pdf_path, e)
+        return store
+    # Serve the mapped copy, shared with other workers, not the private build
+    return load_cached_store(pdf_path) or store
+
+
+def standard_index_dir(standard: str, content: Dict[str, Dict[str, str]]) -> Path:
+    """
+    Directory of the merged index for `standard`, keyed on the hashes of all
+    of its chapter PDFs so adding or editing a chapter produces a new index.
+    """
+    members = sorted(
+        (subject, chapter, source_hash(pdf_path))
+        for subject, chapters in content.items()
+        for chapter, pdf_path in chapters.items()
+    )
+    key = hashlib.sha1(json.dumps(members).encode("utf-8")).hexdigest()[:16]
+    safe_standard = "".join(ch if ch.isalnum() else "_" for ch in standard)
+    return sources.INDEX_CACHE_DIR / "standards" / f"{safe_standard}_{key}_{_build_key()}"
+
+
+def load_or_build_standard_index(
+    standard: str,
+    content: Dict[str, Dict[str, str]],
+    rebuild: bool = False,
+) -> StandardIndex:
+    """
+    Load the merged index for a standard, building it from the (cached)
+    chapter stores when any chapter changed or `rebuild` is set. Raises
+    NoStandardContent if no chapter could be loaded.
+    """
+    target = standard_index_dir(standard, content)
+    index = None if rebuild else _load_standard_index(target)
+    if index is not None:
+        return index
+
+    chapters = []
+    for subject, chapter_map in content.items():
+        for chapter, pdf_path in chapter_map.items():
+            try:
+                chapters.append((subject, chapter, load_or_build_store(pdf_path)))
+            except Exception as e:
+                logger.warning("Leaving %s out of the Std %s index: %s", pdf_path, standard, e)
+    if not chapters:
+        raise NoStandardContent(f"No chapter of Std {standard} could be loaded")
+    index = StandardIndex.from_chapters(chapters)
+    index.source_id = target.name
+    try:
+        _publish(target, index, {"standard": standard, "chapters": len(chapters)}, replace=rebuild)
+    except Exception as e:
+        logger.warning("Could not write standard index for %s: %s", standard, e)
+        return index
+    return _load_standard_index(target) or index
+
+
+def _load_standard_index(target: Path) -> Optional[StandardIndex]:
+    if not (target / "manifest.json").exists():
+        return None
+    try:
+        index = StandardIndex.load(target)
+        index.source_id = target.name
+        return index
+    except Exception as e:
+        logger.warning("Ignoring unreadable standard index %s: %s", target, e)
+        return None
@@ -0,0 +1,146 @@
+"""
+Offline corpus ingestion.
+
+Pre-builds the index cache for every chapter under std/, plus the merged
+per-standard indexes, so the API never ingests a PDF on a student request.
+Run from the backend folder:
+
+    python -m rag.ingest [--standard 9] [--workers 4] [--batch-size 256] [--force]
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+
+from rag.content import list_standards, scan_standard
+from rag.pdf_loader import extract_chunks
+
+# rag.index_cache / rag.vector_store are imported inside main(): they import
+# faiss, and PDF worker processes must not pay for that on spawn.
+
+DEFAULT_STD_DIR = Path(__file__).resolve().parent.parent.parent / "std"
+
+
+class Chapter(NamedTuple):
+    standard: str
+    subject: str
+    chapter: str
+    pdf_path: str
+
+
+def discover_chapters(std_dir: Path, standards: List[str] = None) -> List[Chapter]:
+    """
+    Walk std/{standard}/{Subject}/{Chapter}.pdf with the same rules as the API.
+    """
+    found: List[Chapter] = []
+    for standard in standards or list_standards(std_dir):
+        for subject, chapters in sorted(scan_standard(std_dir, standard).items()):
+            for chapter, pdf_path in sorted(chapters.items()):
+                found.append(Chapter(standard, subject, chapter, pdf_path))
+    return found
+
+
+class StageTimer:
+    """
+    Accumulates wall-clock seconds per named stage.
+    """
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self._start = time.perf_counter()
+
+    def stage(self, name: str, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        self.timings[name] = self.timings.get(name, 0.0) + elapsed
+        print(f"[{name}] {elapsed:.2f}s")
+
+    def total(self) -> float:
+        return time.perf_counter() - self._start
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Pre-build chapter indexes for all of std/.")
+    parser.add_argument("--std-dir", type=Path, default=DEFAULT_STD_DIR)
+    parser.add_argument("--standard", action="append", help="Only ingest this standard (repeatable)")
+    parser.add_argument("--out", type=Path, help="Index directory (defaults to INDEX_CACHE_DIR)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Processes used for PDF parsing")
+    parser.add_argument("--batch-size", type=int, default=256, help="Embedding batch size")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-extract and rebuild every chapter and standard index, replacing cached ones")
+    args = parser.parse_args(argv)
+
+    from rag import index_cache, sources
+    from rag.vector_store import VectorStore, create_embeddings
+
+    if args.out:
+        sources.INDEX_CACHE_DIR = args.out.resolve()
+        # Spawned PDF workers (the Windows default) re-import rag.sources
+        # and read the directory from the environment
+        os.environ["INDEX_CACHE_DIR"] = str(sources.INDEX_CACHE_DIR)
+
+    timer = StageTimer()
+
+    started = time.perf_counter()
+    chapters = discover_chapters(args.std_dir, args.standard)
+    hashes = {c.pdf_path: index_cache.source_hash(c.pdf_path) for c in chapters}
+    pending = [
+        c for c in chapters
+        if args.force or not (index_cache.artifact_dir(hashes[c.pdf_path]) / "manifest.json").exists()
+    ]
+    timer.stage("discover", started)
+    print(f"{len(chapters)} chapters found, {len(pending)} need ingestion")
+
+    if pending:
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+            # One PDF per process; pages within a PDF are read sequentially there
+            chunk_lists = list(pool.map(partial(extract_chunks, workers=1, refresh=args.force), [c.pdf_path for c in pending]))
+        timer.stage("extract+chunk", started)
+
+        # Embed every pending chapter in one pass so batches stay full across
+        # chapter boundaries, then slice the matrix back per chapter.
+        started = time.perf_counter()
+        all_chunks = [chunk for chunks in chunk_lists for chunk in chunks]
+        embeddings = create_embeddings(all_chunks, batch_size=args.batch_size)
+        timer.stage("embed", started)
+
+        started = time.perf_counter()
+        offset = 0
+        for chapter, chunks in zip(pending, chunk_lists):
+            if not chunks:
+                print(f"WARNING: No text extracted from {chapter.pdf_path}, skipping")
+                continue
+            store = VectorStore(chunks, embeddings=embeddings[offset:offset + len(chunks)])
+            offset += len(chunks)
+            index_cache.save_store(chapter.pdf_path, store, sha256=hashes[chapter.pdf_path], replace=args.force)
+        timer.stage("index+save", started)
+        print(f"Embedded {len(all_chunks)} chunks")
+
+    # Merged per-standard indexes for global search (built from the chapter cache)
+    started = time.perf_counter()
+    for standard in sorted({c.standard for c in chapters}):
+        content = scan_standard(args.std_dir, standard)
+        index_cache.load_or_build_standard_index(standard, content, rebuild=args.force)
+    timer.stage("standard-index", started)
+
+    report = {
+        "chapters": len(chapters),
+        "ingested": len(pending),
+        "timings_s": {k: round(v, 3) for k, v in timer.timings.items()},
+        "total_s": round(timer.total(), 3),
+        **index_cache.build_signature(),
+    }
+    sources.INDEX_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with open(sources.INDEX_CACHE_DIR / "ingest_report.json", "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Done in {report['total_s']}s. Index directory: {sources.INDEX_CACHE_DIR}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
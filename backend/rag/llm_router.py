@@ -0,0 +1,512 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+from rag.metrics import LLM_REQUEST_SECONDS, LLM_TOKENS
+
+logger = logging.getLogger(__name__)
+
+Messages = List[Dict[str, str]]
+
+# Consecutive failures that open a provider's circuit, and how long it stays
+# open before a single trial request is let through (half-open).
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+LLM_BREAKER_COOLDOWN_S = float(os.getenv("LLM_BREAKER_COOLDOWN_S", "30"))
+# Latency samples kept per provider, and how many are needed before the
+# router trusts them for ordering and hedging.
+LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "100"))
+LLM_MIN_SAMPLES = int(os.getenv("LLM_MIN_SAMPLES", "10"))
+# Send a non-streaming request to a second provider as well if the first
+# has not answered within its p95 latency; the first answer wins.
+LLM_HEDGE = os.getenv("LLM_HEDGE", "0") == "1"
+
+
+class NoProviderAvailable(RuntimeError):
+    pass
+
+
+class StreamInterrupted(RuntimeError):
+    """
+    A provider failed after it had already streamed part of the answer; the
+    text received so far is incomplete.
+    """
+
+
+def _record_usage(provider: str, prompt_tokens, completion_tokens) -> None:
+    if prompt_tokens:
+        LLM_TOKENS.inc(prompt_tokens, provider=provider, kind="prompt")
+    if completion_tokens:
+        LLM_TOKENS.inc(completion_tokens, provider=provider, kind="completion")
+
+
+def _record_openai_usage(provider: str, completion) -> None:
+    usage = getattr(completion, "usage", None)
+    if usage is not None:
+        _record_usage(provider, getattr(usage, "prompt_tokens", 0), getattr(usage, "completion_tokens", 0))
+
+
+class LazyClient:
+    """
+    Stands in for an SDK client until first used: `factory` (which may import
+    the SDK) runs once, on the first attribute access or resolve().
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    def resolve(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    def __getattr__(self, name: str):
+        return getattr(self.resolve(), name)
+
+
+class Provider:
+    """
+    One LLM backend. Subclasses implement the sync and async, whole and
+    streamed call styles; any exception counts as a provider failure.
+    """
+
+    name = "provider"
+
+    def complete(self, messages: Messages) -> str:
+        raise NotImplementedError
+
+    def stream(self, messages: Messages) -> Iterator[str]:
+        raise NotImplementedError
+
+    async def acomplete(self, messages: Messages) -> str:
+        raise NotImplementedError
+
+    def astream(self, messages: Messages) -> AsyncIterator[str]:
+        raise NotImplementedError
+
+
+class GroqProvider(Provider):
+    name = "groq"
+
+    def __init__(self, client, async_client, model: str):
+        self.client = client
+        self.async_client = async_client
+        self.model = model
+
+    def complete(self, messages: Messages) -> str:
+        completion = self.client.chat.completions.create(model=self.model, messages=messages, temperature=0.1)
+        _record_openai_usage(self.name, completion)
+        return completion.choices[0].message.content
+
+    def stream(self, messages: Messages) -> Iterator[str]:
+        stream = self.client.chat.completions.create(
+            model=self.model, messages=messages, temperature=0.1, stream=True
+        )
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield delta
+
+    async def acomplete(self, messages: Messages) -> str:
+        completion = await self.async_client.chat.completions.create(
+            model=self.model, messages=messages, temperature=0.1
+        )
+        _record_openai_usage(self.name, completion)
+        return completion.choices[0].message.content
+
+    async def astream(self, messages: Messages) -> AsyncIterator[str]:
+        stream = await self.async_client.chat.completions.create(
+            model=self.model, messages=messages, temperature=0.1, stream=True
+        )
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield delta
+
+
+class HuggingFaceProvider(Provider):
+    name = "huggingface"
+
+    def __init__(self, client, async_client, model: str, max_tokens: int = 500):
+        self.client = client
+        self.async_client = async_client
+        self.model = model
+        self.max_tokens = max_tokens
+
+    def complete(self, messages: Messages) -> str:
+        completion = self.client.chat_completion(model=self.model, messages=messages, max_tokens=self.max_tokens)
+        _record_openai_usage(self.name, completion)
+        return completion.choices[0].message.content
+
+    def stream(self, messages: Messages) -> Iterator[str]:
+        stream = self.client.chat_completion(
+            model=self.model, messages=messages, max_tokens=self.max_tokens, stream=True
+        )
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield delta
+
+    async def acomplete(self, messages: Messages) -> str:
+        completion = await self.async_client.chat_completion(
+            model=self.model, messages=messages, max_tokens=self.max_tokens
+        )
+        _record_openai_usage(self.name, completion)
+        return completion.choices[0].message.content
+
+    async def astream(self, messages: Messages) -> AsyncIterator[str]:
+        stream = await self.async_client.chat_completion(
+            model=self.model, messages=messages, max_tokens=self.max_tokens, stream=True
+        )
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield delta
+
+
+class OllamaProvider(Provider):
+    name = "ollama"
+
+    def __init__(self, client, async_client, model: str):
+        self.client = client
+        self.async_client = async_client
+        self.model = model
+
+    def complete(self, messages: Messages) -> str:
+        response = self.client.chat(model=self.model, messages=messages)
+        _record_usage(self.name, response.get('prompt_eval_count'), response.get('eval_count'))
+        return response['message']['content']
+
+    def stream(self, messages: Messages) -> Iterator[str]:
+        for part in self.client.chat(model=self.model, messages=messages, stream=True):
+            delta = part['message']['content']
+            if delta:
+                yield delta
+
+    async def acomplete(self, messages: Messages) -> str:
+        response = await self.async_client.chat(model=self.model, messages=messages)
+        _record_usage(self.name, response.get('prompt_eval_count'), response.get('eval_count'))
+        return response['message']['content']
+
+    async def astream(self, messages: Messages) -> AsyncIterator[str]:
+        stream = await self.async_client.chat(model=self.model, messages=messages, stream=True)
+        async for part in stream:
+            delta = part['message']['content']
+            if delta:
+                yield delta
+
+
+class StubProvider(Provider):
+    """
+    Local stand-in for tests and benchmarks: answers `reply` after
+    `latency_s`, or raises if `fail` is set.
+    """
+
+    def __init__(self, name: str = "stub", reply: str = "This is a stub answer.", latency_s: float = 0.0, fail: bool = False):
+        self.name = name
+        self.reply = reply
+        self.latency_s = latency_s
+        self.fail = fail
+
+    def _check(self) -> None:
+        if self.fail:
+            raise RuntimeError(f"{self.name} is configured to fail")
+
+    def _pieces(self) -> List[str]:
+        words = self.reply.split(" ")
+        return [word + " " for word in words[:-1]] + words[-1:]
+
+    def complete(self, messages: Messages) -> str:
+        time.sleep(self.latency_s)
+        self._check()
+        return self.reply
+
+    def stream(self, messages: Messages) -> Iterator[str]:
+        time.sleep(self.latency_s)
+        self._check()
+        yield from self._pieces()
+
+    async def acomplete(self, messages: Messages) -> str:
+        await asyncio.sleep(self.latency_s)
+        self._check()
+        return self.reply
+
+    async def astream(self, messages: Messages) -> AsyncIterator[str]:
+        await asyncio.sleep(self.latency_s)
+        self._check()
+        for piece in self._pieces():
+            yield piece
+
+
+def _percentile(values, q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class _ProviderState:
+    def __init__(self, provider: Provider, priority: int):
+        self.provider = provider
+        self.priority = priority
+        # Seconds to the full answer, or to the first token when streaming
+        self.latencies: deque = deque(maxlen=LLM_LATENCY_WINDOW)
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0  # 0 = closed
+        self.trial_in_flight = False
+
+    def measured(self) -> bool:
+        return len(self.latencies) >= LLM_MIN_SAMPLES
+
+    def expected_latency(self) -> float:
+        return _percentile(self.latencies, 0.5)
+
+
+class LLMRouter:
+    """
+    Sends each request to the fastest healthy provider and falls through to
+    the next one on failure.
+
+    Providers keep the order given, except that measured providers are
+    reordered among themselves by median latency; an unmeasured provider
+    keeps its configured place. After LLM_BREAKER_FAILURES consecutive
+    failures a provider is skipped for LLM_BREAKER_COOLDOWN_S, then it goes
+    first for one trial request that decides whether it comes back. Streams
+    only fall through if the failing provider has not emitted anything yet;
+    otherwise StreamInterrupted is raised.
+    """
+
+    def __init__(self, providers: List[Provider], hedge: bool = LLM_HEDGE):
+        self._states = [_ProviderState(provider, i) for i, provider in enumerate(providers)]
+        self.hedge = hedge
+        self._lock = threading.Lock()
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    @property
+    def providers(self) -> List[Provider]:
+        return [state.provider for state in self._states]
+
+    def _candidates(self) -> List[_ProviderState]:
+        now = time.monotonic()
+        with self._lock:
+            usable = [s for s in self._states if s.open_until <= now]
+            measured = iter(sorted(
+                (s for s in usable if s.measured()),
+                key=lambda s: (s.expected_latency(), s.priority),
+            ))
+            ordered = [next(measured) if s.measured() else s for s in usable]
+            # Half-open providers whose cooldown has passed go first for their trial
+            return sorted(ordered, key=lambda s: s.open_until == 0.0 or s.trial_in_flight)
+
+    def _acquire(self, state: _ProviderState) -> bool:
+        """
+        Claim a call slot; a half-open provider admits a single trial.
+        """
+        with self._lock:
+            if state.open_until == 0.0:
+                return True
+            if state.open_until > time.monotonic() or state.trial_in_flight:
+                return False
+            state.trial_in_flight = True
+            return True
+
+    def _record(self, state: _ProviderState, seconds: Optional[float], ok: bool) -> None:
+        """
+        Record an outcome; `seconds` is None for a call that was cancelled.
+        """
+        if seconds is not None:
+            LLM_REQUEST_SECONDS.observe(seconds, provider=state.provider.name, outcome="ok" if ok else "error")
+        with self._lock:
+            state.trial_in_flight = False
+            if seconds is None:
+                return
+            state.requests += 1
+            if ok:
+                state.latencies.append(seconds)
+                state.consecutive_failures = 0
+                state.open_until = 0.0
+                return
+            state.failures += 1
+            state.consecutive_failures += 1
+            if state.open_until or state.consecutive_failures >= LLM_BREAKER_FAILURES:
+                state.open_until = time.monotonic() + LLM_BREAKER_COOLDOWN_S
+                logger.warning("%s circuit open for %.0fs", state.provider.name, LLM_BREAKER_COOLDOWN_S)
+
+    def _fail(self, state: _ProviderState, started: float, error: Exception) -> None:
+        logger.warning("%s failed (%s). Falling back to next available...", state.provider.name, error)
+        self._record(state, time.perf_counter() - started, False)
+
+    def complete(self, messages: Messages) -> str:
+        for state in self._candidates():
+            if not self._acquire(state):
+                continue
+            started = time.perf_counter()
+            try:
+                result = state.provider.complete(messages)
+            except Exception as e:
+                self._fail(state, started, e)
+                continue
+            self._record(state, time.perf_counter() - started, True)
+            return result
+        raise NoProviderAvailable("All LLM providers failed or are unavailable")
+
+    def stream(self, messages: Messages) -> Iterator[str]:
+        for state in self._candidates():
+            if not self._acquire(state):
+                continue
+            started = time.perf_counter()
+            emitted = False
+            try:
+                for delta in state.provider.stream(messages):
+                    if not emitted:
+                        emitted = True
+                        self._record(state, time.perf_counter() - started, True)
+                    LLM_TOKENS.inc(provider=state.provider.name, kind="completion")
+                    yield delta
+            except Exception as e:
+                if emitted:
+                    logger.warning("%s stream interrupted (%s).", state.provider.name, e)
+                    raise StreamInterrupted(f"{state.provider.name} stream interrupted: {e}") from e
+                self._fail(state, started, e)
+                continue
+            if not emitted:
+                self._record(state, time.perf_counter() - started, True)
+            return
+        raise NoProviderAvailable("All LLM providers failed or are unavailable")
+
+    async def _acall(self, state: _ProviderState, messages: Messages) -> str:
+        started = time.perf_counter()
+        try:
+            result = await state.provider.acomplete(messages)
+        except asyncio.CancelledError:
+            self._record(state, None, False)
+            raise
+        except Exception as e:
+            self._fail(state, started, e)
+            raise
+        self._record(state, time.perf_counter() - started, True)
+        return result
+
+    def _hedge_delay(self, state: _ProviderState) -> Optional[float]:
+        with self._lock:
+            if not self.hedge or len(state.latencies) < LLM_MIN_SAMPLES:
+                return None
+            return _percentile(state.latencies, 0.95)
+
+    async def acomplete(self, messages: Messages) -> str:
+        queue = self._candidates()
+        pending: Dict[asyncio.Task, _ProviderState] = {}
+        hedge_tasks = set()
+
+        def start_next() -> Optional[asyncio.Task]:
+            while queue:
+                state = queue.pop(0)
+                if self._acquire(state):
+                    task = asyncio.create_task(self._acall(state, messages))
+                    pending[task] = state
+                    return task
+            return None
+
+        try:
+            while pending or start_next():
+                delay = None
+                if len(pending) == 1 and queue:
+                    delay = self._hedge_delay(next(iter(pending.values())))
+                done, _ = await asyncio.wait(pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Slower than the provider's p95: race the next provider
+                    hedge = start_next()
+                    if hedge is not None:
+                        hedge_tasks.add(hedge)
+                        with self._lock:
+                            self.hedges += 1
+                    continue
+                for task in done:
+                    pending.pop(task)
+                    if task.exception() is None:
+                        if task in hedge_tasks:
+                            with self._lock:
+                                self.hedge_wins += 1
+                        return task.result()
+            raise NoProviderAvailable("All LLM providers failed or are unavailable")
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def astream(self, messages: Messages) -> AsyncIterator[str]:
+        for state in self._candidates():
+            if not self._acquire(state):
+                continue
+            started = time.perf_counter()
+            emitted = False
+            try:
+                async for delta in state.provider.astream(messages):
+                    if not emitted:
+                        emitted = True
+                        self._record(state, time.perf_counter() - started, True)
+                    LLM_TOKENS.inc(provider=state.provider.name, kind="completion")
+                    yield delta
+            except asyncio.CancelledError:
+                if not emitted:
+                    self._record(state, None, False)
+                raise
+            except Exception as e:
+                if emitted:
+                    logger.warning("%s stream interrupted (%s).", state.provider.name, e)
+                    raise StreamInterrupted(f"{state.provider.name} stream interrupted: {e}") from e
+                self._fail(state, started, e)
+                continue
+            if not emitted:
+                self._record(state, time.perf_counter() - started, True)
+            return
+        raise NoProviderAvailable("All LLM providers failed or are unavailable")
+
+    def warm_up(self) -> Dict[str, str]:
+        """
+        Create every provider's lazy clients now. A client that fails to
+        initialize is reported, not raised: the router just falls back.
+        """
+        status = {}
+        for provider in self.providers:
+            try:
+                for client in (getattr(provider, "client", None), getattr(provider, "async_client", None)):
+                    if isinstance(client, LazyClient):
+                        client.resolve()
+                status[provider.name] = "ok"
+            except Exception as e:
+                logger.warning("%s client initialization failed: %s", provider.name, e)
+                status[provider.name] = f"error: {e}"
+        return status
+
+    def stats(self) -> Dict[str, object]:
+        now = time.monotonic()
+        with self._lock:
+            providers = {}
+            for state in self._states:
+                if state.open_until == 0.0:
+                    circuit = "closed"
+                elif state.open_until > now:
+                    circuit = "open"
+                else:
+                    circuit = "half_open"
+                p50 = _percentile(state.latencies, 0.5)
+                p95 = _percentile(state.latencies, 0.95)
+                providers[state.provider.name] = {
+                    "circuit": circuit,
+                    "requests": state.requests,
+                    "failures": state.failures,
+                    "error_rate": round(state.failures / state.requests, 4) if state.requests else 0.0,
+                    "p50_ms": round(1000 * p50, 1) if p50 is not None else None,
+                    "p95_ms": round(1000 * p95, 1) if p95 is not None else None,
+                }
+            return {"providers": providers, "hedges": self.hedges, "hedge_wins": self.hedge_wins}
@@ -0,0 +1,62 @@
+import mmap
+import os
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+
+
+# Map index artifacts (vectors, inverted lists, BM25 postings, chunk text)
+# read-only instead of reading them into each process. Every uvicorn worker
+# then shares one copy in the OS page cache. 0 reads them into the heap.
+INDEX_MMAP = os.getenv("INDEX_MMAP", "1") == "1"
+
+Buffer = Union[bytes, mmap.mmap]
+
+
+def load_array(path: Path, mapped: bool = INDEX_MMAP) -> np.ndarray:
+    """
+    np.load, memory-mapped read-only when `mapped`.
+    """
+    if mapped:
+        try:
+            return np.load(path, mmap_mode="r")
+        except ValueError:
+            # Zero-length arrays cannot be mapped
+            pass
+    return np.load(path)
+
+
+def load_bytes(path: Path, mapped: bool = INDEX_MMAP) -> Buffer:
+    """
+    File contents as a read-only mmap when `mapped`, else as bytes.
+    """
+    with open(path, "rb") as f:
+        if mapped:
+            try:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty file
+                pass
+        return f.read()
+
+
+def is_mapped(obj) -> bool:
+    """
+    True if an array or buffer is backed by a file mapping, i.e. lives in
+    the shared page cache rather than the process heap.
+    """
+    while obj is not None:
+        if isinstance(obj, (mmap.mmap, np.memmap)):
+            return True
+        obj = getattr(obj, "base", None)
+    return False
+
+
+def heap_nbytes(obj) -> int:
+    """
+    Bytes an array or buffer takes on the process heap (0 when mapped).
+    """
+    if is_mapped(obj):
+        return 0
+    return obj.nbytes if isinstance(obj, np.ndarray) else len(obj)
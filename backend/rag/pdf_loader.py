@@ -1,14 +1,93 @@
-from typing import List
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Sequence
 
 import pdfplumber
 
-def load_pdf_text(pdf_path: str) -> str:
-    text = ""
+from rag import sources
+from rag.chunker import chunk_pages
+
+logger = logging.getLogger(__name__)
+
+# Processes used to extract one PDF's pages; 0 picks min(4, cpu count).
+# The default of 1 extracts in the calling process: the API builds missing
+# chapters on request threads, where forking (or, on Windows, spawning and
+# re-importing) a pool per PDF costs more than it saves. Offline tools pass
+# `workers` explicitly.
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "1"))
+# Pages handed to a worker at a time
+PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+# "tokens": sentence/page-aware token chunks stored as offsets (rag.chunker)
+# "chars":  the original ~500-character word chunks
+CHUNKER = os.getenv("CHUNKER", "tokens")
+
+
+def _extract_page_range(pdf_path: str, start: int, end: int) -> List[str]:
+    with pdfplumber.open(pdf_path) as pdf:
+        return [(pdf.pages[i].extract_text() or "") for i in range(start, end)]
+
+
+def _page_cache_path(sha256: str):
+    return sources.INDEX_CACHE_DIR / "pages" / f"{sha256}.json"
+
+
+def _iter_extracted_pages(pdf_path: str, workers: int) -> Iterator[str]:
     with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            page_text = page.extract_text() or ""
-            text += page_text + "\n"
-    return text
+        page_count = len(pdf.pages)
+        if workers <= 1 or page_count <= PAGES_PER_TASK:
+            for page in pdf.pages:
+                yield page.extract_text() or ""
+            return
+
+    ranges = [(start, min(start + PAGES_PER_TASK, page_count)) for start in range(0, page_count, PAGES_PER_TASK)]
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+        futures = [pool.submit(_extract_page_range, pdf_path, start, end) for start, end in ranges]
+        # Yield in page order as soon as each leading range is done
+        for future in futures:
+            yield from future.result()
+
+
+def iter_pdf_pages(pdf_path: str, workers: Optional[int] = None, refresh: bool = False) -> Iterator[str]:
+    """
+    Yield the text of each page in order.
+
+    With `workers` > 1 (default PDF_WORKERS) page ranges are extracted in a
+    process pool. The result is cached by the PDF's content hash so
+    re-chunking or re-embedding never parses the same PDF again. `refresh`
+    ignores and rewrites the cached text.
+    """
+    if workers is None:
+        workers = PDF_WORKERS
+    if workers <= 0:
+        workers = min(4, os.cpu_count() or 1)
+
+    cache_path = _page_cache_path(sources.source_hash(pdf_path))
+    pages = None
+    if not refresh:
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                pages = json.load(f)
+        except (OSError, ValueError):
+            pass
+    if pages is not None:
+        yield from pages
+        return
+
+    pages = []
+    for page_text in _iter_extracted_pages(pdf_path, workers):
+        pages.append(page_text)
+        yield page_text
+
+    try:
+        sources.write_json_atomic(cache_path, pages)
+    except OSError as e:
+        logger.warning("Could not write page cache for %s: %s", pdf_path, e)
+
+
+def load_pdf_text(pdf_path: str, workers: Optional[int] = None, refresh: bool = False) -> str:
+    return "".join(page_text + "\n" for page_text in iter_pdf_pages(pdf_path, workers, refresh))
 
 
 def chunk_text(text: str, max_tokens: int = 500) -> List[str]:
@@ -33,3 +112,13 @@ def chunk_text(text: str, max_tokens: int = 500) -> List[str]:
         chunks.append(" ".join(current))
 
     return chunks
+
+
+def extract_chunks(pdf_path: str, workers: Optional[int] = None, refresh: bool = False) -> Sequence[str]:
+    """
+    Load and chunk one PDF with the configured CHUNKER. Kept free of
+    embedding imports so it can run cheaply in worker processes.
+    """
+    if CHUNKER == "chars":
+        return chunk_text(load_pdf_text(pdf_path, workers, refresh))
+    return chunk_pages(iter_pdf_pages(pdf_path, workers, refresh))
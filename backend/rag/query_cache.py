@@ -0,0 +1,244 @@
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from rag.executor import run_cpu
+
+logger = logging.getLogger(__name__)
+
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "10000"))
+# Path of a SQLite file to persist entries across restarts; empty = memory only
+QUERY_CACHE_DB = os.getenv("QUERY_CACHE_DB", "")
+# Writes to the SQLite file are queued and committed together at most this
+# often, by a background thread
+QUERY_CACHE_FLUSH_S = float(os.getenv("QUERY_CACHE_FLUSH_S", "1.0"))
+# LLM rewrites older than this are asked for again (prompt or provider may
+# have changed); 0 keeps them until evicted. Embeddings are keyed per model
+# and never expire.
+QUERY_REWRITE_TTL_S = float(os.getenv("QUERY_REWRITE_TTL_S", "0"))
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+def normalize_question(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+class _LRU:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, object]" = OrderedDict()
+
+    def get(self, key: str):
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class _SQLiteStore:
+    """
+    The persistent tier. Lookups run on the calling thread (async callers go
+    through run_cpu); writes are queued and committed in batches by a daemon
+    thread, so storing an entry never waits on the disk.
+    """
+
+    def __init__(self, path: str, flush_s: float = QUERY_CACHE_FLUSH_S):
+        self.flush_s = flush_s
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[str, tuple]] = []
+        self._cond = threading.Condition()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS query_rewrites "
+            "(key TEXT PRIMARY KEY, rewritten TEXT NOT NULL, updated_at REAL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS query_embeddings "
+            "(key TEXT NOT NULL, model TEXT NOT NULL, vector BLOB NOT NULL, updated_at REAL, "
+            "PRIMARY KEY (key, model))"
+        )
+        self._conn.commit()
+        threading.Thread(target=self._write_loop, name="query-cache-writer", daemon=True).start()
+        atexit.register(self.flush)
+
+    def fetchone(self, sql: str, params: tuple):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()
+
+    def write(self, sql: str, params: tuple) -> None:
+        with self._cond:
+            self._pending.append((sql, params))
+            self._cond.notify()
+
+    def flush(self) -> None:
+        with self._cond:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            with self._lock:
+                for sql, params in batch:
+                    self._conn.execute(sql, params)
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning("Dropped %d query cache writes: %s", len(batch), e)
+
+    def _write_loop(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending)
+            # Let a batch build up, then commit it in one transaction
+            time.sleep(self.flush_s)
+            self.flush()
+
+
+class QueryCache:
+    """
+    Bounded LRU of question -> LLM rewrite and query text -> float32 embedding,
+    optionally backed by SQLite so repeated questions skip both the rewrite
+    call and the model forward pass after a restart too.
+
+    Embeddings are stored per embedding model, so switching models never
+    serves stale vectors; rewrites expire after `rewrite_ttl_s`. Async code should use aget_rewrite/aget_embedding,
+    which read SQLite off the event loop; put_* only touch memory and queue
+    the disk write.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        max_entries: int = QUERY_CACHE_SIZE,
+        sqlite_path: str = QUERY_CACHE_DB,
+        rewrite_ttl_s: float = QUERY_REWRITE_TTL_S,
+    ):
+        self.model_name = model_name
+        self.rewrite_ttl_s = rewrite_ttl_s
+        self._lock = threading.Lock()
+        self._rewrites = _LRU(max_entries)
+        self._embeddings = _LRU(max_entries)
+        self._db: Optional[_SQLiteStore] = None
+        self.counters = {
+            "rewrite_hits": 0, "rewrite_misses": 0,
+            "embedding_hits": 0, "embedding_misses": 0,
+            "sqlite_hits": 0,
+        }
+        if sqlite_path:
+            self._db = _SQLiteStore(sqlite_path)
+
+    def _memory_get(self, table: _LRU, key: str):
+        with self._lock:
+            return table.get(key)
+
+    def _count(self, kind: str, value) -> None:
+        with self._lock:
+            self.counters[f"{kind}_hits" if value is not None else f"{kind}_misses"] += 1
+
+    def _fresh(self, written_at: float) -> bool:
+        return not self.rewrite_ttl_s or time.time() - written_at <= self.rewrite_ttl_s
+
+    def _memory_rewrite(self, key: str) -> Optional[str]:
+        # Rewrites are held as (text, written_at)
+        entry = self._memory_get(self._rewrites, key)
+        return entry[0] if entry is not None and self._fresh(entry[1]) else None
+
+    def _load_rewrite(self, key: str) -> Optional[str]:
+        row = self._db.fetchone("SELECT rewritten, updated_at FROM query_rewrites WHERE key = ?", (key,))
+        if not row or not self._fresh(row[1] or 0.0):
+            return None
+        with self._lock:
+            self._rewrites.put(key, (row[0], row[1]))
+            self.counters["sqlite_hits"] += 1
+        return row[0]
+
+    def _load_embedding(self, key: str) -> Optional[np.ndarray]:
+        row = self._db.fetchone(
+            "SELECT vector FROM query_embeddings WHERE key = ? AND model = ?", (key, self.model_name)
+        )
+        if not row:
+            return None
+        value = np.frombuffer(row[0], dtype="float32")
+        with self._lock:
+            self._embeddings.put(key, value)
+            self.counters["sqlite_hits"] += 1
+        return value
+
+    def get_rewrite(self, question: str) -> Optional[str]:
+        key = normalize_question(question)
+        value = self._memory_rewrite(key)
+        if value is None and self._db is not None:
+            value = self._load_rewrite(key)
+        self._count("rewrite", value)
+        return value
+
+    async def aget_rewrite(self, question: str) -> Optional[str]:
+        key = normalize_question(question)
+        value = self._memory_rewrite(key)
+        if value is None and self._db is not None:
+            value = await run_cpu(self._load_rewrite, key)
+        self._count("rewrite", value)
+        return value
+
+    def put_rewrite(self, question: str, rewritten: str) -> None:
+        key = normalize_question(question)
+        now = time.time()
+        with self._lock:
+            self._rewrites.put(key, (rewritten, now))
+        if self._db is not None:
+            self._db.write("INSERT OR REPLACE INTO query_rewrites VALUES (?, ?, ?)", (key, rewritten, now))
+
+    def get_embedding(self, text: str) -> Optional[np.ndarray]:
+        key = normalize_text(text)
+        value = self._memory_get(self._embeddings, key)
+        if value is None and self._db is not None:
+            value = self._load_embedding(key)
+        self._count("embedding", value)
+        return value
+
+    async def aget_embedding(self, text: str) -> Optional[np.ndarray]:
+        key = normalize_text(text)
+        value = self._memory_get(self._embeddings, key)
+        if value is None and self._db is not None:
+            value = await run_cpu(self._load_embedding, key)
+        self._count("embedding", value)
+        return value
+
+    def put_embedding(self, text: str, vector: np.ndarray) -> None:
+        key = normalize_text(text)
+        vector = np.ascontiguousarray(vector, dtype="float32")
+        vector.setflags(write=False)
+        with self._lock:
+            self._embeddings.put(key, vector)
+        if self._db is not None:
+            self._db.write(
+                "INSERT OR REPLACE INTO query_embeddings VALUES (?, ?, ?, ?)",
+                (key, self.model_name, vector.tobytes(), time.time()),
+            )
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                **self.counters,
+                "rewrites": len(self._rewrites),
+                "embeddings": len(self._embeddings),
+                "persistent": self._db is not None,
+            }
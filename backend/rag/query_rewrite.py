@@ -0,0 +1,157 @@
+import asyncio
+import os
+import re
+import time
+from typing import Awaitable, Callable, Dict, List, Sequence, Set
+
+from rag.advanced_nlp import UNAVAILABLE_MESSAGE, arewrite_query
+from rag.metrics import span
+from rag.query_cache import QueryCache, normalize_question
+from rag.sparse_index import RRF_K
+
+
+# How the learner question is turned into a retrieval query:
+#   off         - search with the question as typed
+#   local       - cheap regex clean-up, no LLM call (default)
+#   cache       - reuse a previous LLM rewrite of the same question; on a miss
+#                 search with the local rewrite and fill the cache in the background
+#   llm         - wait for an LLM rewrite unless one is cached (the original behaviour)
+#   speculative - search with the local rewrite while the LLM rewrite runs, then
+#                 merge in its results if it returns within QUERY_REWRITE_TIMEOUT_S
+REWRITE_STRATEGIES = ("off", "local", "cache", "llm", "speculative")
+
+QUERY_REWRITE_STRATEGY = os.getenv("QUERY_REWRITE_STRATEGY", "local")
+QUERY_REWRITE_TIMEOUT_S = float(os.getenv("QUERY_REWRITE_TIMEOUT_S", "1.5"))
+
+# Search callback: takes the query text, returns hits whose first two fields
+# are (chunk_text, distance), smaller distance = better.
+SearchFn = Callable[[str], Awaitable[List[Sequence]]]
+
+_FILLER_PREFIX = re.compile(
+    r"^(?:(?:hi|hello|hey|sir|madam|ma'am)[,!.\s]+)*"
+    r"(?:please\s+)?(?:(?:can|could|would|will)\s+you\s+(?:please\s+)?)?"
+    r"(?:(?:tell|explain|describe|show)\s+(?:to\s+)?(?:me\s+)?(?:about\s+)?|i\s+want\s+to\s+know\s+(?:about\s+)?)?",
+    re.IGNORECASE,
+)
+_FILLER_SUFFIX = re.compile(r"(?:[\s,]*(?:please|thanks|thank you))*[\s?.!,]*$", re.IGNORECASE)
+
+
+def local_rewrite(query: str) -> str:
+    """
+    Strip greetings, politeness and trailing punctuation so the embedding
+    focuses on the content words. Falls back to the original text.
+    """
+    text = " ".join(query.split())
+    text = _FILLER_PREFIX.sub("", text, count=1)
+    text = _FILLER_SUFFIX.sub("", text, count=1)
+    return text or query.strip()
+
+
+def merge_results(result_lists: List[List[Sequence]], top_k: int) -> List[Sequence]:
+    """
+    Union of several hit lists, ordered by reciprocal rank fusion. Distances
+    are not compared: hybrid and dense-only searches report them on
+    different scales. Each chunk keeps the hit from the first list it is in.
+    """
+    scores: Dict[str, float] = {}
+    hits: Dict[str, Sequence] = {}
+    for results in result_lists:
+        for rank, hit in enumerate(results, start=1):
+            scores[hit[0]] = scores.get(hit[0], 0.0) + 1.0 / (RRF_K + rank)
+            hits.setdefault(hit[0], hit)
+    return [hits[chunk] for chunk in sorted(scores, key=lambda chunk: -scores[chunk])[:top_k]]
+
+
+class QueryRewriter:
+    """
+    Applies a rewrite strategy around a search callback and records the
+    latency of rewrite+retrieval per strategy.
+    """
+
+    def __init__(
+        self,
+        cache: QueryCache,
+        strategy: str = QUERY_REWRITE_STRATEGY,
+        timeout_s: float = QUERY_REWRITE_TIMEOUT_S,
+    ):
+        if strategy not in REWRITE_STRATEGIES:
+            raise ValueError(f"Unknown query rewrite strategy '{strategy}', expected one of {REWRITE_STRATEGIES}")
+        self.strategy = strategy
+        self.timeout_s = timeout_s
+        self.cache = cache
+        self._latency: Dict[str, Dict[str, float]] = {}
+        self._background: Set[asyncio.Task] = set()
+
+    async def _llm_rewrite(self, query: str) -> str:
+        with span("rewrite_query"):
+            rewritten = await arewrite_query(query)
+        if not rewritten or rewritten == UNAVAILABLE_MESSAGE:
+            return query
+        self.cache.put_rewrite(query, rewritten)
+        return rewritten
+
+    def _rewrite_in_background(self, query: str) -> asyncio.Task:
+        task = asyncio.create_task(self._llm_rewrite(query))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return task
+
+    async def retrieve(self, question: str, search: SearchFn, top_k: int = 5, strategy: str = None) -> List[Sequence]:
+        strategy = strategy or self.strategy
+        if strategy not in REWRITE_STRATEGIES:
+            raise ValueError(f"Unknown query rewrite strategy '{strategy}'")
+        started = time.perf_counter()
+        try:
+            return await self._retrieve(strategy, question, search, top_k)
+        finally:
+            self._record(strategy, time.perf_counter() - started)
+
+    async def _retrieve(self, strategy: str, question: str, search: SearchFn, top_k: int) -> List[Sequence]:
+        if strategy == "off":
+            return await search(question)
+
+        if strategy == "local":
+            return await search(local_rewrite(question))
+
+        if strategy == "llm":
+            cached = await self.cache.aget_rewrite(question)
+            return await search(cached if cached is not None else await self._llm_rewrite(question))
+
+        if strategy == "cache":
+            cached = await self.cache.aget_rewrite(question)
+            if cached is not None:
+                return await search(cached)
+            self._rewrite_in_background(question)
+            return await search(local_rewrite(question))
+
+        # speculative
+        cached = await self.cache.aget_rewrite(question)
+        if cached is not None:
+            return await search(cached)
+        rewrite_task = self._rewrite_in_background(question)
+        local_results = await search(local_rewrite(question))
+        try:
+            rewritten = await asyncio.wait_for(asyncio.shield(rewrite_task), self.timeout_s)
+        except Exception:
+            # Too slow (or failed): answer with what we have; a finished rewrite
+            # still lands in the cache for the next time this is asked.
+            return local_results
+        if normalize_question(rewritten) == normalize_question(local_rewrite(question)):
+            return local_results
+        return merge_results([local_results, await search(rewritten)], top_k)
+
+    def _record(self, strategy: str, seconds: float) -> None:
+        entry = self._latency.setdefault(strategy, {"count": 0, "total_s": 0.0, "max_s": 0.0})
+        entry["count"] += 1
+        entry["total_s"] += seconds
+        entry["max_s"] = max(entry["max_s"], seconds)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            strategy: {
+                "count": entry["count"],
+                "avg_ms": round(1000 * entry["total_s"] / entry["count"], 2),
+                "max_ms": round(1000 * entry["max_s"], 2),
+            }
+            for strategy, entry in self._latency.items()
+        }
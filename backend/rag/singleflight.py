@@ -0,0 +1,151 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time. Callers that arrive while a call
+    for their key is in progress wait for it and share its result (or its
+    exception) instead of starting a duplicate. Different keys run in parallel.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.leaders += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+class _Broadcast:
+    """
+    Replays one async stream to any number of subscribers, including ones
+    that join after it started.
+    """
+
+    def __init__(self):
+        self.items: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._cond = asyncio.Condition()
+
+    async def run(self, iterator: AsyncIterator[Any]) -> None:
+        try:
+            async for item in iterator:
+                async with self._cond:
+                    self.items.append(item)
+                    self._cond.notify_all()
+        except Exception as e:
+            self.error = e
+        finally:
+            async with self._cond:
+                self.done = True
+                self._cond.notify_all()
+
+    async def subscribe(self) -> AsyncIterator[Any]:
+        i = 0
+        while True:
+            async with self._cond:
+                await self._cond.wait_for(lambda: len(self.items) > i or self.done)
+                items = self.items[i:]
+                done = self.done
+            for item in items:
+                yield item
+            i += len(items)
+            if done and i >= len(self.items):
+                if self.error is not None:
+                    raise self.error
+                return
+
+
+class AsyncSingleFlight:
+    """
+    asyncio counterpart of SingleFlight for coroutines and async streams.
+
+    `do` shares one awaited call per key; `stream` runs one async iterator per
+    key and replays everything it yields to every caller. The shared call runs
+    as its own task, so one caller being cancelled does not cancel it for the
+    others. Must be used from a single event loop.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self._streams: Dict[Hashable, _Broadcast] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    def _forget(self, table: Dict[Hashable, Any], key: Hashable, value: Any) -> None:
+        if table.get(key) is value:
+            del table[key]
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._forget(self._calls, key, t))
+            # Mark the exception retrieved even if every caller went away
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self.leaders += 1
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    async def stream(self, key: Hashable, fn: Callable[..., AsyncIterator[Any]], *args, **kwargs) -> AsyncIterator[Any]:
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            broadcast = _Broadcast()
+            broadcast.task = asyncio.ensure_future(broadcast.run(fn(*args, **kwargs)))
+            self._streams[key] = broadcast
+            broadcast.task.add_done_callback(lambda t: self._forget(self._streams, key, broadcast))
+            self.leaders += 1
+        else:
+            self.shared += 1
+        broadcast.subscribers += 1
+        try:
+            async for item in broadcast.subscribe():
+                yield item
+        finally:
+            broadcast.subscribers -= 1
+            if broadcast.subscribers == 0 and not broadcast.task.done():
+                # Every caller went away: stop the upstream call
+                self._forget(self._streams, key, broadcast)
+                broadcast.task.cancel()
+
+    def in_flight(self) -> int:
+        return len(self._calls) + len(self._streams)
+
+    def stats(self) -> Dict[str, int]:
+        return {"leaders": self.leaders, "coalesced": self.shared, "in_flight": self.in_flight()}
@@ -0,0 +1,58 @@
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+
+# Root of all derived artifacts (index cache, page text cache, source records).
+# Read at call time, so tools such as the ingestion CLI can point it elsewhere.
+INDEX_CACHE_DIR = Path(
+    os.getenv("INDEX_CACHE_DIR", Path(__file__).resolve().parent.parent.parent / "index_cache")
+)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _source_record_path(pdf_path: str) -> Path:
+    path_hash = hashlib.sha1(str(Path(pdf_path).resolve()).encode("utf-8")).hexdigest()
+    return INDEX_CACHE_DIR / "sources" / f"{path_hash}.json"
+
+
+def write_json_atomic(path: Path, data: object) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def source_hash(pdf_path: str) -> str:
+    """
+    Return the sha256 of a PDF, reusing the stored hash while the file's
+    mtime and size are unchanged.
+    """
+    st = os.stat(pdf_path)
+    record_path = _source_record_path(pdf_path)
+    try:
+        with open(record_path, "r", encoding="utf-8") as f:
+            record = json.load(f)
+        if record["mtime_ns"] == st.st_mtime_ns and record["size"] == st.st_size:
+            return record["sha256"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    sha = file_sha256(pdf_path)
+    write_json_atomic(record_path, {
+        "path": str(Path(pdf_path).resolve()),
+        "mtime_ns": st.st_mtime_ns,
+        "size": st.st_size,
+        "sha256": sha,
+    })
+    return sha
@@ -0,0 +1,154 @@
+import json
+import os
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from rag.mmap_files import INDEX_MMAP, heap_nbytes, load_array
+
+
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+# Work bound per query: the rarest query terms are scored first, and terms are
+# dropped once this many postings would be scanned (or past the term cap).
+SPARSE_MAX_QUERY_TERMS = int(os.getenv("SPARSE_MAX_QUERY_TERMS", "12"))
+SPARSE_MAX_POSTINGS = int(os.getenv("SPARSE_MAX_POSTINGS", "200000"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# Latin/digit words plus Devanagari, whose vowel signs are not matched by \w
+_TOKEN = re.compile(r"[\w\u0900-\u097F]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+class SparseIndex:
+    """
+    BM25 inverted index in CSR form: the postings of term t are
+    doc_ids[indptr[t]:indptr[t + 1]] (ascending) with their precomputed
+    BM25 weights, so a query is a handful of array slices and one bincount.
+    """
+
+    def __init__(self, terms: Sequence[str], indptr: np.ndarray, doc_ids: np.ndarray, weights: np.ndarray, n_docs: int):
+        self.terms = list(terms)
+        self.vocab: Dict[str, int] = {term: i for i, term in enumerate(self.terms)}
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.n_docs = n_docs
+
+    @classmethod
+    def build(cls, chunks: Sequence[str], k1: float = BM25_K1, b: float = BM25_B) -> "SparseIndex":
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        lengths = np.zeros(len(chunks), dtype="float32")
+        for doc_id, chunk in enumerate(chunks):
+            tokens = tokenize(chunk)
+            lengths[doc_id] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                postings.setdefault(term, []).append((doc_id, tf))
+
+        n_docs = len(chunks)
+        avg_len = float(lengths.mean()) if n_docs else 0.0
+        terms = sorted(postings)
+        indptr = np.zeros(len(terms) + 1, dtype="int64")
+        doc_ids = np.empty(sum(len(p) for p in postings.values()), dtype="int32")
+        weights = np.empty(len(doc_ids), dtype="float32")
+        pos = 0
+        for t, term in enumerate(terms):
+            docs, tfs = zip(*postings[term])
+            docs = np.asarray(docs, dtype="int32")
+            tfs = np.asarray(tfs, dtype="float32")
+            idf = np.log(1.0 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = k1 * (1.0 - b + b * lengths[docs] / max(avg_len, 1e-9))
+            doc_ids[pos:pos + len(docs)] = docs
+            weights[pos:pos + len(docs)] = idf * tfs * (k1 + 1.0) / (tfs + norm)
+            pos += len(docs)
+            indptr[t + 1] = pos
+        return cls(terms, indptr, doc_ids, weights, n_docs)
+
+    def save(self, directory: Path) -> None:
+        """
+        Postings go into separate .npy files so they can be memory-mapped;
+        the vocabulary (a dict in every process anyway) into sparse_terms.json.
+        """
+        with open(directory / "sparse_terms.json", "w", encoding="utf-8") as f:
+            json.dump({"terms": self.terms, "n_docs": self.n_docs}, f, ensure_ascii=False)
+        np.save(directory / "sparse_indptr.npy", self.indptr)
+        np.save(directory / "sparse_doc_ids.npy", self.doc_ids)
+        np.save(directory / "sparse_weights.npy", self.weights)
+
+    @staticmethod
+    def exists(directory: Path) -> bool:
+        return (directory / "sparse_terms.json").exists()
+
+    @classmethod
+    def load(cls, directory: Path, mapped: bool = INDEX_MMAP) -> "SparseIndex":
+        with open(directory / "sparse_terms.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(
+            meta["terms"],
+            load_array(directory / "sparse_indptr.npy", mapped),
+            load_array(directory / "sparse_doc_ids.npy", mapped),
+            load_array(directory / "sparse_weights.npy", mapped),
+            meta["n_docs"],
+        )
+
+    def nbytes(self) -> int:
+        return (
+            heap_nbytes(self.indptr) + heap_nbytes(self.doc_ids) + heap_nbytes(self.weights)
+            + sum(len(t) for t in self.terms)
+        )
+
+    def _query_slices(self, query: str, id_range: Optional[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        term_ids = {self.vocab[t] for t in tokenize(query) if t in self.vocab}
+        slices = []
+        for t in term_ids:
+            start, end = int(self.indptr[t]), int(self.indptr[t + 1])
+            if id_range is not None:
+                # Postings are sorted by doc id, so a range is a binary search
+                lo = start + int(np.searchsorted(self.doc_ids[start:end], id_range[0]))
+                hi = start + int(np.searchsorted(self.doc_ids[start:end], id_range[1]))
+                start, end = lo, hi
+            if end > start:
+                slices.append((start, end))
+        # Rarest (highest idf, shortest postings) first
+        slices.sort(key=lambda s: s[1] - s[0])
+        kept, scanned = [], 0
+        for start, end in slices[:SPARSE_MAX_QUERY_TERMS]:
+            if kept and scanned + (end - start) > SPARSE_MAX_POSTINGS:
+                break
+            kept.append((start, end))
+            scanned += end - start
+        return kept
+
+    def search(self, query: str, top_k: int = 5, id_range: Optional[Tuple[int, int]] = None) -> List[Tuple[int, float]]:
+        """
+        Return (doc id, BM25 score) pairs, best first, optionally restricted
+        to doc ids in [start, end).
+        """
+        slices = self._query_slices(query, id_range)
+        if not slices:
+            return []
+        docs = np.concatenate([self.doc_ids[s:e] for s, e in slices])
+        scores = np.bincount(docs, weights=np.concatenate([self.weights[s:e] for s, e in slices]), minlength=self.n_docs)
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(i), float(scores[i])) for i in candidates]
+
+
+def reciprocal_rank_fusion(rankings: List[List[int]], top_k: int, k: int = RRF_K) -> List[Tuple[int, float]]:
+    """
+    Fuse ranked id lists by summing 1 / (k + rank). Returns (id, score) pairs,
+    best first.
+    """
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: -item[1])[:top_k]
@@ -0,0 +1,115 @@
+import bisect
+import json
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from rag.chunker import ChunkView
+from rag.vector_store import VectorStore
+
+
+class NoStandardContent(LookupError):
+    """
+    None of a standard's chapters could be loaded, so there is nothing to index.
+    """
+
+
+class ChapterRange(NamedTuple):
+    subject: str
+    chapter: str
+    start: int
+    end: int
+
+
+class StandardIndex:
+    """
+    One FAISS index over every chapter of a standard.
+
+    Vectors are laid out subject by subject, chapter by chapter, so each
+    subject occupies a contiguous id range and subject filtering is a range
+    selector on a single search instead of one search per chapter.
+    """
+
+    def __init__(self, store: VectorStore, ranges: List[ChapterRange]):
+        self.store = store
+        self.ranges = ranges
+        self._starts = [r.start for r in ranges]
+        # Identifies the set of chapter sources the index was built from
+        self.source_id: Optional[str] = None
+
+    @classmethod
+    def from_chapters(cls, chapters: List[Tuple[str, str, VectorStore]]) -> "StandardIndex":
+        """
+        Merge (subject, chapter, store) triples into one index. Raises
+        NoStandardContent for an empty list: without vectors there is not even
+        a dimension to build an index with.
+        """
+        if not chapters:
+            raise NoStandardContent("No chapters to index")
+        chapters = sorted(chapters, key=lambda c: (c[0].lower(), c[1].lower()))
+        ranges: List[ChapterRange] = []
+        start = 0
+        matrices = []
+        for subject, chapter, store in chapters:
+            matrices.append(store.vectors())
+            ranges.append(ChapterRange(subject, chapter, start, start + len(store.chunks)))
+            start += len(store.chunks)
+        chunks: Sequence[str]
+        if all(isinstance(store.chunks, ChunkView) for _, _, store in chapters):
+            chunks = ChunkView.concat([store.chunks for _, _, store in chapters])
+        else:
+            chunks = [chunk for _, _, store in chapters for chunk in store.chunks]
+        return cls(VectorStore(chunks, embeddings=np.vstack(matrices)), ranges)
+
+    def save(self, directory: Path) -> None:
+        self.store.save(directory)
+        with open(directory / "layout.json", "w", encoding="utf-8") as f:
+            json.dump([r._asdict() for r in self.ranges], f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory: Path) -> "StandardIndex":
+        with open(directory / "layout.json", "r", encoding="utf-8") as f:
+            ranges = [ChapterRange(**r) for r in json.load(f)]
+        return cls(VectorStore.load(directory), ranges)
+
+    def nbytes(self) -> int:
+        return self.store.nbytes()
+
+    def subjects(self) -> List[str]:
+        return sorted({r.subject for r in self.ranges})
+
+    def subject_range(self, subject: str) -> Optional[Tuple[int, int]]:
+        """
+        Return the [start, end) id range of a subject (case-insensitive).
+        """
+        matching = [r for r in self.ranges if r.subject.lower() == subject.lower()]
+        if not matching:
+            return None
+        return matching[0].start, matching[-1].end
+
+    def locate(self, idx: int) -> ChapterRange:
+        return self.ranges[bisect.bisect_right(self._starts, idx) - 1]
+
+    def search(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int = 5,
+        subject: Optional[str] = None,
+        query_text: Optional[str] = None,
+    ) -> List[Tuple[str, float, str, str]]:
+        """
+        Returns (chunk, distance, subject, chapter) for the global top_k hits,
+        optionally restricted to one subject. `query_text` enables hybrid search.
+        """
+        id_range = None
+        if subject:
+            id_range = self.subject_range(subject)
+            if id_range is None:
+                return []
+
+        results = []
+        for idx, dist in self.store.search_ids(query_embedding, top_k, id_range=id_range, query_text=query_text):
+            where = self.locate(idx)
+            results.append((self.store.chunks[idx], dist, where.subject, where.chapter))
+        return results
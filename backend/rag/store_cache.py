@@ -0,0 +1,96 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from rag.singleflight import SingleFlight
+
+
+class StoreCache:
+    """
+    Size-aware LRU cache for loaded vector stores.
+
+    Entries are weighed with their `nbytes()` and the least recently used ones
+    are dropped once the total exceeds `max_bytes` or there are more than
+    `max_entries`. Memory-mapped stores weigh almost nothing, so the entry cap
+    is what bounds their open mappings and file handles. Eviction only
+    releases the in-memory objects: the artifacts stay in the on-disk index
+    cache, so a later miss reloads (memory-maps) them instead of re-embedding.
+    """
+
+    def __init__(self, max_bytes: int, max_entries: int = 256):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, store: Any) -> None:
+        size = store.nbytes()
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+            self._entries[key] = (store, size)
+            self.total_bytes += size
+            # Always keep the newest entry, even if it alone exceeds the budget
+            while len(self._entries) > 1 and (
+                self.total_bytes > self.max_bytes or len(self._entries) > self.max_entries
+            ):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                self.evictions += 1
+
+    def get_or_load(self, key: str, loader: Callable[[], Any]) -> Any:
+        """
+        Return the cached entry, or load it with `loader()`. Concurrent misses
+        on the same key wait for a single load; other keys load in parallel.
+        """
+        store = self.get(key)
+        if store is not None:
+            return store
+        return self._flights.do(key, self._load, key, loader)
+
+    def _load(self, key: str, loader: Callable[[], Any]) -> Any:
+        # A flight that finished just before this one started may have filled it
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            return entry[0]
+        store = loader()
+        self.put(key, store)
+        return store
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "loads": self._flights.leaders,
+                "coalesced_loads": self._flights.shared,
+                "loads_in_flight": self._flights.in_flight(),
+            }
@@ -1,51 +1,523 @@
-from typing import List, Tuple
+import json
+import os
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
 
+from rag.chunker import ChunkView
+from rag.embedding_batcher import EmbeddingBatcher
+from rag.embeddings import embedding_key, get_embedding_backend
+from rag.mmap_files import heap_nbytes, is_mapped, load_array
+from rag.query_cache import QueryCache
+from rag.sparse_index import BM25_B, BM25_K1, RRF_K, SparseIndex, reciprocal_rank_fusion
 
-embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
 
-def create_embeddings(text_chunks: List[str]) -> np.ndarray:
+def create_embeddings(text_chunks: List[str], batch_size: int = 32) -> np.ndarray:
     """
-    Create local embeddings using SentenceTransformers.
+    Create local embeddings with the EMBEDDING_BACKEND encoder (loaded on
+    first use), L2-normalized so inner product is cosine similarity.
     """
-    embeddings = embedding_model.encode(text_chunks)
-    return np.array(embeddings, dtype="float32")
+    return get_embedding_backend().encode(list(text_chunks), batch_size=batch_size)
 
 
-def embed_query(query: str) -> List[float]:
+# Concurrent query embeddings are encoded together; see EmbeddingBatcher
+query_batcher = EmbeddingBatcher(
+    create_embeddings,
+    max_batch_size=int(os.getenv("EMBED_BATCH_MAX_SIZE", "32")),
+    max_wait_ms=float(os.getenv("EMBED_BATCH_WAIT_MS", "2")),
+)
+
+
+# Repeated questions skip the model forward pass (QUERY_CACHE_SIZE / QUERY_CACHE_DB)
+query_cache = QueryCache(embedding_key())
+
+
+def embed_query(query: str) -> np.ndarray:
     """
-    Embed a single query string.
+    Embed a single query string (float32 vector), batched with concurrent callers.
     """
-    return embedding_model.encode([query])[0].tolist()
+    vector = query_cache.get_embedding(query)
+    if vector is None:
+        vector = query_batcher.embed(query)
+        query_cache.put_embedding(query, vector)
+    return vector
 
 
-def build_faiss_index(embeddings: np.ndarray) -> faiss.IndexFlatL2:
+async def aembed_query(query: str) -> np.ndarray:
     """
-    Build an in-memory FAISS index from embeddings.
+    Async embed_query: waits on the batcher without holding a worker thread.
     """
-    index = faiss.IndexFlatL2(embeddings.shape[1])
-    index.add(embeddings)
+    vector = await query_cache.aget_embedding(query)
+    if vector is None:
+        vector = await query_batcher.aembed(query)
+        query_cache.put_embedding(query, vector)
+    return vector
+
+
+# Index built for a store:
+#   flat     - exact inner-product search (default)
+#   hnsw     - HNSW graph, FAISS_HNSW_M links per node
+#   ivf_flat - inverted lists over FAISS_IVF_NLIST k-means cells
+#   ivf_pq   - as ivf_flat with FAISS_PQ_M-byte product-quantized codes
+# Stores with fewer than FAISS_ANN_MIN_VECTORS vectors are always flat: exact
+# search is already fast there and IVF needs enough points to train.
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+# How flat, hnsw and ivf_flat indexes hold vectors: float32, float16 (half
+# the memory), int8 (scalar-quantized, a quarter) or pq (FAISS_PQ_M bytes
+# per vector; not for hnsw). All indexes use inner product on normalized
+# vectors.
+STORAGE_TYPES = ("float32", "float16", "int8", "pq")
+FAISS_STORAGE = os.getenv("FAISS_STORAGE", "float32")
+# Keep the float32 embedding matrix next to the index. The index already
+# holds the vectors, so by default it is dropped after building.
+KEEP_RAW_EMBEDDINGS = os.getenv("KEEP_RAW_EMBEDDINGS", "0") == "1"
+# Build a BM25 index next to the dense one and fuse both rankings when the
+# query text is passed to search; each side contributes top_k * HYBRID_CANDIDATES.
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "1") == "1"
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "4"))
+FAISS_ANN_MIN_VECTORS = int(os.getenv("FAISS_ANN_MIN_VECTORS", "5000"))
+FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+FAISS_IVF_NLIST = int(os.getenv("FAISS_IVF_NLIST", "0"))  # 0 = about 4*sqrt(n)
+FAISS_PQ_M = int(os.getenv("FAISS_PQ_M", "48"))
+# Search-time knobs, applied to built and loaded indexes alike
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+# Rows FlatMmapIndex scores at a time. float16 rows are widened into one
+# reused float32 buffer of this many rows (6 MB at 384 dimensions).
+FLAT_SEARCH_BLOCK = int(os.getenv("FLAT_SEARCH_BLOCK", "4096"))
+
+
+def index_config() -> dict:
+    """
+    Build-time index settings, part of the index cache build signature.
+    """
+    return {
+        "type": FAISS_INDEX_TYPE,
+        "storage": FAISS_STORAGE,
+        "metric": "inner_product",
+        "min_vectors": FAISS_ANN_MIN_VECTORS,
+        "hnsw_m": FAISS_HNSW_M,
+        "ivf_nlist": FAISS_IVF_NLIST,
+        "pq_m": FAISS_PQ_M,
+        "sparse": {"k1": BM25_K1, "b": BM25_B} if HYBRID_SEARCH else None,
+    }
+
+
+_STORAGE_CODES = {"float32": "Flat", "float16": "SQfp16", "int8": "SQ8"}
+
+
+def _factory_string(index_type: str, storage: str, n: int) -> str:
+    if index_type == "ivf_pq":
+        index_type, storage = "ivf_flat", "pq"
+    if storage == "pq" and n < 1024:
+        # Too few points to train 256-entry PQ codebooks
+        storage = "int8"
+    codes = _STORAGE_CODES.get(storage, f"PQ{FAISS_PQ_M}")
+    if index_type == "flat":
+        return codes
+    if index_type == "hnsw":
+        if storage == "pq":
+            raise ValueError("FAISS_STORAGE=pq is not supported with hnsw; use float16 or int8")
+        return f"HNSW{FAISS_HNSW_M}" if storage == "float32" else f"HNSW{FAISS_HNSW_M},{codes}"
+    nlist = FAISS_IVF_NLIST or max(1, int(4 * np.sqrt(n)))
+    # k-means wants ~39 training points per centroid
+    nlist = max(1, min(nlist, n // 39))
+    return f"IVF{nlist},{codes}"
+
+
+def configure_search(index: faiss.Index) -> faiss.Index:
+    """
+    Apply FAISS_EF_SEARCH / FAISS_NPROBE to an HNSW or IVF index.
+    """
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = FAISS_EF_SEARCH
+    else:
+        try:
+            faiss.extract_index_ivf(index).nprobe = FAISS_NPROBE
+        except RuntimeError:
+            pass
     return index
 
 
+def build_faiss_index(
+    embeddings: np.ndarray,
+    index_type: Optional[str] = None,
+    storage: Optional[str] = None,
+) -> faiss.Index:
+    """
+    Build an in-memory inner-product FAISS index from embeddings (normalized
+    here), training it first if the index type or storage needs it.
+    """
+    index_type = index_type or FAISS_INDEX_TYPE
+    storage = storage or FAISS_STORAGE
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown FAISS index type '{index_type}', expected one of {INDEX_TYPES}")
+    if storage not in STORAGE_TYPES:
+        raise ValueError(f"Unknown FAISS storage '{storage}', expected one of {STORAGE_TYPES}")
+    embeddings = np.array(embeddings, dtype="float32", order="C")
+    faiss.normalize_L2(embeddings)
+    if len(embeddings) < FAISS_ANN_MIN_VECTORS:
+        index_type = "flat"
+    index = faiss.index_factory(
+        embeddings.shape[1],
+        _factory_string(index_type, storage, len(embeddings)),
+        faiss.METRIC_INNER_PRODUCT,
+    )
+    if not index.is_trained:
+        index.train(embeddings)
+    index.add(embeddings)
+    return configure_search(index)
+
+
+class FlatMmapIndex:
+    """
+    Exact inner-product search over an (n, d) float32 or float16 matrix,
+    normally a read-only memmap of vectors.npy that every worker process
+    shares through the page cache. Implements the subset of faiss.Index the
+    stores use; an id range is a plain slice instead of a selector.
+    """
+
+    metric_type = faiss.METRIC_INNER_PRODUCT
+
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = vectors
+        self.ntotal, self.d = vectors.shape
+
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int,
+        id_range: Optional[Tuple[int, int]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        faiss-style (similarities, ids), best first, padded with id -1.
+        """
+        start, end = id_range or (0, self.ntotal)
+        start, end = max(0, start), min(self.ntotal, end)
+        queries = np.asarray(queries, dtype="float32").reshape(-1, self.d)
+        scores = np.empty((len(queries), max(0, end - start)), dtype="float32")
+        widen = self.vectors.dtype != np.float32
+        buffer = np.empty((min(FLAT_SEARCH_BLOCK, max(0, end - start)), self.d), dtype="float32") if widen else None
+        for lo in range(start, end, FLAT_SEARCH_BLOCK):
+            hi = min(end, lo + FLAT_SEARCH_BLOCK)
+            block = self.vectors[lo:hi]
+            if widen:
+                np.copyto(buffer[:hi - lo], block)
+                block = buffer[:hi - lo]
+            np.matmul(queries, block.T, out=scores[:, lo - start:hi - start])
+
+        distances = np.full((len(queries), k), -np.finfo("float32").max, dtype="float32")
+        indices = np.full((len(queries), k), -1, dtype="int64")
+        found = min(k, scores.shape[1])
+        if found:
+            top = np.argpartition(-scores, found - 1, axis=1)[:, :found]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind="stable")
+            indices[:, :found] = np.take_along_axis(top, order, axis=1) + start
+            distances[:, :found] = np.take_along_axis(top_scores, order, axis=1)
+        return distances, indices
+
+    def reconstruct_n(self, start: int, n: int) -> np.ndarray:
+        return np.array(self.vectors[start:start + n], dtype="float32")
+
+    def nbytes(self) -> int:
+        return heap_nbytes(self.vectors)
+
+
+def _flat_dtype(index: faiss.Index) -> Optional[str]:
+    """
+    float32/float16 for the flat inner-product indexes that can be stored as
+    a plain matrix and searched by FlatMmapIndex, else None.
+    """
+    if index.metric_type != faiss.METRIC_INNER_PRODUCT:
+        return None
+    if isinstance(index, faiss.IndexFlat):
+        return "float32"
+    if isinstance(index, faiss.IndexScalarQuantizer) and index.sq.qtype == faiss.ScalarQuantizer.QT_fp16:
+        return "float16"
+    return None
+
+
+def save_index(index, directory: Path) -> None:
+    """
+    Write a dense index in a form other processes can map read-only:
+    vectors.npy for flat float32/float16 indexes, index.faiss plus
+    lists.ivfdata (faiss OnDiskInvertedLists) for IVF indexes, and a plain
+    index.faiss for everything else (HNSW, flat int8/PQ).
+    """
+    if isinstance(index, FlatMmapIndex):
+        np.save(directory / "vectors.npy", np.ascontiguousarray(index.vectors))
+        return
+    dtype = _flat_dtype(index)
+    if dtype is not None:
+        vectors = index.reconstruct_n(0, index.ntotal) if index.ntotal else np.zeros((0, index.d), dtype="float32")
+        np.save(directory / "vectors.npy", vectors.astype(dtype))
+        return
+    try:
+        faiss.extract_index_ivf(index)
+    except RuntimeError:
+        faiss.write_index(index, str(directory / "index.faiss"))
+        return
+    # Copy, so the in-memory index keeps its own inverted lists
+    index = faiss.clone_index(index)
+    ivf = faiss.extract_index_ivf(index)
+    invlists = faiss.OnDiskInvertedLists(ivf.nlist, ivf.code_size, str(directory / "lists.ivfdata"))
+    lists = faiss.InvertedListsPtrVector()
+    lists.push_back(ivf.invlists)
+    merge = getattr(invlists, "merge_from_multiple", None) or invlists.merge_from
+    merge(lists.data(), lists.size())
+    ivf.replace_invlists(invlists)
+    faiss.write_index(index, str(directory / "index.faiss"))
+
+
+def load_index(directory: Path) -> Tuple[object, bool]:
+    """
+    Load a dense index written by save_index. Returns (index, mapped), where
+    mapped means its vectors or codes live in the shared page cache.
+    """
+    if (directory / "vectors.npy").exists():
+        vectors = load_array(directory / "vectors.npy")
+        return FlatMmapIndex(vectors), is_mapped(vectors)
+    path = str(directory / "index.faiss")
+    if (directory / "lists.ivfdata").exists():
+        # Inverted lists are always served from the read-only mapping; the
+        # file is found next to index.faiss wherever the artifact now lives
+        index = faiss.read_index(path, faiss.IO_FLAG_ONDISK_SAME_DIR | faiss.IO_FLAG_READ_ONLY)
+        return configure_search(index), True
+    try:
+        index = faiss.read_index(path, faiss.IO_FLAG_MMAP)
+    except RuntimeError:
+        # Not every index type can be memory-mapped
+        index = faiss.read_index(path)
+    return configure_search(index), False
+
+
+def _index_nbytes(index: faiss.Index) -> int:
+    """
+    Heap bytes of a FAISS index: stored codes plus the HNSW graph. HNSW
+    reports no code size itself, so its storage index (flat, SQ8, ...) is
+    asked; anything else falls back to the serialized size.
+    """
+    if isinstance(index, faiss.IndexHNSW):
+        return index.storage.sa_code_size() * index.ntotal + index.hnsw.neighbors.size() * 4
+    try:
+        return index.sa_code_size() * index.ntotal
+    except RuntimeError:
+        return int(faiss.serialize_index(index).nbytes)
+
+
+def _accepts_selector(index: faiss.Index) -> bool:
+    """
+    Whether index.search takes SearchParameters with an id selector; flat
+    PQ (IndexPQ) rejects any params.
+    """
+    return not isinstance(index, faiss.IndexPQ)
+
+
+def _search_params(index: faiss.Index, selector) -> faiss.SearchParameters:
+    """
+    Per-call parameters carrying an id selector. They replace the index-level
+    efSearch/nprobe, so those are copied over.
+    """
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    try:
+        nprobe = faiss.extract_index_ivf(index).nprobe
+    except RuntimeError:
+        return faiss.SearchParameters(sel=selector)
+    return faiss.SearchParametersIVF(sel=selector, nprobe=nprobe)
+
+
 class VectorStore:
     """
     Simple wrapper around FAISS index and original text chunks.
+
+    `chunks` is a list of strings or a ChunkView of offsets into the source
+    text; either way `chunks[i]` is the text behind vector i.
+
+    Search distances are cosine distances (1 - similarity), so smaller is
+    better as with L2. With a sparse index and the query text, dense and BM25
+    rankings are fused and the distance is 1 - the normalized RRF score.
     """
 
-    def __init__(self, chunks: List[str]):
+    def __init__(
+        self,
+        chunks: Sequence[str],
+        embeddings: Optional[np.ndarray] = None,
+        index: Optional[faiss.Index] = None,
+        sparse: Optional[SparseIndex] = None,
+    ):
         self.chunks = chunks
-        self.embeddings = create_embeddings(chunks)
-        self.index = build_faiss_index(self.embeddings)
-
-    def search(self, query_embedding: List[float], top_k: int = 5) -> List[Tuple[str, float]]:
-        query = np.array([query_embedding], dtype="float32")
-        distances, indices = self.index.search(query, top_k)
-        results: List[Tuple[str, float]] = []
-        for dist, idx in zip(distances[0], indices[0]):
-            if idx == -1:
-                continue
-            results.append((self.chunks[idx], float(dist)))
-        return results
+        if index is None:
+            if embeddings is None:
+                embeddings = create_embeddings(list(chunks))
+            index = build_faiss_index(embeddings)
+            if HYBRID_SEARCH:
+                sparse = SparseIndex.build(chunks)
+        self.index = index
+        self.sparse = sparse
+        self.embeddings: Optional[np.ndarray] = embeddings if KEEP_RAW_EMBEDDINGS else None
+        # True when the index's vectors/codes are a shared read-only mapping
+        self.index_mapped = False
+        # Content hash of the source PDF when loaded through the index cache
+        self.source_id: Optional[str] = None
+
+    def save(self, directory: Path) -> None:
+        """
+        Write embeddings, dense index, BM25 postings and chunk text into
+        `directory`, all in files that `load` can memory-map.
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        if self.embeddings is not None:
+            np.save(directory / "embeddings.npy", np.ascontiguousarray(self.embeddings))
+        save_index(self.index, directory)
+        if self.sparse is not None:
+            self.sparse.save(directory)
+        chunks = self.chunks if isinstance(self.chunks, ChunkView) else ChunkView.from_strings(self.chunks)
+        chunks.save(directory)
+
+    @classmethod
+    def load(cls, directory: Path) -> "VectorStore":
+        """
+        Load a store written by `save`. Vectors, inverted lists, postings and
+        chunk text are memory-mapped read-only (INDEX_MMAP), so worker
+        processes share them instead of each holding a copy.
+        """
+        embeddings = None
+        if KEEP_RAW_EMBEDDINGS and (directory / "embeddings.npy").exists():
+            embeddings = load_array(directory / "embeddings.npy")
+        index, mapped = load_index(directory)
+        sparse = None
+        if HYBRID_SEARCH and SparseIndex.exists(directory):
+            sparse = SparseIndex.load(directory)
+        chunks: Sequence[str]
+        if (directory / "spans.npy").exists():
+            chunks = ChunkView.load(directory)
+        else:
+            with open(directory / "chunks.json", "r", encoding="utf-8") as f:
+                chunks = json.load(f)
+        store = cls(chunks, embeddings=embeddings, index=index, sparse=sparse)
+        store.index_mapped = mapped
+        return store
+
+    def nbytes(self) -> int:
+        """
+        Approximate heap footprint, used for cache budgeting. Memory-mapped
+        parts live in the shared page cache and are not counted.
+        """
+        size = 0
+        if self.embeddings is not None:
+            size += heap_nbytes(self.embeddings)
+        if isinstance(self.index, FlatMmapIndex):
+            size += self.index.nbytes()
+        elif not self.index_mapped:
+            size += _index_nbytes(self.index)
+        if self.sparse is not None:
+            size += self.sparse.nbytes()
+        if isinstance(self.chunks, ChunkView):
+            size += self.chunks.nbytes()
+        else:
+            size += sum(len(chunk) for chunk in self.chunks)
+        return size
+
+    def vectors(self) -> np.ndarray:
+        """
+        All stored vectors as float32. Without raw embeddings they are decoded
+        from the index, which is lossy for int8 and PQ storage.
+        """
+        if self.embeddings is not None:
+            return np.asarray(self.embeddings, dtype="float32")
+        if self.index.ntotal == 0:
+            return np.zeros((0, self.index.d), dtype="float32")
+        if isinstance(self.index, FlatMmapIndex):
+            return self.index.reconstruct_n(0, self.index.ntotal)
+        try:
+            faiss.extract_index_ivf(self.index).make_direct_map()
+        except RuntimeError:
+            pass
+        return self.index.reconstruct_n(0, self.index.ntotal)
+
+    def search_ids(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int = 5,
+        id_range: Optional[Tuple[int, int]] = None,
+        query_text: Optional[str] = None,
+    ) -> List[Tuple[int, float]]:
+        """
+        Return (vector id, distance) pairs, optionally restricted to ids in
+        [start, end) without a separate index per range.
+
+        Inner-product indexes report 1 - similarity, so smaller is better.
+        Passing `query_text` fuses in BM25 hits when a sparse index exists.
+        """
+        if self.sparse is None or not query_text:
+            return self._dense_ids(query_embedding, top_k, id_range)
+        candidates = top_k * HYBRID_CANDIDATES
+        dense = self._dense_ids(query_embedding, candidates, id_range)
+        sparse = self.sparse.search(query_text, candidates, id_range)
+        if not sparse:
+            return dense[:top_k]
+        fused = reciprocal_rank_fusion([[i for i, _ in dense], [i for i, _ in sparse]], top_k)
+        # Best possible score is rank 1 in both lists
+        best = 2.0 / (RRF_K + 1)
+        return [(idx, 1.0 - score / best) for idx, score in fused]
+
+    def _dense_ids(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int,
+        id_range: Optional[Tuple[int, int]],
+    ) -> List[Tuple[int, float]]:
+        query = np.asarray(query_embedding, dtype="float32").reshape(1, -1)
+        if isinstance(self.index, FlatMmapIndex):
+            distances, indices = self.index.search(query, top_k, id_range)
+        elif id_range is None:
+            distances, indices = self.index.search(query, top_k)
+        elif _accepts_selector(self.index):
+            params = _search_params(self.index, faiss.IDSelectorRange(id_range[0], id_range[1]))
+            distances, indices = self.index.search(query, top_k, params=params)
+        else:
+            return self._filtered_ids(query, top_k, id_range)
+        if self.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+            distances = 1.0 - distances
+        return [(int(idx), float(dist)) for dist, idx in zip(distances[0], indices[0]) if idx != -1]
+
+    def _filtered_ids(
+        self,
+        query: np.ndarray,
+        top_k: int,
+        id_range: Tuple[int, int],
+    ) -> List[Tuple[int, float]]:
+        """
+        Range filter for indexes without selector support: over-fetch an
+        unfiltered search, doubling k until top_k hits fall inside the range.
+        """
+        start, end = id_range
+        fetch = top_k * HYBRID_CANDIDATES
+        while True:
+            fetch = min(fetch, self.index.ntotal)
+            distances, indices = self.index.search(query, fetch)
+            if self.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+                distances = 1.0 - distances
+            hits = [
+                (int(idx), float(dist))
+                for dist, idx in zip(distances[0], indices[0])
+                if start <= idx < end
+            ]
+            if len(hits) >= top_k or fetch >= self.index.ntotal:
+                return hits[:top_k]
+            fetch *= 2
+
+    def search(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int = 5,
+        query_text: Optional[str] = None,
+    ) -> List[Tuple[str, float]]:
+        return [
+            (self.chunks[idx], dist)
+            for idx, dist in self.search_ids(query_embedding, top_k, query_text=query_text)
+        ]
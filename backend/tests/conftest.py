@@ -0,0 +1,19 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+# The backend modules import each other as top-level packages (rag.*), as
+# when uvicorn runs from the backend folder.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Settings are read at import time: keep the app's database and index cache
+# out of the working tree and answer with the stub LLM provider
+_WORKDIR = tempfile.mkdtemp(prefix="rag_tests_")
+atexit.register(shutil.rmtree, _WORKDIR, ignore_errors=True)
+os.environ["DATABASE_URL"] = f"sqlite:///{Path(_WORKDIR) / 'test.db'}"
+os.environ["INDEX_CACHE_DIR"] = str(Path(_WORKDIR) / "index_cache")
+os.environ["QUERY_CACHE_DB"] = ""
+os.environ["LLM_PROVIDERS"] = "stub"
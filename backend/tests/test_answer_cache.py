@@ -0,0 +1,63 @@
+import numpy as np
+
+from rag.answer_cache import SemanticAnswerCache
+
+KEY = ("9", "Science", "Motion", "student", "en")
+
+
+def unit(*values):
+    return np.array(values, dtype="float32")
+
+
+def test_similar_query_hits_and_dissimilar_misses():
+    cache = SemanticAnswerCache(max_entries=10, threshold=0.95, ttl_s=60)
+    cache.store(KEY, unit(1, 0, 0), "velocity answer", version="v1")
+
+    assert cache.lookup(KEY, unit(0.99, 0.05, 0), version="v1") == "velocity answer"
+    assert cache.lookup(KEY, unit(0, 1, 0), version="v1") is None
+    assert cache.lookup(KEY[:-1] + ("hi",), unit(1, 0, 0), version="v1") is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_changed_version_drops_entry():
+    cache = SemanticAnswerCache(max_entries=10, threshold=0.9, ttl_s=60)
+    cache.store(KEY, unit(1, 0), "old answer", version="v1")
+
+    assert cache.lookup(KEY, unit(1, 0), version="v2") is None
+    assert cache.stats()["invalidations"] == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_expired_entries_miss():
+    cache = SemanticAnswerCache(max_entries=10, threshold=0.9, ttl_s=-1)
+    cache.store(KEY, unit(1, 0), "answer")
+
+    assert cache.lookup(KEY, unit(1, 0)) is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_evicts_least_recently_used():
+    cache = SemanticAnswerCache(max_entries=2, threshold=0.9, ttl_s=60)
+    cache.store(KEY, unit(1, 0, 0), "x")
+    cache.store(KEY, unit(0, 1, 0), "y")
+    assert cache.lookup(KEY, unit(1, 0, 0)) == "x"  # "y" is now the oldest
+    cache.store(KEY, unit(0, 0, 1), "z")
+
+    assert cache.lookup(KEY, unit(0, 1, 0)) is None
+    assert cache.lookup(KEY, unit(1, 0, 0)) == "x"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalidate_by_predicate():
+    cache = SemanticAnswerCache(max_entries=10, threshold=0.9, ttl_s=60)
+    cache.store(KEY, unit(1, 0), "a")
+    cache.store(("9", "Maths", "Algebra", "student", "en"), unit(1, 0), "b")
+
+    assert cache.invalidate(lambda key: key[1] == "Science") == 1
+    assert cache.lookup(KEY, unit(1, 0)) is None
+
+
+def test_disabled_cache_stores_nothing():
+    cache = SemanticAnswerCache(max_entries=0)
+    cache.store(KEY, unit(1, 0), "a")
+    assert cache.lookup(KEY, unit(1, 0)) is None
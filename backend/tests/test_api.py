@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture(scope="module")
+def client():
+    # Not entered as a context manager: no startup warm-up
+    return TestClient(main.app)
+
+
+@pytest.fixture(scope="module")
+def headers(client):
+    credentials = {"email": "student@example.com", "password": "secret-password"}
+    client.post("/signup", json={**credentials, "role": "student", "standard": "9"})
+    token = client.post("/login", json=credentials).json()["token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+UNKNOWN_CHAPTER = {"subject": "Science", "chapter": "No Such Chapter", "question": "What is force?"}
+
+
+@pytest.mark.parametrize("path", ["/chat", "/chat/stream"])
+def test_chat_unknown_chapter_is_not_found(client, headers, path):
+    response = client.post(path, headers=headers, json=UNKNOWN_CHAPTER)
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize("path", ["/sessions/{id}/message", "/sessions/{id}/message/stream"])
+def test_session_message_unknown_chapter_is_not_found(client, headers, path):
+    session = client.post(
+        "/sessions", headers=headers,
+        json={"subject": "Science", "chapter": "No Such Chapter", "standard": "9"},
+    ).json()
+    response = client.post(path.format(id=session["id"]), headers=headers, json={"role": "user", "content": "What is force?"})
+    assert response.status_code == 404
+
+
+def test_doubt_without_course_material_is_not_found(client):
+    credentials = {"email": "std42@example.com", "password": "secret-password"}
+    client.post("/signup", json={**credentials, "role": "student", "standard": "42"})
+    token = client.post("/login", json=credentials).json()["token"]
+
+    response = client.post(
+        "/student/ask-ai-doubt", headers={"Authorization": f"Bearer {token}"}, json={"question": "What is force?"}
+    )
+    assert response.status_code == 404
+
+
+def test_metrics_show_request_counts_and_stage_spans(client, headers):
+    session = client.post(
+        "/sessions", headers=headers,
+        json={"subject": "Science", "chapter": "No Such Chapter", "standard": "9"},
+    ).json()
+    client.post(f"/sessions/{session['id']}/message", headers=headers, json={"role": "user", "content": "Hi"})
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    text = response.text
+    assert "# TYPE http_request_seconds histogram" in text
+    assert 'http_request_seconds_count{method="POST",route="/sessions/{session_id}/message",status="404"}' in text
+    for stage in ("session_lookup", "db_commit", "get_vector_store"):
+        assert f'rag_stage_seconds_count{{stage="{stage}"}}' in text
+    assert 'rag_stage_seconds_bucket{stage="session_lookup",le="+Inf"}' in text
+
+
+def test_ready_is_503_until_warm_up_finishes(monkeypatch):
+    release = threading.Event()
+
+    def slow_warm_up():
+        release.wait(10)
+        return {"embedding_model": 0.0}
+
+    monkeypatch.setattr(main, "warm_up", slow_warm_up)
+    monkeypatch.setattr(main, "READINESS", {"ready": False, "steps": {}, "error": None})
+    monkeypatch.setattr(main, "WARMUP_ON_STARTUP", True)
+
+    # Entering the client runs the startup hook, which starts warm-up
+    with TestClient(main.app) as client:
+        assert client.get("/ready").status_code == 503
+        release.set()
+        deadline = time.monotonic() + 10
+        while client.get("/ready").status_code != 200 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        response = client.get("/ready")
+
+    assert response.status_code == 200
+    assert response.json()["steps"] == {"embedding_model": 0.0}
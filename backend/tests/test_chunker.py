@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from rag.chunker import ChunkView, Span, _utf8_offsets, chunk_pages
+
+
+def count_words(texts):
+    return [len(text.split()) for text in texts]
+
+
+PAGES = [
+    "Force changes motion. A body at rest stays at rest. Friction opposes motion.",
+    "बल गति को बदलता है। घर्षण गति का विरोध करता है। Energy ≈ work 🚀 done.",
+]
+
+
+def test_utf8_offsets_match_encoded_lengths():
+    text = "aé€🚀"
+    offsets = _utf8_offsets(text)
+    assert offsets.tolist() == [len(text[:i].encode("utf-8")) for i in range(len(text) + 1)]
+
+
+def test_from_spans_slices_multibyte_text():
+    text = "गति\nmotion 🚀"
+    view = ChunkView.from_spans(text, [Span(0, 3, 0), Span(4, 12, 1)])
+
+    assert view[0] == "गति"
+    assert view[1] == "motion 🚀"
+    assert view.page(1) == 1
+    assert view.spans[1].tolist() == [len("गति\n".encode("utf-8")), len(text.encode("utf-8")), 1]
+
+
+def test_chunks_respect_size_pages_and_sentences():
+    view = chunk_pages(PAGES, count_words, max_tokens=10, overlap_tokens=0)
+
+    assert len(view) > 2
+    for i in range(len(view)):
+        chunk = view[i]
+        assert chunk in PAGES[view.page(i)]
+        assert len(chunk.split()) <= 10
+    assert view[0].startswith("Force changes motion.")
+    assert {view.page(i) for i in range(len(view))} == {0, 1}
+    assert view.data.decode("utf-8") == "".join(page + "\n" for page in PAGES)
+
+
+def test_overlap_carries_previous_sentence():
+    view = chunk_pages(["A b. C d. E f g h. I j."], count_words, max_tokens=6, overlap_tokens=2)
+    assert view[:] == ["A b. C d.", "C d. E f g h.", "I j."]
+
+
+def test_long_sentence_is_split():
+    sentence = " ".join(f"w{i}" for i in range(25)) + "."
+    view = chunk_pages([sentence], count_words, max_tokens=10, overlap_tokens=0)
+    assert len(view) == 3
+    assert " ".join(view[:]) == sentence
+
+
+@pytest.mark.parametrize("mapped", [False, True])
+def test_save_load_round_trip(tmp_path, mapped):
+    view = chunk_pages(PAGES, count_words, max_tokens=10, overlap_tokens=3)
+    view.save(tmp_path)
+    loaded = ChunkView.load(tmp_path, mapped=mapped)
+
+    assert loaded[:] == view[:]
+    assert np.array_equal(loaded.spans, view.spans)
+
+
+def test_from_strings_and_concat():
+    first = ChunkView.from_strings(["α β", "γ"])
+    second = chunk_pages(["Δ is delta."], count_words, max_tokens=10, overlap_tokens=0)
+    joined = ChunkView.concat([first, second])
+
+    assert joined[:] == ["α β", "γ", "Δ is delta."]
+    assert [joined.page(i) for i in range(3)] == [-1, -1, 0]
+    assert len(ChunkView.concat([])) == 0
@@ -0,0 +1,90 @@
+import os
+import shutil
+
+from rag.content import ContentCatalog
+
+
+def touch_pdf(path, mtime=None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"%PDF-1.4\n")
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+        os.utime(path.parent, (mtime, mtime))
+
+
+def test_scans_layout_and_resolves_case_insensitively(tmp_path):
+    touch_pdf(tmp_path / "9" / "Science" / "Motion.pdf")
+    touch_pdf(tmp_path / "10" / "Maths" / "Algebra.pdf")
+    catalog = ContentCatalog(tmp_path, refresh_interval=60)
+
+    assert catalog.standards() == ["10", "9"]
+    assert list(catalog.content("9")) == ["Science"]
+    assert catalog.resolve_subject("9", "science") == "Science"
+    chapter, pdf = catalog.resolve_chapter("9", "Science", "MOTION")
+    assert chapter == "Motion"
+    assert pdf == str((tmp_path / "9" / "Science" / "Motion.pdf").resolve())
+    assert catalog.resolve_subject("9", "history") is None
+    assert catalog.content("11") == {}
+
+
+def test_new_chapter_is_seen_after_refresh(tmp_path):
+    touch_pdf(tmp_path / "9" / "Science" / "Motion.pdf", mtime=1_000_000)
+    catalog = ContentCatalog(tmp_path, refresh_interval=0)
+    catalog.refresh()
+    generation = catalog.generation
+
+    catalog.refresh()
+    assert catalog.generation == generation  # unchanged tree: no rescan
+
+    touch_pdf(tmp_path / "9" / "Science" / "Force.pdf", mtime=2_000_000)
+    assert "Force" in catalog.content("9")["Science"]
+    assert catalog.generation == generation + 1
+
+
+def test_refresh_interval_defers_rescan(tmp_path):
+    touch_pdf(tmp_path / "9" / "Science" / "Motion.pdf", mtime=1_000_000)
+    catalog = ContentCatalog(tmp_path, refresh_interval=3600)
+    catalog.refresh()
+
+    touch_pdf(tmp_path / "9" / "Science" / "Force.pdf", mtime=2_000_000)
+    assert "Force" not in catalog.content("9")["Science"]
+    catalog.refresh(force=True)
+    assert "Force" in catalog.content("9")["Science"]
+
+
+def test_standard_generation_changes_only_for_the_edited_standard(tmp_path):
+    touch_pdf(tmp_path / "9" / "Science" / "Motion.pdf", mtime=1_000_000)
+    touch_pdf(tmp_path / "10" / "Maths" / "Algebra.pdf", mtime=1_000_000)
+    catalog = ContentCatalog(tmp_path, refresh_interval=0)
+    before = {std: catalog.standard_generation(std) for std in ("9", "10")}
+
+    # Edited in place: only the PDF's mtime changes
+    touch_pdf(tmp_path / "9" / "Science" / "Motion.pdf", mtime=2_000_000)
+    catalog.refresh()
+    assert catalog.standard_generation("9") != before["9"]
+    assert catalog.standard_generation("10") == before["10"]
+
+    touch_pdf(tmp_path / "10" / "Maths" / "Geometry.pdf", mtime=3_000_000)
+    assert catalog.standard_generation("10") != before["10"]
+    assert catalog.standard_generation("11") == 0
+
+
+def test_standard_removed_during_rescan_is_dropped(tmp_path, monkeypatch):
+    from rag import content
+
+    touch_pdf(tmp_path / "9" / "Science" / "Motion.pdf")
+    touch_pdf(tmp_path / "10" / "Maths" / "Algebra.pdf")
+    catalog = ContentCatalog(tmp_path, refresh_interval=0)
+    scan = content.scan_standard
+
+    def scan_then_remove(std_dir, standard):
+        found = scan(std_dir, standard)
+        if standard == "10":
+            shutil.rmtree(std_dir / standard)
+        return found
+
+    monkeypatch.setattr(content, "scan_standard", scan_then_remove)
+    catalog.refresh(force=True)
+    monkeypatch.setattr(content, "scan_standard", scan)
+
+    assert catalog.standards() == ["9"]
@@ -0,0 +1,99 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from rag.embedding_batcher import EmbeddingBatcher
+
+
+def encode(texts):
+    """
+    Deterministic stand-in for the model: one row per text, ending with the
+    row's position in its batch.
+    """
+    return np.array([[len(text), sum(map(ord, text)) % 997, i] for i, text in enumerate(texts)], dtype="float32")
+
+
+def expected(text):
+    # Without the batch position
+    return encode([text])[0][:2]
+
+
+def test_concurrent_embeds_are_batched_and_matched_to_callers():
+    batch_sizes = []
+
+    def recording_encode(texts):
+        batch_sizes.append(len(texts))
+        return encode(texts)
+
+    batcher = EmbeddingBatcher(recording_encode, max_batch_size=8, max_wait_ms=50)
+    texts = [f"question number {i}" * (i % 3 + 1) for i in range(20)]
+    results = {}
+    start = threading.Barrier(len(texts))
+
+    def call(text):
+        start.wait()
+        results[text] = batcher.embed(text)
+
+    threads = [threading.Thread(target=call, args=(text,)) for text in texts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for text in texts:
+        np.testing.assert_array_equal(results[text][:2], expected(text))
+    assert sum(batch_sizes) == 20
+    assert max(batch_sizes) <= 8
+    assert len(batch_sizes) < 20
+    assert batcher.stats()["queries"] == 20
+
+
+def test_aembed_keeps_result_order():
+    batcher = EmbeddingBatcher(encode, max_batch_size=32, max_wait_ms=20)
+    texts = ["force", "mass", "acceleration", "inertia"]
+
+    async def run():
+        return await asyncio.gather(*(batcher.aembed(text) for text in texts))
+
+    vectors = asyncio.run(run())
+    direct = encode(texts)
+    # Same batch, same order as a direct call
+    np.testing.assert_array_equal(np.stack(vectors), direct)
+
+
+def test_encode_error_reaches_every_caller_in_the_batch():
+    def failing_encode(texts):
+        raise RuntimeError("model not loaded")
+
+    batcher = EmbeddingBatcher(failing_encode, max_batch_size=4, max_wait_ms=20)
+    futures = [batcher.submit(text) for text in ("a", "b", "c")]
+
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(timeout=5)
+    # The thread survives the failure
+    batcher.encode = encode
+    np.testing.assert_array_equal(batcher.embed("d")[:2], expected("d"))
+
+
+def test_cancelled_requests_are_skipped():
+    release = threading.Event()
+    seen = []
+
+    def blocking_encode(texts):
+        seen.extend(texts)
+        release.wait(5)
+        return encode(texts)
+
+    batcher = EmbeddingBatcher(blocking_encode, max_batch_size=1, max_wait_ms=0)
+    first = batcher.submit("first")
+    cancelled = batcher.submit("cancelled")
+    assert cancelled.cancel()
+    last = batcher.submit("last")
+    release.set()
+
+    first.result(timeout=5)
+    last.result(timeout=5)
+    assert seen == ["first", "last"]
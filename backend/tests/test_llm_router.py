@@ -0,0 +1,176 @@
+import asyncio
+import time
+
+import pytest
+
+from rag import llm_router
+from rag.llm_router import LLMRouter, NoProviderAvailable, Provider, StreamInterrupted, StubProvider
+
+
+class CountingStub(StubProvider):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = 0
+
+    def complete(self, messages):
+        self.calls += 1
+        return super().complete(messages)
+
+    async def acomplete(self, messages):
+        self.calls += 1
+        return await super().acomplete(messages)
+
+
+class BrokenStream(Provider):
+    """
+    Streams a few words, then fails.
+    """
+
+    name = "broken"
+
+    async def astream(self, messages):
+        yield "partial "
+        yield "answer "
+        raise RuntimeError("connection reset")
+
+
+@pytest.fixture(autouse=True)
+def fast_breaker(monkeypatch):
+    monkeypatch.setattr(llm_router, "LLM_BREAKER_FAILURES", 2)
+    monkeypatch.setattr(llm_router, "LLM_BREAKER_COOLDOWN_S", 0.05)
+    monkeypatch.setattr(llm_router, "LLM_MIN_SAMPLES", 3)
+
+
+def circuit(router, name):
+    return router.stats()["providers"][name]["circuit"]
+
+
+def test_falls_back_in_configured_order():
+    first = CountingStub("first", fail=True)
+    second = CountingStub("second", reply="second")
+    third = CountingStub("third", reply="third")
+    router = LLMRouter([first, second, third])
+
+    assert router.complete([]) == "second"
+    assert (first.calls, second.calls, third.calls) == (1, 1, 0)
+    assert router.stats()["providers"]["first"]["failures"] == 1
+
+
+def test_all_providers_failing_raises():
+    router = LLMRouter([StubProvider("a", fail=True), StubProvider("b", fail=True)])
+    with pytest.raises(NoProviderAvailable):
+        router.complete([])
+
+
+def test_breaker_opens_half_opens_and_closes():
+    flaky = CountingStub("flaky", reply="flaky", fail=True)
+    backup = CountingStub("backup", reply="backup")
+    router = LLMRouter([flaky, backup])
+
+    router.complete([])
+    assert circuit(router, "flaky") == "closed"
+    router.complete([])
+    assert circuit(router, "flaky") == "open"
+
+    # While open the provider is skipped entirely
+    assert router.complete([]) == "backup"
+    assert flaky.calls == 2
+
+    time.sleep(0.06)
+    assert circuit(router, "flaky") == "half_open"
+    flaky.fail = False
+    assert router.complete([]) == "flaky"
+    assert circuit(router, "flaky") == "closed"
+
+
+def test_failed_trial_reopens_immediately():
+    flaky = CountingStub("flaky", fail=True)
+    router = LLMRouter([flaky, StubProvider("backup")])
+    router.complete([])
+    router.complete([])
+    time.sleep(0.06)
+
+    router.complete([])
+    assert flaky.calls == 3
+    assert circuit(router, "flaky") == "open"
+
+
+def test_half_open_trial_runs_before_a_measured_fallback():
+    primary = CountingStub("primary", reply="primary", fail=True)
+    fallback = CountingStub("fallback", reply="fallback")
+    router = LLMRouter([primary, fallback])
+    for _ in range(5):
+        assert router.complete([]) == "fallback"
+    assert router.stats()["providers"]["fallback"]["p50_ms"] is not None
+
+    primary.fail = False
+    time.sleep(0.06)
+    assert router.complete([]) == "primary"
+    assert circuit(router, "primary") == "closed"
+
+
+def test_measured_providers_are_ordered_by_latency():
+    slow = CountingStub("slow", reply="slow", latency_s=0.02)
+    fast = CountingStub("fast", reply="fast")
+    router = LLMRouter([slow, fast])
+    # Measure both: slow answers while fast is down, then the other way round
+    fast.fail = True
+    for _ in range(3):
+        router.complete([])
+    fast.fail = False
+    slow.fail = True
+    time.sleep(0.06)
+    for _ in range(3):
+        router.complete([])
+    slow.fail = False
+    time.sleep(0.06)
+    router.complete([])  # slow's half-open trial
+
+    assert router.complete([]) == "fast"
+
+
+def test_hedge_races_the_next_provider_when_slow():
+    primary = CountingStub("primary", reply="primary", latency_s=0.01)
+    secondary = CountingStub("secondary", reply="secondary", latency_s=0.01)
+    router = LLMRouter([primary, secondary], hedge=True)
+
+    async def run():
+        for _ in range(3):
+            assert await router.acomplete([]) == "primary"
+        primary.latency_s = 1.0
+        return await router.acomplete([])
+
+    assert asyncio.run(run()) == "secondary"
+    stats = router.stats()
+    assert (stats["hedges"], stats["hedge_wins"]) == (1, 1)
+
+
+def test_no_hedge_before_latencies_are_known():
+    primary = CountingStub("primary", reply="primary", latency_s=0.05)
+    secondary = CountingStub("secondary", reply="secondary")
+    router = LLMRouter([primary, secondary], hedge=True)
+
+    assert asyncio.run(router.acomplete([])) == "primary"
+    assert secondary.calls == 0
+
+
+def test_stream_falls_back_before_first_token():
+    router = LLMRouter([StubProvider("down", fail=True), StubProvider("up", reply="hello there")])
+
+    async def collect():
+        return "".join([delta async for delta in router.astream([])])
+
+    assert asyncio.run(collect()) == "hello there"
+
+
+def test_stream_failing_midway_raises_interrupted():
+    router = LLMRouter([BrokenStream(), StubProvider("backup")])
+    received = []
+
+    async def collect():
+        async for delta in router.astream([]):
+            received.append(delta)
+
+    with pytest.raises(StreamInterrupted):
+        asyncio.run(collect())
+    assert received == ["partial ", "answer "]
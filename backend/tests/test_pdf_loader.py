@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+from rag import pdf_loader, sources
+
+
+@pytest.fixture
+def extractions(tmp_path, monkeypatch):
+    """
+    Stand-in for pdfplumber: the "PDF" is a text file, one line per page.
+    Records each extraction.
+    """
+    monkeypatch.setattr(sources, "INDEX_CACHE_DIR", tmp_path / "index_cache")
+    calls = []
+
+    def extract(pdf_path, workers):
+        calls.append(pdf_path)
+        with open(pdf_path, "r", encoding="utf-8") as f:
+            yield from f.read().splitlines()
+
+    monkeypatch.setattr(pdf_loader, "_iter_extracted_pages", extract)
+    return calls
+
+
+def write_pdf(path, text, mtime):
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+
+def pages(path, **kwargs):
+    return list(pdf_loader.iter_pdf_pages(str(path), **kwargs))
+
+
+def test_cached_pages_are_reused(tmp_path, extractions):
+    pdf = tmp_path / "Motion.pdf"
+    write_pdf(pdf, "page one\npage two", mtime=1_000_000)
+
+    assert pages(pdf) == ["page one", "page two"]
+    assert pages(pdf) == ["page one", "page two"]
+    assert len(extractions) == 1
+
+
+def test_changed_size_or_mtime_invalidates_the_cache(tmp_path, extractions):
+    pdf = tmp_path / "Motion.pdf"
+    write_pdf(pdf, "page one\npage two", mtime=1_000_000)
+    pages(pdf)
+
+    # Same size, new content and mtime
+    write_pdf(pdf, "page ONE\npage TWO", mtime=2_000_000)
+    assert pages(pdf) == ["page ONE", "page TWO"]
+    # New size, mtime restored to the previous value
+    write_pdf(pdf, "page one\npage two\npage three", mtime=2_000_000)
+    assert pages(pdf) == ["page one", "page two", "page three"]
+    assert len(extractions) == 3
+
+
+def test_touched_but_unchanged_pdf_keeps_its_pages(tmp_path, extractions, monkeypatch):
+    pdf = tmp_path / "Motion.pdf"
+    write_pdf(pdf, "page one", mtime=1_000_000)
+    pages(pdf)
+    hashed = []
+    file_sha256 = sources.file_sha256
+    monkeypatch.setattr(sources, "file_sha256", lambda path: hashed.append(path) or file_sha256(path))
+
+    os.utime(pdf, (2_000_000, 2_000_000))
+    assert pages(pdf) == ["page one"]
+    # Re-hashed because the mtime moved, but the content hash still matches
+    assert hashed == [str(pdf)]
+    assert len(extractions) == 1
+
+
+def test_refresh_re_extracts(tmp_path, extractions):
+    pdf = tmp_path / "Motion.pdf"
+    write_pdf(pdf, "page one", mtime=1_000_000)
+    pages(pdf)
+    pages(pdf, refresh=True)
+    assert len(extractions) == 2
@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+import numpy as np
+
+from rag.query_cache import QueryCache
+
+
+def wait_for(lookup, timeout=5.0):
+    """
+    Poll until the write-behind thread has committed what `lookup` reads.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        value = lookup()
+        if value is not None:
+            return value
+        time.sleep(0.05)
+    return None
+
+
+def test_lookups_normalize_text():
+    cache = QueryCache("model-a", sqlite_path="")
+    cache.put_rewrite("What is  Force?", "force definition")
+    cache.put_embedding(" what is force ", np.ones(3))
+
+    assert cache.get_rewrite("what is force?") == "force definition"
+    assert cache.get_embedding("what  is force") is not None
+    assert cache.get_embedding("What is force") is None  # embeddings are case-sensitive
+    assert cache.stats()["rewrite_hits"] == 1
+
+
+def test_memory_tier_is_a_bounded_lru():
+    cache = QueryCache("model-a", max_entries=2, sqlite_path="")
+    cache.put_rewrite("a", "A")
+    cache.put_rewrite("b", "B")
+    assert cache.get_rewrite("a") == "A"  # "b" is now the oldest
+    cache.put_rewrite("c", "C")
+
+    assert cache.get_rewrite("b") is None
+    assert cache.get_rewrite("a") == "A" and cache.get_rewrite("c") == "C"
+    assert cache.stats()["rewrites"] == 2
+
+
+def test_rewrites_expire_after_ttl(monkeypatch):
+    cache = QueryCache("model-a", sqlite_path="", rewrite_ttl_s=60)
+    cache.put_rewrite("q", "rewritten")
+    assert cache.get_rewrite("q") == "rewritten"
+
+    later = time.time() + 61
+    monkeypatch.setattr(time, "time", lambda: later)
+    assert cache.get_rewrite("q") is None
+
+
+def test_sqlite_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / "queries.db")
+    first = QueryCache("model-a", sqlite_path=path)
+    first.put_rewrite("What is force?", "force definition")
+    first.put_embedding("what is force?", np.arange(4, dtype="float32"))
+
+    restarted = QueryCache("model-a", sqlite_path=path)
+    vector = wait_for(lambda: restarted._load_embedding("what is force?"))
+    np.testing.assert_array_equal(vector, np.arange(4, dtype="float32"))
+    assert asyncio.run(restarted.aget_rewrite("what is force?")) == "force definition"
+    assert restarted.stats()["sqlite_hits"] == 2
+
+    # Embeddings of another model are never served
+    other_model = QueryCache("model-b", sqlite_path=path)
+    assert asyncio.run(other_model.aget_embedding("what is force?")) is None
+    assert other_model.get_rewrite("what is force?") == "force definition"
+
+
+def test_expired_rewrites_are_not_loaded_from_sqlite(tmp_path, monkeypatch):
+    path = str(tmp_path / "queries.db")
+    QueryCache("model-a", sqlite_path=path).put_rewrite("q", "rewritten")
+    restarted = QueryCache("model-a", sqlite_path=path, rewrite_ttl_s=60)
+    assert wait_for(lambda: restarted.get_rewrite("q")) == "rewritten"
+
+    fresh = QueryCache("model-a", sqlite_path=path, rewrite_ttl_s=60)
+    later = time.time() + 61
+    monkeypatch.setattr(time, "time", lambda: later)
+    assert fresh.get_rewrite("q") is None
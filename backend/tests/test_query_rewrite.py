@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+from rag import query_rewrite
+from rag.advanced_nlp import UNAVAILABLE_MESSAGE
+from rag.query_cache import QueryCache
+from rag.query_rewrite import QueryRewriter, local_rewrite, merge_results
+
+
+def test_merge_ranks_hits_not_raw_distances():
+    # Fused (RRF) distances next to cosine distances: not comparable
+    hybrid = [("photosynthesis", 0.0), ("chlorophyll", 0.4), ("stomata", 0.5)]
+    dense = [("chlorophyll", 0.2), ("xylem", 0.25)]
+
+    merged = merge_results([hybrid, dense], top_k=3)
+
+    assert [chunk for chunk, _ in merged] == ["chlorophyll", "photosynthesis", "xylem"]
+    assert merged[0] == ("chlorophyll", 0.4)
+
+
+class Search:
+    """
+    Records the query texts searched and returns one hit per text.
+    """
+
+    def __init__(self):
+        self.texts = []
+
+    async def __call__(self, text):
+        self.texts.append(text)
+        return [(f"hit for {text}", 0.1)]
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    calls = []
+    state = {"reply": "newton first law inertia", "delay": 0.0}
+
+    async def rewrite(query):
+        calls.append(query)
+        await asyncio.sleep(state["delay"])
+        return state["reply"]
+
+    monkeypatch.setattr(query_rewrite, "arewrite_query", rewrite)
+    state["calls"] = calls
+    return state
+
+
+QUESTION = "Hello, can you please explain Newton's first law?"
+
+
+def rewriter(strategy, **kwargs):
+    return QueryRewriter(QueryCache("test-model", sqlite_path=""), strategy=strategy, **kwargs)
+
+
+def test_local_rewrite_strips_filler():
+    assert local_rewrite(QUESTION) == "Newton's first law"
+    assert local_rewrite("thanks!") == "thanks!"
+
+
+def test_off_and_local_never_call_the_llm(llm):
+    search = Search()
+    asyncio.run(rewriter("off").retrieve(QUESTION, search))
+    asyncio.run(rewriter("local").retrieve(QUESTION, search))
+
+    assert search.texts == [QUESTION, "Newton's first law"]
+    assert llm["calls"] == []
+
+
+def test_llm_strategy_caches_rewrites(llm):
+    qr = rewriter("llm")
+    search = Search()
+    asyncio.run(qr.retrieve(QUESTION, search))
+    # Same question up to case and spacing: served from the cache
+    asyncio.run(qr.retrieve("  hello, can you please explain newton's FIRST law? ", search))
+
+    assert search.texts == ["newton first law inertia"] * 2
+    assert len(llm["calls"]) == 1
+
+
+def test_unavailable_llm_falls_back_to_the_question(llm):
+    llm["reply"] = UNAVAILABLE_MESSAGE
+    qr = rewriter("llm")
+    search = Search()
+    asyncio.run(qr.retrieve(QUESTION, search))
+
+    assert search.texts == [QUESTION]
+    assert qr.cache.get_rewrite(QUESTION) is None
+
+
+def test_cache_strategy_fills_the_cache_in_the_background(llm):
+    qr = rewriter("cache")
+    search = Search()
+
+    async def run():
+        await qr.retrieve(QUESTION, search)
+        await asyncio.gather(*qr._background)
+        await qr.retrieve(QUESTION, search)
+
+    asyncio.run(run())
+    assert search.texts == ["Newton's first law", "newton first law inertia"]
+
+
+def test_speculative_merges_a_timely_rewrite(llm):
+    search = Search()
+    results = asyncio.run(rewriter("speculative", timeout_s=1.0).retrieve(QUESTION, search))
+
+    assert search.texts == ["Newton's first law", "newton first law inertia"]
+    assert [chunk for chunk, _ in results] == ["hit for Newton's first law", "hit for newton first law inertia"]
+
+
+def test_speculative_answers_without_a_slow_rewrite(llm):
+    llm["delay"] = 0.2
+    qr = rewriter("speculative", timeout_s=0.01)
+    search = Search()
+
+    async def run():
+        results = await qr.retrieve(QUESTION, search)
+        await asyncio.gather(*qr._background)
+        return results
+
+    results = asyncio.run(run())
+    assert search.texts == ["Newton's first law"]
+    assert len(results) == 1
+    # The late rewrite still lands in the cache for next time
+    assert qr.cache.get_rewrite(QUESTION) == "newton first law inertia"
+
+
+def test_unknown_strategy_is_rejected():
+    with pytest.raises(ValueError):
+        rewriter("fastest")
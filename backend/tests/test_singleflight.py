@@ -0,0 +1,127 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from rag.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def run_threads(count, target):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_concurrent_calls_share_one_result():
+    flight = SingleFlight()
+    calls = []
+    results = []
+
+    def load():
+        calls.append(1)
+        time.sleep(0.05)
+        return "store"
+
+    run_threads(8, lambda: results.append(flight.do("key", load)))
+
+    assert results == ["store"] * 8
+    assert len(calls) == flight.leaders == 1
+    assert flight.shared == 7
+    assert flight.in_flight() == 0
+
+
+def test_exception_reaches_every_waiter():
+    flight = SingleFlight()
+    errors = []
+
+    def load():
+        time.sleep(0.05)
+        raise ValueError("corrupt index")
+
+    def call():
+        try:
+            flight.do("key", load)
+        except ValueError as e:
+            errors.append(str(e))
+
+    run_threads(4, call)
+
+    assert errors == ["corrupt index"] * 4
+    assert flight.leaders == 1
+
+
+def test_later_call_runs_again():
+    flight = SingleFlight()
+    assert flight.do("key", lambda: 1) == 1
+    assert flight.do("key", lambda: 2) == 2
+    assert flight.leaders == 2
+
+
+def test_async_do_coalesces_and_propagates_errors():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def answer(text):
+        calls.append(text)
+        await asyncio.sleep(0.01)
+        return text.upper()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("provider down")
+
+    async def run():
+        results = await asyncio.gather(*(flight.do("q", answer, "hi") for _ in range(5)))
+        errors = await asyncio.gather(*(flight.do("bad", fail) for _ in range(3)), return_exceptions=True)
+        return results, errors
+
+    results, errors = asyncio.run(run())
+
+    assert results == ["HI"] * 5
+    assert calls == ["hi"]
+    assert all(isinstance(e, RuntimeError) for e in errors)
+    assert flight.stats() == {"leaders": 2, "coalesced": 6, "in_flight": 0}
+
+
+def test_async_stream_replays_to_late_subscribers():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def tokens():
+        calls.append(1)
+        for token in ["a", "b", "c"]:
+            await asyncio.sleep(0.01)
+            yield token
+
+    async def collect():
+        return [token async for token in flight.stream("q", tokens)]
+
+    async def run():
+        first = asyncio.ensure_future(collect())
+        await asyncio.sleep(0.015)  # join after the first token
+        return await asyncio.gather(first, collect())
+
+    assert asyncio.run(run()) == [["a", "b", "c"], ["a", "b", "c"]]
+    assert calls == [1]
+
+
+def test_async_stream_error_reaches_subscribers():
+    flight = AsyncSingleFlight()
+
+    async def tokens():
+        yield "a"
+        raise RuntimeError("cut off")
+
+    async def collect():
+        return [token async for token in flight.stream("q", tokens)]
+
+    async def run():
+        return await asyncio.gather(collect(), collect(), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    with pytest.raises(RuntimeError):
+        asyncio.run(collect())
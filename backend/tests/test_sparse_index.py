@@ -0,0 +1,43 @@
+from rag.sparse_index import SparseIndex, reciprocal_rank_fusion, tokenize
+
+CHUNKS = [
+    "Photosynthesis makes glucose in the leaves of green plants.",
+    "Respiration releases energy from glucose in every cell.",
+    "Newton's laws describe force and motion.",
+    "Chlorophyll absorbs light for photosynthesis.",
+]
+
+
+def test_tokenize_lowercases_words():
+    assert tokenize("Newton's LAWS, force!") == tokenize("newton's laws force")
+
+
+def test_ranks_chunks_containing_the_terms():
+    index = SparseIndex.build(CHUNKS)
+    hits = index.search("photosynthesis light", top_k=4)
+
+    assert [doc for doc, _ in hits][:2] == [3, 0]
+    assert all(score > 0 for _, score in hits)
+    assert index.search("quantum", top_k=4) == []
+
+
+def test_id_range_limits_results():
+    index = SparseIndex.build(CHUNKS)
+    hits = index.search("glucose photosynthesis", top_k=4, id_range=(1, 3))
+    assert [doc for doc, _ in hits] == [1]
+
+
+def test_save_load_round_trip(tmp_path):
+    index = SparseIndex.build(CHUNKS)
+    index.save(tmp_path)
+    assert SparseIndex.exists(tmp_path)
+    loaded = SparseIndex.load(tmp_path, mapped=False)
+    assert loaded.search("force motion", top_k=2) == index.search("force motion", top_k=2)
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1]], top_k=3, k=60)
+
+    assert [doc for doc, _ in fused] == [1, 3, 2]
+    assert fused[0][1] == 1 / 61 + 1 / 62
+    assert reciprocal_rank_fusion([[1, 2, 3]], top_k=2, k=60) == [(1, 1 / 61), (2, 1 / 62)]
@@ -0,0 +1,73 @@
+import threading
+import time
+
+from rag.store_cache import StoreCache
+
+
+class Store:
+    def __init__(self, size):
+        self.size = size
+
+    def nbytes(self):
+        return self.size
+
+
+def test_evicts_least_recently_used_past_budget():
+    cache = StoreCache(max_bytes=100)
+    cache.put("a", Store(40))
+    cache.put("b", Store(40))
+    assert cache.get("a") is not None  # "b" is now the oldest
+    cache.put("c", Store(40))
+
+    assert "a" in cache and "c" in cache and "b" not in cache
+    assert cache.total_bytes == 80
+    assert cache.evictions == 1
+
+
+def test_keeps_newest_entry_over_budget():
+    cache = StoreCache(max_bytes=10)
+    cache.put("a", Store(5))
+    cache.put("big", Store(50))
+
+    assert "big" in cache and len(cache) == 1
+    assert cache.total_bytes == 50
+
+
+def test_replacing_a_key_updates_size():
+    cache = StoreCache(max_bytes=100)
+    cache.put("a", Store(30))
+    cache.put("a", Store(60))
+    assert cache.total_bytes == 60
+    assert len(cache) == 1
+
+
+def test_get_or_load_loads_once_under_concurrency():
+    cache = StoreCache(max_bytes=1000)
+    loads = []
+
+    def loader():
+        loads.append(1)
+        time.sleep(0.05)
+        return Store(10)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("k", loader))) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert len({id(r) for r in results}) == 1
+    assert cache.get_or_load("k", loader) is results[0]
+    assert cache.stats()["loads"] == 1
+
+
+def test_entry_cap_evicts_weightless_stores():
+    # Memory-mapped stores report (almost) no heap bytes
+    cache = StoreCache(max_bytes=1000, max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.put(key, Store(0))
+
+    assert "a" not in cache and len(cache) == 2
+    assert cache.evictions == 1
@@ -0,0 +1,154 @@
+import faiss
+import numpy as np
+import pytest
+
+from rag import vector_store
+from rag.vector_store import FlatMmapIndex, VectorStore, load_index, save_index
+
+DIM = 32
+
+
+def random_vectors(n, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((n, DIM)).astype("float32")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def exact_search(vectors, query, k, id_range=None):
+    """
+    Reference (id, cosine distance) pairs from brute-force inner product.
+    """
+    start, end = id_range or (0, len(vectors))
+    scores = vectors[start:end] @ query
+    order = np.argsort(-scores, kind="stable")[:k]
+    return [(int(i) + start, float(1.0 - scores[i])) for i in order]
+
+
+@pytest.fixture
+def small_blocks(monkeypatch):
+    # Several blocks per search, the last one partial
+    monkeypatch.setattr(vector_store, "FLAT_SEARCH_BLOCK", 7)
+
+
+@pytest.mark.parametrize("storage", ["float32", "float16"])
+def test_mapped_store_matches_in_memory_search(tmp_path, monkeypatch, small_blocks, storage):
+    monkeypatch.setattr(vector_store, "FAISS_STORAGE", storage)
+    vectors = random_vectors(200)
+    store = VectorStore([f"chunk {i}" for i in range(200)], embeddings=vectors)
+    store.save(tmp_path)
+    loaded = VectorStore.load(tmp_path)
+
+    assert isinstance(loaded.index, FlatMmapIndex)
+    assert loaded.index_mapped
+    assert loaded.index.vectors.dtype == np.dtype(storage)
+    assert loaded.nbytes() < store.nbytes()
+
+    atol = 1e-5 if storage == "float32" else 2e-3
+    for query in random_vectors(5, seed=1):
+        for id_range in (None, (50, 131)):
+            expected = exact_search(vectors, query, 10, id_range)
+            for hits in (store.search_ids(query, 10, id_range), loaded.search_ids(query, 10, id_range)):
+                assert [i for i, _ in hits] == [i for i, _ in expected]
+                np.testing.assert_allclose([d for _, d in hits], [d for _, d in expected], atol=atol)
+
+
+def test_float16_search_across_blocks(small_blocks):
+    vectors = random_vectors(30)
+    index = FlatMmapIndex(vectors.astype("float16"))
+    query = vectors[17:18]
+
+    distances, indices = index.search(query, 3)
+    assert indices[0, 0] == 17
+    assert distances[0, 0] == pytest.approx(1.0, abs=2e-3)
+
+
+def test_flat_search_pads_short_ranges():
+    index = FlatMmapIndex(random_vectors(10))
+    distances, indices = index.search(random_vectors(1, seed=2), 5, id_range=(8, 20))
+
+    assert sorted(indices[0, :2].tolist()) == [8, 9]
+    assert indices[0, 2:].tolist() == [-1, -1, -1]
+    assert np.all(distances[0, 2:] < -1e30)
+
+
+def test_save_load_index_round_trip(tmp_path):
+    vectors = random_vectors(50)
+    index = faiss.IndexFlatIP(DIM)
+    index.add(vectors)
+    save_index(index, tmp_path)
+    loaded, mapped = load_index(tmp_path)
+
+    assert isinstance(loaded, FlatMmapIndex) and mapped
+    np.testing.assert_array_equal(loaded.reconstruct_n(0, 50), vectors)
+    _, expected = index.search(vectors[:3], 4)
+    _, indices = loaded.search(vectors[:3], 4)
+    np.testing.assert_array_equal(indices, expected)
+
+
+
+# ivf_pq always stores PQ codes, so it is tried once
+COMBOS = [
+    (index_type, storage)
+    for index_type in ("flat", "hnsw", "ivf_flat")
+    for storage in ("float32", "float16", "int8", "pq")
+    if not (index_type == "hnsw" and storage == "pq")
+] + [("ivf_pq", "float32")]
+
+
+@pytest.fixture
+def ann(monkeypatch):
+    monkeypatch.setattr(vector_store, "FAISS_ANN_MIN_VECTORS", 0)
+    monkeypatch.setattr(vector_store, "FAISS_PQ_M", 4)
+    monkeypatch.setattr(vector_store, "FAISS_NPROBE", 64)
+
+
+@pytest.mark.parametrize("index_type,storage", COMBOS)
+def test_index_types_build_save_load_and_filter(tmp_path, monkeypatch, ann, index_type, storage):
+    from rag.standard_index import StandardIndex
+
+    monkeypatch.setattr(vector_store, "FAISS_INDEX_TYPE", index_type)
+    monkeypatch.setattr(vector_store, "FAISS_STORAGE", storage)
+    # PQ needs 1024 points to train: the chapters fall back to int8 and only
+    # the merged index uses PQ codes
+    vectors = random_vectors(1024)
+    built = StandardIndex.from_chapters([
+        ("Maths", "Algebra", VectorStore([f"algebra {i}" for i in range(1000)], embeddings=vectors[:1000])),
+        ("Science", "Motion", VectorStore([f"motion {i}" for i in range(24)], embeddings=vectors[1000:])),
+    ])
+    if storage == "pq" and index_type == "flat":
+        # No selector support: the small subject range is found by over-fetching
+        assert not vector_store._accepts_selector(built.store.index)
+    built.save(tmp_path)
+    loaded = StandardIndex.load(tmp_path)
+
+    assert loaded.store.index.ntotal == 1024
+    assert loaded.nbytes() > 0
+    lossy = storage == "pq" or index_type == "ivf_pq"
+    for index in (built, loaded):
+        for i in (3, 1010):
+            hits = index.search(vectors[i], top_k=5)
+            assert len(hits) == 5
+            if not lossy:
+                assert hits[0][0] == index.store.chunks[i]
+            science = index.search(vectors[i], top_k=5, subject="science")
+            assert len(science) == 5
+            assert all(subject == "Science" for _, _, subject, _ in science)
+            if not lossy and i >= 1000:
+                assert science[0][0] == f"motion {i - 1000}"
+
+
+def test_hnsw_rejects_pq_storage(ann):
+    with pytest.raises(ValueError):
+        vector_store.build_faiss_index(random_vectors(2048), "hnsw", "pq")
+
+
+@pytest.mark.parametrize("storage,ratio", [("float16", 2), ("int8", 4)])
+def test_compact_storage_shrinks_index(ann, storage, ratio):
+    vectors = random_vectors(1024)
+    sizes = {
+        (name, index_type): vector_store._index_nbytes(vector_store.build_faiss_index(vectors, index_type, name))
+        for name in ("float32", storage)
+        for index_type in ("flat", "hnsw")
+    }
+    assert sizes["float32", "flat"] == ratio * sizes[storage, "flat"]
+    assert sizes[storage, "hnsw"] < sizes["float32", "hnsw"]
@@ -48,7 +48,9 @@ function StudentDashboard() {
             setChatHistory(prev => [...prev, { role: 'ai', text: res.data.answer }]);
             setQuestion("");
         } catch (err) {
-            setChatHistory(prev => [...prev, { role: 'ai', text: "AI is offline. Please try again later." }]);
+            // 404: no course material for this standard yet
+            const notFound = err.response?.status === 404 && err.response.data?.detail;
+            setChatHistory(prev => [...prev, { role: 'ai', text: notFound || "AI is offline. Please try again later." }]);
         } finally {
             setLoadingAI(false);
         }